@@ -0,0 +1,79 @@
+import click
+from app import db
+
+
+def register_commands(app):
+    """Attach the maintenance commands to `flask`"""
+    
+    @app.cli.command('rebuild-task-tree')
+    @click.option('--project-id', type=int, default=None, help='Only rebuild this project (database id).')
+    def rebuild_task_tree(project_id):
+        """Backfill the task closure table from Task.parent_id"""
+        from app.utils.task_tree import rebuild_task_closure
+        
+        db.create_all()
+        written = rebuild_task_closure(project_id)
+        db.session.commit()
+        click.echo(f'Wrote {written} task closure rows.')
+    
+    @app.cli.command('rebuild-project-search')
+    def rebuild_project_search():
+        """Backfill the project trigram search index"""
+        from app.utils.project_search import rebuild_project_search_index
+        
+        db.create_all()
+        written = rebuild_project_search_index()
+        db.session.commit()
+        click.echo(f'Wrote {written} project search rows.')
+    
+    @app.cli.command('project-id-usage')
+    def project_id_usage_command():
+        """Report how much of the 5-digit project ID space is in use"""
+        from app.utils.project_ids import project_id_usage
+        
+        usage = project_id_usage()
+        click.echo(f"{usage['used']} of {usage['total']} project IDs used "
+                   f"({usage['used_ratio']:.2%}), {usage['free']} free, "
+                   f"sequence at {usage['sequence_position']}")
+    
+    @app.cli.command('deliver-mail')
+    @click.option('--once', is_flag=True, help='Exit once the outbox has nothing due.')
+    def deliver_mail(once):
+        """Run the email outbox delivery worker"""
+        from flask import current_app
+        from app.utils.email import run_outbox_worker
+        
+        run_outbox_worker(current_app._get_current_object(), once=once)
+    
+    @app.cli.command('prune-attachments')
+    def prune_attachments():
+        """Delete stored attachment files that no attachment references"""
+        from app.utils.attachments import prune_unreferenced_blobs
+        
+        removed = prune_unreferenced_blobs()
+        db.session.commit()
+        click.echo(f'Removed {removed} unreferenced attachment files.')
+    
+    @app.cli.command('import-tasks')
+    @click.argument('project_id', type=int)
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--user-id', type=int, required=True, help='User recorded as creating the schedule version.')
+    @click.option('--format', 'file_format', type=click.Choice(['csv', 'xml']), default=None,
+                  help='File format; taken from the file extension by default.')
+    def import_tasks_command(project_id, path, user_id, file_format):
+        """Bulk-import tasks from CSV or MS Project XML into a project (database id)"""
+        from app.utils.task_import import PARSERS, import_tasks
+        
+        file_format = file_format or path.rsplit('.', 1)[-1].lower()
+        if file_format not in PARSERS:
+            raise click.UsageError(f"Cannot tell the format of {path}; pass --format {' or '.join(PARSERS)}.")
+        with open(path, 'rb') as stream:
+            report = import_tasks(project_id, user_id, stream, file_format)
+        if not report.ok:
+            db.session.rollback()
+            for error in report.errors:
+                click.echo(error, err=True)
+            raise click.ClickException(f'{report.error_count} rows have errors; nothing was imported.')
+        db.session.commit()
+        click.echo(f'Imported {report.imported} tasks as schedule version {report.version.version} '
+                   f'in {report.seconds:.1f}s ({report.rows_per_second:.0f} rows/s).')
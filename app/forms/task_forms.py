@@ -1,4 +1,5 @@
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileAllowed, FileRequired
 from wtforms import StringField, TextAreaField, SelectField, DateField, BooleanField, IntegerField, SubmitField
 from wtforms.validators import DataRequired, Optional, Length, NumberRange
 from app.models.task import TaskStatus
@@ -35,4 +36,11 @@ class TaskFilterForm(FlaskForm):
     start_date_to = DateField('Start Date To', format='%Y-%m-%d', validators=[Optional()])
     resource_id = SelectField('Assigned To', validators=[Optional()], coerce=int)
     is_milestone = BooleanField('Milestones Only', default=False)
-    submit = SubmitField('Filter')
\ No newline at end of file
+    submit = SubmitField('Filter')
+
+class TaskImportForm(FlaskForm):
+    file = FileField('Task File', validators=[
+        FileRequired(),
+        FileAllowed(['csv', 'xml'], 'Only CSV and MS Project XML files are allowed.')
+    ])
+    submit = SubmitField('Import Tasks')
\ No newline at end of file
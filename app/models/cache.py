@@ -0,0 +1,35 @@
+from app import db
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+class CacheVersion(db.Model):
+    """Version of a cached data set, bumped in the transaction that changes the data
+
+    Every process keys its cache entries by the current version, so a commit
+    in one worker retires the entries of all of them.
+    """
+    name = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+    
+    def __repr__(self):
+        return f'<CacheVersion {self.name} at {self.version}>'
+
+def cache_versions(*names):
+    """Current versions of cached data sets in one query, in the order given; 0 before a set's first change"""
+    versions = dict(db.session.query(CacheVersion.name, CacheVersion.version).filter(CacheVersion.name.in_(names)))
+    return tuple(versions.get(name, 0) for name in names)
+
+def bump_cache_versions(connection, names):
+    """Retire the cached entries of the named data sets when the connection's transaction commits"""
+    table = CacheVersion.__table__
+    # In name order, so two transactions bumping the same sets cannot deadlock
+    for name in sorted(names):
+        bumped = update(table).where(table.c.name == name).values(version=table.c.version + 1)
+        if connection.execute(bumped).rowcount:
+            continue
+        try:
+            with connection.begin_nested():
+                connection.execute(table.insert().values(name=name, version=1))
+        except IntegrityError:
+            # Another transaction created the row first
+            connection.execute(bumped)
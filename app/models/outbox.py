@@ -0,0 +1,33 @@
+from app import db
+from datetime import datetime
+
+class OutboxStatus:
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+class OutboxEmail(db.Model):
+    """Email queued by a request and delivered later by the outbox worker"""
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(255), nullable=False)
+    recipients = db.Column(db.Text, nullable=False)  # Comma separated
+    sender = db.Column(db.String(255))
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default=OutboxStatus.PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claim_token = db.Column(db.String(32))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('ix_outbox_email_due', 'status', 'next_attempt_at'),
+    )
+    
+    def recipient_list(self):
+        return [address for address in self.recipients.split(',') if address]
+    
+    def __repr__(self):
+        return f'<OutboxEmail {self.id} {self.status}>'
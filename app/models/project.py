@@ -1,5 +1,6 @@
 from app import db
 from datetime import datetime
+from sqlalchemy import event, inspect
 import enum
 
 class ProjectType(enum.Enum):
@@ -35,6 +36,11 @@ class Project(db.Model):
     sow_attachments = db.relationship('SOWAttachment', backref='project', lazy='dynamic', cascade='all, delete-orphan')
     schedule_versions = db.relationship('ScheduleVersion', backref='project', lazy='dynamic', cascade='all, delete-orphan')
     
+    __table_args__ = (
+        # Seek pagination order for the project list
+        db.Index('ix_project_created_at_id', 'created_at', 'id'),
+    )
+    
     def __init__(self, name, start_date, end_date, project_type, project_manager_id, **kwargs):
         self.name = name
         self.start_date = start_date
@@ -70,6 +76,22 @@ class ProjectVersion(db.Model):
     def __repr__(self):
         return f'<ProjectVersion {self.project_id} - {self.version}>'
 
+class AttachmentBlob(db.Model):
+    """One stored file, shared by every attachment with the same content"""
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), unique=True, nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    content_type = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @property
+    def storage_key(self):
+        """Path of the file relative to the attachment storage directory"""
+        return f'{self.sha256[:2]}/{self.sha256[2:4]}/{self.sha256}'
+    
+    def __repr__(self):
+        return f'<AttachmentBlob {self.sha256[:12]} ({self.size} bytes)>'
+
 class POAttachment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
@@ -77,8 +99,10 @@ class POAttachment(db.Model):
     file_path = db.Column(db.String(255), nullable=False)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    blob_id = db.Column(db.Integer, db.ForeignKey('attachment_blob.id'), index=True)  # Content-addressed file
     
     user = db.relationship('User')
+    blob = db.relationship('AttachmentBlob')
     
     def __repr__(self):
         return f'<POAttachment {self.filename}>'
@@ -90,8 +114,63 @@ class SOWAttachment(db.Model):
     file_path = db.Column(db.String(255), nullable=False)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    blob_id = db.Column(db.Integer, db.ForeignKey('attachment_blob.id'), index=True)  # Content-addressed file
     
     user = db.relationship('User')
+    blob = db.relationship('AttachmentBlob')
+    
+    def __repr__(self):
+        return f'<SOWAttachment {self.filename}>'
+
+class ProjectIdSequence(db.Model):
+    """Next unreserved value of a numeric ID space, handed out in blocks"""
+    name = db.Column(db.String(50), primary_key=True)
+    next_value = db.Column(db.Integer, nullable=False)
     
     def __repr__(self):
-        return f'<SOWAttachment {self.filename}>'
\ No newline at end of file
+        return f'<ProjectIdSequence {self.name} at {self.next_value}>'
+
+class ProjectSearchTrigram(db.Model):
+    """Trigram index over Project.project_id ('i') and Project.name ('n') for substring search"""
+    field = db.Column(db.String(1), primary_key=True)
+    # Compared byte for byte: MySQL's default collation would fold 'rés' and 'res' into one key
+    trigram = db.Column(db.String(3).with_variant(db.String(3, collation='utf8mb4_bin'), 'mysql'), primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), primary_key=True, index=True)
+    
+    def __repr__(self):
+        return f'<ProjectSearchTrigram {self.field}:{self.trigram} -> {self.project_id}>'
+
+SEARCH_FIELDS = {'i': 'project_id', 'n': 'name'}
+
+def trigrams(text):
+    """Lower-cased, distinct 3-character windows of a string"""
+    text = (text or '').lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _index_rows(project):
+    return [
+        {'field': field, 'trigram': trigram, 'project_id': project.id}
+        for field, attribute in SEARCH_FIELDS.items()
+        for trigram in trigrams(getattr(project, attribute))
+    ]
+
+# Keep the search index in step with the project rows
+@event.listens_for(Project, 'after_insert')
+def _search_after_insert(mapper, connection, target):
+    rows = _index_rows(target)
+    if rows:
+        connection.execute(ProjectSearchTrigram.__table__.insert(), rows)
+
+@event.listens_for(Project, 'after_update')
+def _search_after_update(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[attribute].history.has_changes() for attribute in SEARCH_FIELDS.values()):
+        return
+    table = ProjectSearchTrigram.__table__
+    connection.execute(table.delete().where(table.c.project_id == target.id))
+    _search_after_insert(mapper, connection, target)
+
+@event.listens_for(Project, 'before_delete')
+def _search_before_delete(mapper, connection, target):
+    table = ProjectSearchTrigram.__table__
+    connection.execute(table.delete().where(table.c.project_id == target.id))
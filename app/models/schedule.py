@@ -8,10 +8,12 @@ class ScheduleVersion(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     notes = db.Column(db.Text)
+    is_baseline = db.Column(db.Boolean, default=False)  # Holds a snapshot of every task
     
     user = db.relationship('User')
     task_history = db.relationship('TaskVersionHistory', backref='schedule_version', lazy='dynamic')
-    version_changes = db.relationship('VersionChangeReport', backref='schedule_version', lazy='dynamic')
+    version_changes = db.relationship('VersionChangeReport', backref='schedule_version', lazy='dynamic',
+                                      foreign_keys='VersionChangeReport.schedule_version_id')
     
     def __repr__(self):
         return f'<ScheduleVersion {self.project_id} - {self.version}>'
@@ -25,6 +27,10 @@ class TaskVersionHistory(db.Model):
     status = db.Column(db.String(20))  # Status at the time of version creation
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_task_version_history_version_task', 'schedule_version_id', 'task_id'),
+    )
+    
     def __repr__(self):
         return f'<TaskVersionHistory {self.task_id} in {self.schedule_version_id}>'
 
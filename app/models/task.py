@@ -1,5 +1,7 @@
 from app import db
 from datetime import datetime
+from sqlalchemy import event, inspect, select, true
+from app.utils.working_time import get_working_calendar, invalidate_working_calendar
 import enum
 
 class TaskStatus(enum.Enum):
@@ -21,7 +23,8 @@ class Task(db.Model):
     is_milestone = db.Column(db.Boolean, default=False)
     is_active = db.Column(db.Boolean, default=True)
     status = db.Column(db.Enum(TaskStatus), default=TaskStatus.NOT_STARTED)
-    has_unread_comments = db.Column(db.Boolean, default=False)
+    has_unread_comments = db.Column(db.Boolean, default=False)  # Legacy global flag; unread state is per user in TaskCommentUnread
+    external_ref = db.Column(db.String(64))  # Row reference or MS Project UID from a bulk import
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -31,25 +34,55 @@ class Task(db.Model):
     comments = db.relationship('TaskComment', backref='task', lazy='dynamic', cascade='all, delete-orphan')
     version_history = db.relationship('TaskVersionHistory', backref='task', lazy='dynamic', cascade='all, delete-orphan')
     
+    __table_args__ = (
+        db.Index('ix_task_project_external_ref', 'project_id', 'external_ref'),
+    )
+    
     def calculate_hours(self):
         """Calculate working hours between start and end date based on calendar"""
-        # This will need to be implemented with calendar data
-        # For now, we'll use a simplified approach (8 hours per working day)
-        working_days = (self.end_date - self.start_date).days + 1
-        # This is a simplification - in reality we would check against the calendar
-        return working_days * 8
+        return get_working_calendar().hours_between(self.start_date, self.end_date)
     
     def get_all_subtasks(self):
-        """Get all subtasks recursively"""
-        tasks = []
-        for subtask in self.subtasks:
-            tasks.append(subtask)
-            tasks.extend(subtask.get_all_subtasks())
-        return tasks
+        """Get all subtasks at any depth, nearest first (one indexed query)"""
+        return Task.query.join(TaskClosure, TaskClosure.descendant_id == Task.id).filter(
+            TaskClosure.ancestor_id == self.id,
+            TaskClosure.depth > 0
+        ).order_by(TaskClosure.depth, Task.id).all()
+    
+    def get_ancestors(self):
+        """Get the chain of parents from the root down to the direct parent"""
+        return Task.query.join(TaskClosure, TaskClosure.ancestor_id == Task.id).filter(
+            TaskClosure.descendant_id == self.id,
+            TaskClosure.depth > 0
+        ).order_by(TaskClosure.depth.desc()).all()
+    
+    def subtree_ids(self):
+        """Select of the ids in this task's subtree, the task itself included"""
+        return select(TaskClosure.descendant_id).where(TaskClosure.ancestor_id == self.id)
+    
+    def is_ancestor_of(self, task_id):
+        """Check whether task_id lies in this task's subtree (itself included)"""
+        return db.session.query(TaskClosure.query.filter_by(
+            ancestor_id=self.id,
+            descendant_id=task_id
+        ).exists()).scalar()
     
     def __repr__(self):
         return f'<Task {self.id} - {self.name}>'
 
+class TaskClosure(db.Model):
+    """Every (ancestor, descendant) pair of the task tree, including each task with itself"""
+    ancestor_id = db.Column(db.Integer, db.ForeignKey('task.id'), primary_key=True)
+    descendant_id = db.Column(db.Integer, db.ForeignKey('task.id'), primary_key=True)
+    depth = db.Column(db.Integer, nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_task_closure_descendant', 'descendant_id', 'depth'),
+    )
+    
+    def __repr__(self):
+        return f'<TaskClosure {self.ancestor_id} -> {self.descendant_id} ({self.depth})>'
+
 class TaskComment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     task_id = db.Column(db.Integer, db.ForeignKey('task.id'), nullable=False)
@@ -61,6 +94,30 @@ class TaskComment(db.Model):
     def __repr__(self):
         return f'<TaskComment {self.id}>'
 
+class TaskCommentRead(db.Model):
+    """How far a user has read a task's comments"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    task_id = db.Column(db.Integer, db.ForeignKey('task.id'), primary_key=True, index=True)
+    last_read_comment_id = db.Column(db.Integer, nullable=False)
+    read_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<TaskCommentRead {self.user_id} on {self.task_id} up to {self.last_read_comment_id}>'
+
+class TaskCommentUnread(db.Model):
+    """Comments a user has not read yet on a task; a row exists only while the count is above zero"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    task_id = db.Column(db.Integer, db.ForeignKey('task.id'), primary_key=True, index=True)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+    last_comment_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_task_comment_unread_user_recent', 'user_id', 'last_comment_at'),
+    )
+    
+    def __repr__(self):
+        return f'<TaskCommentUnread {self.user_id} on {self.task_id}: {self.unread_count}>'
+
 class TaskResource(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     task_id = db.Column(db.Integer, db.ForeignKey('task.id'), nullable=False)
@@ -72,6 +129,61 @@ class TaskResource(db.Model):
     def __repr__(self):
         return f'<TaskResource {self.user_id} on {self.task_id}>'
 
+# Keep the closure table in step with Task.parent_id on insert, reparent and delete
+@event.listens_for(Task, 'after_insert')
+def _closure_after_insert(mapper, connection, target):
+    closure = TaskClosure.__table__
+    connection.execute(closure.insert().values(ancestor_id=target.id, descendant_id=target.id, depth=0))
+    if target.parent_id:
+        connection.execute(closure.insert().from_select(
+            ['ancestor_id', 'descendant_id', 'depth'],
+            select(closure.c.ancestor_id, target.id, closure.c.depth + 1).where(
+                closure.c.descendant_id == target.parent_id)
+        ))
+
+@event.listens_for(Task, 'after_update')
+def _closure_after_update(mapper, connection, target):
+    if not inspect(target).attrs.parent_id.history.has_changes():
+        return
+    closure = TaskClosure.__table__
+    subtree = [row[0] for row in connection.execute(
+        select(closure.c.descendant_id).where(closure.c.ancestor_id == target.id))]
+    
+    # Detach the subtree from its old ancestors
+    connection.execute(closure.delete().where(
+        closure.c.descendant_id.in_(subtree),
+        closure.c.ancestor_id.notin_(subtree)
+    ))
+    
+    # Attach it below every ancestor of the new parent
+    if target.parent_id:
+        ancestors = closure.alias('ancestors')
+        descendants = closure.alias('descendants')
+        connection.execute(closure.insert().from_select(
+            ['ancestor_id', 'descendant_id', 'depth'],
+            select(
+                ancestors.c.ancestor_id,
+                descendants.c.descendant_id,
+                ancestors.c.depth + descendants.c.depth + 1
+            ).select_from(ancestors.join(descendants, true())).where(
+                ancestors.c.descendant_id == target.parent_id,
+                descendants.c.ancestor_id == target.id
+            )
+        ))
+
+@event.listens_for(Task, 'before_delete')
+def _closure_before_delete(mapper, connection, target):
+    closure = TaskClosure.__table__
+    connection.execute(closure.delete().where(
+        (closure.c.ancestor_id == target.id) | (closure.c.descendant_id == target.id)
+    ))
+
+@event.listens_for(Task, 'before_delete')
+def _read_tracking_before_delete(mapper, connection, target):
+    # Read receipts and unread counters go with the task
+    for model in (TaskCommentRead, TaskCommentUnread):
+        connection.execute(model.__table__.delete().where(model.__table__.c.task_id == target.id))
+
 class Calendar(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, unique=True, nullable=False)
@@ -80,4 +192,11 @@ class Calendar(db.Model):
     description = db.Column(db.String(200))  # For holidays, etc.
     
     def __repr__(self):
-        return f'<Calendar {self.date}>'
\ No newline at end of file
+        return f'<Calendar {self.date}>'
+
+# Any calendar write makes the cached working-hours index stale
+@event.listens_for(Calendar, 'after_insert')
+@event.listens_for(Calendar, 'after_update')
+@event.listens_for(Calendar, 'after_delete')
+def _calendar_changed(mapper, connection, target):
+    invalidate_working_calendar()
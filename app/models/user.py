@@ -1,5 +1,7 @@
 from app import db, login_manager
+from app.utils.cache import TTLCache
 from flask_login import UserMixin
+from sqlalchemy import event
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import enum
@@ -9,6 +11,12 @@ class UserRole(enum.Enum):
     PROJECT_MANAGER = 'project_manager'
     TEAM_MEMBER = 'team_member'
 
+def display_name(username, first_name, last_name):
+    """First and last name, or the username when either is missing; for users and plain column values alike"""
+    if first_name and last_name:
+        return f"{first_name} {last_name}"
+    return username
+
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False)
@@ -41,9 +49,7 @@ class User(db.Model, UserMixin):
         return check_password_hash(self.password_hash, password)
     
     def get_full_name(self):
-        if self.first_name and self.last_name:
-            return f"{self.first_name} {self.last_name}"
-        return self.username
+        return display_name(self.username, self.first_name, self.last_name)
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -58,6 +64,62 @@ class PasswordResetToken(db.Model):
     
     user = db.relationship('User', backref=db.backref('reset_tokens', lazy='dynamic'))
 
+# Identity of recently seen users, so that authenticated requests skip the user lookup
+identity_cache = TTLCache('user_identity', ttl=60, maxsize=10000)
+
+IDENTITY_FIELDS = ('id', 'username', 'email', 'role', 'first_name', 'last_name', 'is_first_login')
+
+class CachedUser(UserMixin):
+    """current_user built from the identity cache
+
+    Reads of the cached fields never touch the database. Anything else
+    (password checks, relationships, writes) loads the real User row on
+    first use and is delegated to it.
+    """
+    
+    def __init__(self, identity):
+        object.__setattr__(self, '_identity', identity)
+        object.__setattr__(self, '_user', None)
+    
+    def _load(self):
+        if self._user is None:
+            object.__setattr__(self, '_user', db.session.get(User, self._identity['id']))
+        return self._user
+    
+    def __getattr__(self, name):
+        identity = object.__getattribute__(self, '_identity')
+        if name in identity:
+            return identity[name]
+        return getattr(self._load(), name)
+    
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+        if name in self._identity:
+            object.__setattr__(self, '_identity', dict(self._identity, **{name: value}))
+    
+    def get_full_name(self):
+        return display_name(self.username, self.first_name, self.last_name)
+    
+    def __repr__(self):
+        return f'<User {self.username}>'
+
+def invalidate_user_identity(user_id):
+    identity_cache.delete(user_id)
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    # Password changes and resets, role and name edits all come through here
+    invalidate_user_identity(target.id)
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
\ No newline at end of file
+    user_id = int(user_id)
+    identity = identity_cache.get(user_id)
+    if identity is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        identity = {field: getattr(user, field) for field in IDENTITY_FIELDS}
+        identity_cache.set(user_id, identity)
+    return CachedUser(identity)
\ No newline at end of file
@@ -1,12 +1,12 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_user, logout_user, current_user, login_required
 from werkzeug.security import generate_password_hash
-from app import db, mail
+from app import db
 from app.models.user import User, PasswordResetToken, UserRole
 from app.forms.auth_forms import (
     LoginForm, PasswordResetRequestForm, PasswordResetForm, ChangePasswordForm, RegisterUserForm
 )
-from flask_mail import Message
+from app.utils.email import queue_email
 from datetime import datetime, timedelta
 import secrets
 import string
@@ -76,20 +76,19 @@ def request_password_reset():
                 expires_at=datetime.utcnow() + timedelta(hours=1)
             )
             db.session.add(reset_token)
-            db.session.commit()
             
-            # Send email
-            msg = Message(
-                'Password Reset Request',
-                recipients=[user.email]
-            )
+            # Queue email; it is committed together with the token
             reset_url = url_for('auth.reset_password', token=token, _external=True)
-            msg.body = f'''To reset your password, visit the following link:
+            queue_email(
+                'Password Reset Request',
+                [user.email],
+                f'''To reset your password, visit the following link:
 {reset_url}
 
 If you did not make this request, simply ignore this email and no changes will be made.
 '''
-            mail.send(msg)
+            )
+            db.session.commit()
             
             flash('An email has been sent with instructions to reset your password.', 'info')
             return redirect(url_for('auth.login'))
@@ -166,14 +165,12 @@ def register_user():
         )
         
         db.session.add(user)
-        db.session.commit()
         
-        # Send email with credentials
-        msg = Message(
+        # Queue email with credentials; it is committed together with the user
+        queue_email(
             'Your Account has been created',
-            recipients=[user.email]
-        )
-        msg.body = f'''Your account has been created in the Project Management System.
+            [user.email],
+            f'''Your account has been created in the Project Management System.
 
 Username: {user.username}
 Email: {user.email}
@@ -181,7 +178,8 @@ Temporary Password: {initial_password}
 
 Please login and change your password.
 '''
-        mail.send(msg)
+        )
+        db.session.commit()
         
         flash(f'User {user.username} has been registered! An email with credentials has been sent.', 'success')
         return redirect(url_for('user.list_users'))
@@ -1,45 +1,47 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort
 from flask_login import login_required, current_user
 from app import db
 from app.models.user import User, UserRole
 from app.models.project import Project, ProjectVersion, ProjectType, ProjectStatus, POAttachment, SOWAttachment
 from app.forms.project_forms import ProjectForm, ProjectSearchForm, ProjectVersionForm
-from werkzeug.utils import secure_filename
-import os
-import random
+from app.utils.cache import TTLCache
+from app.utils.choices import project_manager_choices
+from app.utils.dashboard import invalidate_all_dashboards
+from app.utils.pagination import keyset_paginate
+from app.utils.project_search import contains_filter
+from app.utils.project_ids import allocate_project_id
+from app.utils.attachments import ATTACHMENT_MODELS, add_attachment, send_attachment
+from app.utils.export import PROJECT_EXPORT_COLUMNS, export_response, project_list_rows
 from datetime import datetime
 
 project_bp = Blueprint('project', __name__, url_prefix='/projects')
 
-@project_bp.route('/')
-@login_required
-def index():
-    # Project list with search functionality
-    form = ProjectSearchForm()
-    
-    # Populate project manager dropdown
-    project_managers = User.query.filter_by(role=UserRole.PROJECT_MANAGER).all()
-    form.project_manager_id.choices = [(0, 'All')] + [(pm.id, pm.get_full_name()) for pm in project_managers]
-    
-    # Get query parameters
-    project_id = request.args.get('project_id', '')
-    name = request.args.get('name', '')
-    status = request.args.get('status', '')
-    project_manager_id = request.args.get('project_manager_id', type=int)
-    start_date_from = request.args.get('start_date_from', '')
-    start_date_to = request.args.get('start_date_to', '')
+# Filtered list totals, shared between pages of the same search
+project_count_cache = TTLCache('project_counts', ttl=60, maxsize=512)
+
+def _filtered_project_query(args):
+    """Project query for the list filters, plus a key identifying the filter set"""
+    project_id = args.get('project_id', '')
+    name = args.get('name', '')
+    status = args.get('status', '')
+    project_manager_id = args.get('project_manager_id', type=int)
+    start_date_from = args.get('start_date_from', '')
+    start_date_to = args.get('start_date_to', '')
     
     # Build query
     query = Project.query
     
     if project_id:
-        query = query.filter(Project.project_id.like(f'%{project_id}%'))
+        query = query.filter(contains_filter('project_id', project_id))
     if name:
-        query = query.filter(Project.name.like(f'%{name}%'))
+        query = query.filter(contains_filter('name', name))
     if status:
         query = query.filter(Project.status == ProjectStatus[status])
     if project_manager_id and project_manager_id > 0:
         query = query.filter(Project.project_manager_id == project_manager_id)
+    else:
+        project_manager_id = None
+    from_date = to_date = None
     if start_date_from:
         try:
             from_date = datetime.strptime(start_date_from, '%Y-%m-%d').date()
@@ -54,16 +56,66 @@ def index():
             pass
     
     # For project managers, show only their projects
+    restricted_to = None
     if current_user.role == UserRole.PROJECT_MANAGER:
+        restricted_to = current_user.id
         query = query.filter(Project.project_manager_id == current_user.id)
     
-    # Paginate results
-    page = request.args.get('page', 1, type=int)
+    key = (project_id, name, status, project_manager_id, from_date, to_date, restricted_to)
+    return query, key
+
+def _cached_project_count(query, key):
+    return project_count_cache.get_or_set(key, lambda: query.order_by(None).count())
+
+def invalidate_project_counts():
+    project_count_cache.clear()
+
+def _save_attachments(form, project):
+    """Store the PO and SOW uploads of a submitted project form, if any"""
+    if form.po_attachment.data:
+        add_attachment('po', project, form.po_attachment.data, current_user.id)
+    if form.sow_attachment.data:
+        add_attachment('sow', project, form.sow_attachment.data, current_user.id)
+
+@project_bp.route('/')
+@login_required
+def index():
+    # Project list with search functionality
+    form = ProjectSearchForm()
+    
+    # Populate project manager dropdown
+    form.project_manager_id.choices = [(0, 'All')] + project_manager_choices()
+    
+    query, filter_key = _filtered_project_query(request.args)
+    total = _cached_project_count(query, filter_key)
     per_page = 10
-    projects = query.order_by(Project.created_at.desc()).paginate(page=page, per_page=per_page)
+    
+    page = request.args.get('page', type=int)
+    if page:
+        # Numbered pages (OFFSET), kept for existing links; the total comes from the cache
+        projects = query.order_by(Project.created_at.desc(), Project.id.desc()).paginate(
+            page=page, per_page=per_page, count=False)
+        projects.total = total
+    else:
+        # Seek pagination on (created_at, id) with opaque cursors
+        projects = keyset_paginate(
+            query, Project.created_at, Project.id, per_page,
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            total=total
+        )
     
     return render_template('project/index.html', projects=projects, form=form)
 
+@project_bp.route('/export')
+@login_required
+def export():
+    # Same filters as the project list, streamed as CSV or XLSX
+    query, _ = _filtered_project_query(request.args)
+    file_format = request.args.get('format', 'csv')
+    filename = f"projects-{datetime.utcnow().strftime('%Y%m%d')}"
+    return export_response(file_format, filename, 'Projects', PROJECT_EXPORT_COLUMNS, project_list_rows(query))
+
 @project_bp.route('/create', methods=['GET', 'POST'])
 @login_required
 def create():
@@ -75,8 +127,7 @@ def create():
     form = ProjectForm()
     
     # Populate project manager dropdown
-    project_managers = User.query.filter_by(role=UserRole.PROJECT_MANAGER).all()
-    form.project_manager_id.choices = [(pm.id, pm.get_full_name()) for pm in project_managers]
+    form.project_manager_id.choices = project_manager_choices()
     
     # For project managers, default to themselves and disable field
     if current_user.role == UserRole.PROJECT_MANAGER:
@@ -102,13 +153,8 @@ def create():
             else:  # T&M_PRICE
                 project.monthly_billing = form.monthly_billing.data
             
-            # Generate 5-digit project ID
-            while True:
-                project_id = str(random.randint(10000, 99999))
-                if not Project.query.filter_by(project_id=project_id).first():
-                    break
-            
-            project.project_id = project_id
+            # Generate 5-digit project ID from this worker's reserved block
+            project.project_id = allocate_project_id()
             
             db.session.add(project)
             db.session.commit()
@@ -123,37 +169,11 @@ def create():
             db.session.add(initial_version)
             
             # Handle file uploads
-            if form.po_attachment.data:
-                filename = secure_filename(form.po_attachment.data.filename)
-                upload_folder = os.path.join(current_app.root_path, 'static/uploads/po')
-                os.makedirs(upload_folder, exist_ok=True)
-                filepath = os.path.join(upload_folder, f"{project.project_id}_{filename}")
-                form.po_attachment.data.save(filepath)
-                
-                po_attachment = POAttachment(
-                    project_id=project.id,
-                    filename=filename,
-                    file_path=f"uploads/po/{project.project_id}_{filename}",
-                    uploaded_by=current_user.id
-                )
-                db.session.add(po_attachment)
-            
-            if form.sow_attachment.data:
-                filename = secure_filename(form.sow_attachment.data.filename)
-                upload_folder = os.path.join(current_app.root_path, 'static/uploads/sow')
-                os.makedirs(upload_folder, exist_ok=True)
-                filepath = os.path.join(upload_folder, f"{project.project_id}_{filename}")
-                form.sow_attachment.data.save(filepath)
-                
-                sow_attachment = SOWAttachment(
-                    project_id=project.id,
-                    filename=filename,
-                    file_path=f"uploads/sow/{project.project_id}_{filename}",
-                    uploaded_by=current_user.id
-                )
-                db.session.add(sow_attachment)
+            _save_attachments(form, project)
             
             db.session.commit()
+            invalidate_all_dashboards()
+            invalidate_project_counts()
             
             flash(f'Project "{project.name}" has been created with ID: {project.project_id}', 'success')
             return redirect(url_for('project.view', project_id=project.id))
@@ -193,6 +213,22 @@ def view(project_id):
         versions=versions
     )
 
+@project_bp.route('/<int:project_id>/attachments/<kind>/<int:attachment_id>')
+@login_required
+def download_attachment(project_id, kind, attachment_id):
+    project = Project.query.get_or_404(project_id)
+    
+    # Check permissions for project managers
+    if current_user.role == UserRole.PROJECT_MANAGER and project.project_manager_id != current_user.id:
+        flash('You do not have permission to view this project.', 'danger')
+        return redirect(url_for('project.index'))
+    
+    if kind not in ATTACHMENT_MODELS:
+        abort(404)
+    attachment = ATTACHMENT_MODELS[kind].query.filter_by(id=attachment_id, project_id=project.id).first_or_404()
+    
+    return send_attachment(attachment, as_attachment=request.args.get('download', type=bool, default=False))
+
 @project_bp.route('/<int:project_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit(project_id):
@@ -219,8 +255,7 @@ def edit(project_id):
 
     ####
     # Populate project manager dropdown (continued from previous)
-    project_managers = User.query.filter_by(role=UserRole.PROJECT_MANAGER).all()
-    form.project_manager_id.choices = [(pm.id, pm.get_full_name()) for pm in project_managers]
+    form.project_manager_id.choices = project_manager_choices()
     
     # For project managers, default to themselves and disable field
     if current_user.role == UserRole.PROJECT_MANAGER:
@@ -315,37 +350,11 @@ def edit(project_id):
                 db.session.add(project_version)
             
             # Handle file uploads
-            if form.po_attachment.data:
-                filename = secure_filename(form.po_attachment.data.filename)
-                upload_folder = os.path.join(current_app.root_path, 'static/uploads/po')
-                os.makedirs(upload_folder, exist_ok=True)
-                filepath = os.path.join(upload_folder, f"{project.project_id}_{filename}")
-                form.po_attachment.data.save(filepath)
-                
-                po_attachment = POAttachment(
-                    project_id=project.id,
-                    filename=filename,
-                    file_path=f"uploads/po/{project.project_id}_{filename}",
-                    uploaded_by=current_user.id
-                )
-                db.session.add(po_attachment)
-            
-            if form.sow_attachment.data:
-                filename = secure_filename(form.sow_attachment.data.filename)
-                upload_folder = os.path.join(current_app.root_path, 'static/uploads/sow')
-                os.makedirs(upload_folder, exist_ok=True)
-                filepath = os.path.join(upload_folder, f"{project.project_id}_{filename}")
-                form.sow_attachment.data.save(filepath)
-                
-                sow_attachment = SOWAttachment(
-                    project_id=project.id,
-                    filename=filename,
-                    file_path=f"uploads/sow/{project.project_id}_{filename}",
-                    uploaded_by=current_user.id
-                )
-                db.session.add(sow_attachment)
+            _save_attachments(form, project)
             
             db.session.commit()
+            invalidate_all_dashboards()
+            invalidate_project_counts()
             
             flash(f'Project "{project.name}" has been updated', 'success')
             return redirect(url_for('project.view', project_id=project.id))
@@ -424,6 +433,8 @@ def delete(project_id):
     try:
         db.session.delete(project)
         db.session.commit()
+        invalidate_all_dashboards()
+        invalidate_project_counts()
         flash(f'Project "{project.name}" has been deleted', 'success')
     except Exception as e:
         db.session.rollback()
@@ -1,11 +1,20 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app
 from flask_login import login_required, current_user
 from app import db
-from app.models.user import User, UserRole
+from app.models.user import User, UserRole, display_name
 from app.models.project import Project, ProjectStatus
 from app.models.task import Task, TaskStatus, TaskResource, TaskComment
 from app.models.schedule import ScheduleVersion, TaskVersionHistory, VersionChangeReport
-from app.forms.task_forms import TaskForm, TaskCommentForm, TaskResourceForm, TaskFilterForm
+from app.forms.task_forms import TaskForm, TaskCommentForm, TaskResourceForm, TaskFilterForm, TaskImportForm
+from app.utils.gantt import load_gantt_data
+from app.utils.schedule import create_baseline, diff_schedule_versions, latest_schedule_version, next_version_number
+from app.utils.rescheduler import reschedule_dependents, record_rescheduled
+from app.utils.dashboard import invalidate_all_dashboards, invalidate_dashboards_for_task, invalidate_dashboards_for_users
+from app.utils.task_import import import_tasks
+from app.utils.export import TASK_EXPORT_COLUMNS, export_response, task_tree_rows
+from app.utils.task_tree import build_task_tree
+from app.utils.choices import assignable_user_choices, parent_task_choices
+from app.utils.comment_tracking import mark_comments_read, record_comment
 from datetime import datetime, timedelta
 import json
 
@@ -24,36 +33,28 @@ def project_tasks(project_id):
     # Filter form
     form = TaskFilterForm()
     
-    # Populate resource dropdown
-    resources = User.query.all()
-    form.resource_id.choices = [(0, 'All')] + [(user.id, user.get_full_name()) for user in resources]
+    # Populate resource dropdown with the people assigned in this project
+    resources = db.session.query(User.id, User.first_name, User.last_name, User.username).join(
+        TaskResource, TaskResource.user_id == User.id
+    ).join(Task, Task.id == TaskResource.task_id).filter(
+        Task.project_id == project_id
+    ).distinct().order_by(User.first_name, User.last_name, User.username).all()
+    form.resource_id.choices = [(0, 'All')] + [
+        (user.id, display_name(user.username, user.first_name, user.last_name)) for user in resources
+    ]
     
     # Get filters from request
     status = request.args.get('status', '')
     resource_id = request.args.get('resource_id', type=int)
     is_milestone = request.args.get('is_milestone', type=bool)
     
-    # Build query
-    query = Task.query.filter_by(project_id=project_id, parent_id=None)  # Top-level tasks only
-    
-    if status:
-        query = query.filter(Task.status == TaskStatus[status])
-    
-    if resource_id and resource_id > 0:
-        # Find tasks where this user is assigned
-        task_ids = db.session.query(TaskResource.task_id).filter_by(user_id=resource_id).all()
-        task_ids = [task_id for (task_id,) in task_ids]
-        query = query.filter(Task.id.in_(task_ids))
-    
-    if is_milestone:
-        query = query.filter_by(is_milestone=True)
-    
-    # Get tasks
-    tasks = query.order_by(Task.start_date).all()
-    
-    # For each task, get its children
-    for task in tasks:
-        task.child_tasks = task.subtasks.all()
+    # Whole tree in one query; filters keep matching tasks and their parents
+    tasks = build_task_tree(
+        project_id,
+        status=TaskStatus[status] if status else None,
+        resource_id=resource_id if resource_id and resource_id > 0 else None,
+        milestones_only=bool(is_milestone)
+    )
     
     return render_template(
         'task/project_tasks.html',
@@ -79,8 +80,7 @@ def create(project_id):
     form = TaskForm()
     
     # Populate parent task dropdown
-    parent_tasks = Task.query.filter_by(project_id=project_id, parent_id=None).all()
-    form.parent_id.choices = [(0, 'None')] + [(task.id, task.name) for task in parent_tasks]
+    form.parent_id.choices = [(0, 'None')] + parent_task_choices(project_id)
     
     if form.validate_on_submit():
         try:
@@ -108,8 +108,7 @@ def create(project_id):
             db.session.commit()
             
             # If we have a schedule version, add this task to it
-            latest_schedule = ScheduleVersion.query.filter_by(project_id=project_id).order_by(
-                ScheduleVersion.created_at.desc()).first()
+            latest_schedule = latest_schedule_version(project_id)
             
             if latest_schedule:
                 task_history = TaskVersionHistory(
@@ -125,7 +124,7 @@ def create(project_id):
                 # Create initial schedule version
                 new_schedule = ScheduleVersion(
                     project_id=project_id,
-                    version="1.0",
+                    version=next_version_number(None),
                     created_by=current_user.id,
                     notes="Initial schedule creation"
                 )
@@ -142,6 +141,8 @@ def create(project_id):
                 db.session.add(task_history)
                 db.session.commit()
             
+            invalidate_dashboards_for_task(task)
+            
             flash(f'Task "{task.name}" has been created', 'success')
             return redirect(url_for('task.project_tasks', project_id=project_id))
             
@@ -157,6 +158,59 @@ def create(project_id):
     
     return render_template('task/create.html', form=form, project=project)
 
+@task_bp.route('/import/<int:project_id>', methods=['GET', 'POST'])
+@login_required
+def import_project_tasks(project_id):
+    project = Project.query.get_or_404(project_id)
+    
+    # Check permissions
+    if current_user.role == UserRole.TEAM_MEMBER:
+        flash('You do not have permission to import tasks.', 'danger')
+        return redirect(url_for('task.project_tasks', project_id=project_id))
+    
+    if current_user.role == UserRole.PROJECT_MANAGER and project.project_manager_id != current_user.id:
+        flash('You can only import tasks into your own projects.', 'danger')
+        return redirect(url_for('project.index'))
+    
+    form = TaskImportForm()
+    
+    if form.validate_on_submit():
+        upload = form.file.data
+        file_format = upload.filename.rsplit('.', 1)[-1].lower()
+        try:
+            report = import_tasks(project.id, current_user.id, upload.stream, file_format)
+            if report.ok:
+                db.session.commit()
+                invalidate_all_dashboards()
+                flash(f'Imported {report.imported} tasks as schedule version {report.version.version} '
+                      f'({report.rows_per_second:.0f} rows/s)', 'success')
+                return redirect(url_for('task.project_tasks', project_id=project_id))
+            
+            db.session.rollback()
+            flash(f'Nothing was imported: {report.error_count} rows have errors.', 'danger')
+            for error in report.errors[:10]:
+                flash(error, 'warning')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error importing tasks: {str(e)}', 'danger')
+    
+    return render_template('task/import.html', form=form, project=project)
+
+@task_bp.route('/export/<int:project_id>')
+@login_required
+def export_project_tasks(project_id):
+    project = Project.query.get_or_404(project_id)
+    
+    # Check permissions for project managers
+    if current_user.role == UserRole.PROJECT_MANAGER and project.project_manager_id != current_user.id:
+        flash('You do not have permission to view this project.', 'danger')
+        return redirect(url_for('project.index'))
+    
+    # Same layout as the bulk import, so an export can be re-imported
+    file_format = request.args.get('format', 'csv')
+    return export_response(file_format, f'tasks-{project.project_id}', project.name,
+                           TASK_EXPORT_COLUMNS, task_tree_rows(project.id))
+
 @task_bp.route('/<int:task_id>')
 @login_required
 def view(task_id):
@@ -190,9 +244,10 @@ def view(task_id):
     # Get subtasks if any
     subtasks = task.subtasks.all()
     
-    # Mark comments as read if needed
-    if task.has_unread_comments:
-        task.has_unread_comments = False
+    # Mark comments as read for this user; comments after last_read_comment_id are new to them
+    last_read_comment_id, changed = mark_comments_read(
+        current_user.id, task.id, max(comment.id for comment in comments) if comments else None)
+    if changed:
         db.session.commit()
     
     # Comment form
@@ -205,6 +260,7 @@ def view(task_id):
         parent_task=parent_task,
         resources=resource_users,
         comments=comments,
+        last_read_comment_id=last_read_comment_id,
         subtasks=subtasks,
         comment_form=comment_form
     )
@@ -227,14 +283,7 @@ def edit(task_id):
     form = TaskForm(obj=task)
     
     # Populate parent task dropdown (excluding the current task and its children)
-    parent_tasks = Task.query.filter_by(project_id=project.id, parent_id=None).all()
-    # Remove current task and its subtasks from parent choices to prevent circular references
-    valid_parents = []
-    for potential_parent in parent_tasks:
-        if potential_parent.id != task.id and task.id not in [sub.id for sub in potential_parent.get_all_subtasks()]:
-            valid_parents.append((potential_parent.id, potential_parent.name))
-    
-    form.parent_id.choices = [(0, 'None')] + valid_parents
+    form.parent_id.choices = [(0, 'None')] + parent_task_choices(project.id, exclude_task_id=task.id)
     
     # Convert enum values to form values
     form.status.data = task.status.name
@@ -263,8 +312,10 @@ def edit(task_id):
             task.is_active = form.is_active.data
             task.status = TaskStatus[form.status.data]
             
-            # Set parent if selected
+            # Set parent if selected, refusing to move a task below itself
             if form.parent_id.data and form.parent_id.data > 0:
+                if task.is_ancestor_of(form.parent_id.data):
+                    raise ValueError('A task cannot be moved below itself or one of its subtasks')
                 task.parent_id = form.parent_id.data
             else:
                 task.parent_id = None
@@ -272,6 +323,9 @@ def edit(task_id):
             # Re-calculate hours
             task.hours = task.calculate_hours()
             
+            # Shift dependent tasks that the new end date pushes or pulls
+            rescheduled = reschedule_dependents(task, old_data['end_date'])
+            
             # Check if there were significant changes
             has_changes = False
             for key, old_value in old_data.items():
@@ -282,22 +336,18 @@ def edit(task_id):
             
             if has_changes:
                 # Get the latest schedule version
-                latest_schedule = ScheduleVersion.query.filter_by(project_id=project.id).order_by(
-                    ScheduleVersion.created_at.desc()).first()
+                latest_schedule = latest_schedule_version(project.id)
                 
                 if latest_schedule:
                     # Create a new schedule version
-                    major, minor = latest_schedule.version.split('.')
-                    new_version = f"{major}.{int(minor) + 1}"
-                    
                     new_schedule = ScheduleVersion(
                         project_id=project.id,
-                        version=new_version,
+                        version=next_version_number(latest_schedule),
                         created_by=current_user.id,
                         notes=f"Task '{task.name}' updated"
                     )
                     db.session.add(new_schedule)
-                    db.session.commit()
+                    db.session.flush()
                     
                     # Record the task version history
                     task_history = TaskVersionHistory(
@@ -309,6 +359,9 @@ def edit(task_id):
                     )
                     db.session.add(task_history)
                     
+                    # Dependent tasks moved by this edit belong to the same version
+                    record_rescheduled(rescheduled, new_schedule.id)
+                    
                     # Create change report
                     changes = []
                     if task.name != old_data['name']:
@@ -319,6 +372,8 @@ def edit(task_id):
                         changes.append(f"End date changed from {old_data['end_date']} to {task.end_date}")
                     if task.status != old_data['status']:
                         changes.append(f"Status changed from {old_data['status'].value} to {task.status.value}")
+                    if rescheduled:
+                        changes.append(f"{len(rescheduled)} dependent task(s) rescheduled")
                     
                     version_report = VersionChangeReport(
                         schedule_version_id=new_schedule.id,
@@ -329,6 +384,7 @@ def edit(task_id):
                     db.session.add(version_report)
             
             db.session.commit()
+            invalidate_dashboards_for_task(task, [change['task_id'] for change in rescheduled])
             
             flash(f'Task "{task.name}" has been updated', 'success')
             return redirect(url_for('task.view', task_id=task.id))
@@ -353,9 +409,11 @@ def add_comment(task_id):
             content=form.content.data
         )
         db.session.add(comment)
+        db.session.flush()
         
-        # Mark task as having unread comments
-        task.has_unread_comments = True
+        # Unread for everyone following the task except the author, and read by the author
+        record_comment(task, current_user.id)
+        mark_comments_read(current_user.id, task.id, comment.id)
         db.session.commit()
         
         flash('Comment added successfully', 'success')
@@ -382,8 +440,7 @@ def manage_resources(task_id):
     form = TaskResourceForm()
     
     # Populate user dropdown
-    users = User.query.filter(User.role != UserRole.ADMIN).all()  # Exclude admin users from resource assignment
-    form.user_id.choices = [(user.id, user.get_full_name()) for user in users]
+    form.user_id.choices = assignable_user_choices()  # Admin users are not assignable
     
     # Get existing resources
     resources = TaskResource.query.filter_by(task_id=task.id).all()
@@ -412,6 +469,7 @@ def manage_resources(task_id):
             )
             db.session.add(resource)
             db.session.commit()
+            invalidate_dashboards_for_task(task)
             
             flash('Resource assigned successfully', 'success')
             return redirect(url_for('task.manage_resources', task_id=task_id))
@@ -435,8 +493,11 @@ def delete_resource(resource_id):
         return redirect(url_for('project.index'))
     
     try:
+        removed_user_id = resource.user_id
         db.session.delete(resource)
         db.session.commit()
+        invalidate_dashboards_for_task(task)
+        invalidate_dashboards_for_users([removed_user_id])
         flash('Resource removed successfully', 'success')
     except Exception as e:
         db.session.rollback()
@@ -454,41 +515,76 @@ def gantt_chart(project_id):
         flash('You do not have permission to view this project.', 'danger')
         return redirect(url_for('project.index'))
     
-    # Get all tasks for the project
-    tasks = Task.query.filter_by(project_id=project_id).all()
-    
-    # Prepare data for gantt chart
-    gantt_data = []
-    for task in tasks:
-        # Get resources
-        resources = TaskResource.query.filter_by(task_id=task.id).all()
-        resource_names = []
-        for resource in resources:
-            user = User.query.get(resource.user_id)
-            resource_names.append(user.get_full_name())
-        
-        # Get parent name if applicable
-        parent_name = None
-        if task.parent_id:
-            parent = Task.query.get(task.parent_id)
-            parent_name = parent.name
-        
-        task_data = {
-            'id': task.id,
-            'name': task.name,
-            'start': task.start_date.strftime('%Y-%m-%d'),
-            'end': task.end_date.strftime('%Y-%m-%d'),
-            'progress': 100 if task.status == TaskStatus.COMPLETED else 
-                        50 if task.status == TaskStatus.IN_PROGRESS else 
-                        0,
-            'dependencies': parent_name,
-            'resources': ', '.join(resource_names),
-            'status': task.status.value,
-            'is_milestone': task.is_milestone
-        }
-        gantt_data.append(task_data)
-    
-    return render_template('task/gantt.html', project=project, tasks=gantt_data)
+    # NumPy-backed, so imported on first use rather than at startup
+    from app.utils.critical_path import project_critical_path
+    
+    # Prepare data for gantt chart (batched, independent of task count)
+    gantt_data = load_gantt_data(project_id)
+    
+    # Mark the critical path and slack on each bar
+    critical_path = project_critical_path(project_id)
+    for task_data in gantt_data:
+        cpm = critical_path['tasks'][task_data['id']]
+        task_data['is_critical'] = cpm['critical']
+        task_data['slack_days'] = cpm['slack_days']
+    
+    return render_template('task/gantt.html', project=project, tasks=gantt_data, critical_path=critical_path)
+
+@task_bp.route('/critical-path/<int:project_id>')
+@login_required
+def critical_path(project_id):
+    project = Project.query.get_or_404(project_id)
+    
+    # Check permissions for project managers
+    if current_user.role == UserRole.PROJECT_MANAGER and project.project_manager_id != current_user.id:
+        return jsonify({'error': 'You do not have permission to view this project.'}), 403
+    
+    from app.utils.critical_path import project_critical_path
+    
+    return jsonify(project_critical_path(project_id))
+
+def _resource_window():
+    """Date window and user filter from the query string; defaults to the next 12 weeks"""
+    start = request.args.get('start', type=lambda value: datetime.strptime(value, '%Y-%m-%d').date())
+    end = request.args.get('end', type=lambda value: datetime.strptime(value, '%Y-%m-%d').date())
+    start = start or datetime.utcnow().date()
+    end = end or start + timedelta(weeks=12)
+    user_ids = [int(value) for value in request.args.getlist('user_id') if value.isdigit()]
+    return start, end, user_ids
+
+@task_bp.route('/resources/heatmap')
+@login_required
+def resource_heatmap():
+    # Check permissions
+    if current_user.role == UserRole.TEAM_MEMBER:
+        return jsonify({'error': 'You do not have permission to view resource allocation.'}), 403
+    
+    start, end, user_ids = _resource_window()
+    if end < start or (end - start).days > 2 * 366:
+        return jsonify({'error': 'The date range must run forwards and span at most two years.'}), 400
+    
+    from app.utils.resource_load import get_resource_load
+    
+    return jsonify(get_resource_load(start, end).heatmap(start, end, user_ids))
+
+@task_bp.route('/resources/overallocated')
+@login_required
+def resource_overallocations():
+    # Check permissions
+    if current_user.role == UserRole.TEAM_MEMBER:
+        return jsonify({'error': 'You do not have permission to view resource allocation.'}), 403
+    
+    start, end, user_ids = _resource_window()
+    if end < start or (end - start).days > 2 * 366:
+        return jsonify({'error': 'The date range must run forwards and span at most two years.'}), 400
+    
+    from app.utils.resource_load import get_resource_load
+    
+    return jsonify({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'users': get_resource_load(start, end).overallocations(start, end, user_ids)
+    })
 
 @task_bp.route('/schedule/<int:project_id>')
 @login_required
@@ -504,3 +600,52 @@ def schedule_versions(project_id):
     versions = ScheduleVersion.query.filter_by(project_id=project_id).order_by(ScheduleVersion.created_at.desc()).all()
 
     return render_template('task/schedule_versions.html', project=project, versions=versions)
+
+@task_bp.route('/schedule/<int:project_id>/baseline', methods=['POST'])
+@login_required
+def create_schedule_baseline(project_id):
+    project = Project.query.get_or_404(project_id)
+    
+    # Check permissions
+    if current_user.role == UserRole.TEAM_MEMBER:
+        flash('You do not have permission to baseline schedules.', 'danger')
+        return redirect(url_for('task.schedule_versions', project_id=project_id))
+    
+    if current_user.role == UserRole.PROJECT_MANAGER and project.project_manager_id != current_user.id:
+        flash('You can only baseline schedules of your own projects.', 'danger')
+        return redirect(url_for('project.index'))
+    
+    try:
+        baseline = create_baseline(project.id, current_user.id, request.form.get('notes'))
+        db.session.commit()
+        flash(f'Schedule baseline {baseline.version} has been created', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error creating schedule baseline: {str(e)}', 'danger')
+    
+    return redirect(url_for('task.schedule_versions', project_id=project_id))
+
+@task_bp.route('/schedule/<int:project_id>/diff')
+@login_required
+def schedule_diff(project_id):
+    project = Project.query.get_or_404(project_id)
+    
+    # Check permissions for project managers
+    if current_user.role == UserRole.PROJECT_MANAGER and project.project_manager_id != current_user.id:
+        return jsonify({'error': 'You do not have permission to view this project.'}), 403
+    
+    # Default: latest version against the one before it
+    to_id = request.args.get('to', type=int)
+    from_id = request.args.get('from', type=int)
+    versions = ScheduleVersion.query.filter_by(project_id=project.id)
+    if to_id:
+        to_version = versions.filter_by(id=to_id).first_or_404()
+    else:
+        to_version = versions.order_by(ScheduleVersion.id.desc()).first_or_404()
+    if from_id:
+        from_version = versions.filter_by(id=from_id).first_or_404()
+    else:
+        from_version = versions.filter(ScheduleVersion.id < to_version.id).order_by(
+            ScheduleVersion.id.desc()).first() or to_version
+    
+    return jsonify(diff_schedule_versions(from_version, to_version))
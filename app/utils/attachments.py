@@ -0,0 +1,188 @@
+import hashlib
+import os
+import tempfile
+
+from flask import abort, current_app, send_file
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from werkzeug.utils import secure_filename
+
+from app import db
+from app.models.project import AttachmentBlob, POAttachment, SOWAttachment
+
+CHUNK_SIZE = 64 * 1024
+
+ATTACHMENT_MODELS = {
+    'po': POAttachment,
+    'sow': SOWAttachment
+}
+
+
+# Browsers may reuse a download for this long, but must revalidate with the ETag afterwards
+DOWNLOAD_MAX_AGE = 3600
+
+# Session.info key for files written for blob rows the open transaction inserted
+NEW_BLOB_PATHS = 'new_blob_paths'
+
+
+def storage_dir():
+    return current_app.config['ATTACHMENT_STORAGE_DIR']
+
+
+def blob_path(blob):
+    """Absolute path of a stored blob"""
+    return os.path.join(storage_dir(), *blob.storage_key.split('/'))
+
+
+def _stream_to_temp(stream, directory):
+    """Copy a stream to a temp file in fixed-size chunks, hashing on the way"""
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                temp_file.write(chunk)
+                size += len(chunk)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return temp_path, digest.hexdigest(), size
+
+
+def store_upload(file_storage):
+    """Store an uploaded file by content hash and return its AttachmentBlob
+
+    The upload is streamed to a temp file next to the store and renamed into
+    place, so readers never see a partial file. Content that is already
+    stored is not written a second time. The file is in place before the
+    caller commits; if the transaction rolls back instead, files of blobs
+    it inserted are deleted again.
+    """
+    directory = storage_dir()
+    os.makedirs(directory, exist_ok=True)
+    temp_path, sha256, size = _stream_to_temp(file_storage.stream, directory)
+
+    try:
+        inserted = False
+        blob = AttachmentBlob.query.filter_by(sha256=sha256).first()
+        if blob is None:
+            blob = AttachmentBlob(sha256=sha256, size=size, content_type=file_storage.mimetype)
+            try:
+                with db.session.begin_nested():
+                    db.session.add(blob)
+                inserted = True
+            except IntegrityError:
+                # Someone stored the same content concurrently
+                blob = AttachmentBlob.query.filter_by(sha256=sha256).one()
+
+        final_path = blob_path(blob)
+        if not os.path.exists(final_path):
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(temp_path, final_path)
+            if inserted:
+                db.session.info.setdefault(NEW_BLOB_PATHS, set()).add(final_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+    return blob
+
+
+def add_attachment(kind, project, file_storage, uploaded_by):
+    """Store an upload and record it as a PO or SOW attachment of the project"""
+    blob = store_upload(file_storage)
+    attachment = ATTACHMENT_MODELS[kind](
+        project_id=project.id,
+        filename=secure_filename(file_storage.filename),
+        file_path=blob.storage_key,
+        blob=blob,
+        uploaded_by=uploaded_by
+    )
+    db.session.add(attachment)
+    return attachment
+
+
+# Both events also fire when a savepoint is released or rolled back; only the
+# outermost transaction decides whether the new blob rows exist
+@event.listens_for(Session, 'after_commit')
+def _keep_new_blobs(session):
+    if not session.in_nested_transaction():
+        session.info.pop(NEW_BLOB_PATHS, None)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _remove_new_blobs(session):
+    if session.in_nested_transaction():
+        return
+    for path in session.info.pop(NEW_BLOB_PATHS, ()):
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def prune_unreferenced_blobs():
+    """Delete blobs no attachment points to any more; returns how many were removed. The caller commits."""
+    referenced = db.session.query(POAttachment.blob_id).filter(POAttachment.blob_id != None).union(
+        db.session.query(SOWAttachment.blob_id).filter(SOWAttachment.blob_id != None)
+    )
+    orphans = AttachmentBlob.query.filter(AttachmentBlob.id.notin_(referenced)).all()
+    for blob in orphans:
+        path = blob_path(blob)
+        if os.path.exists(path):
+            os.unlink(path)
+        db.session.delete(blob)
+    return len(orphans)
+
+
+def attachment_path(attachment):
+    """Absolute path of an attachment's file, for stored blobs and pre-blob uploads alike"""
+    if attachment.blob is not None:
+        return blob_path(attachment.blob)
+    # Uploads made before content-addressed storage live under static/
+    return os.path.join(current_app.root_path, 'static', attachment.file_path)
+
+
+def send_attachment(attachment, as_attachment=False):
+    """Response for an attachment download
+
+    With ATTACHMENT_ACCEL_REDIRECT_PREFIX set, the body is left to the front
+    server through X-Accel-Redirect. Otherwise send_file streams the file
+    (as X-Sendfile when USE_X_SENDFILE is on, or via the server's
+    wsgi.file_wrapper) and answers Range, If-None-Match and If-Modified-Since
+    requests itself.
+    """
+    blob = attachment.blob
+    path = attachment_path(attachment)
+    if not os.path.isfile(path):
+        abort(404)
+    
+    prefix = current_app.config.get('ATTACHMENT_ACCEL_REDIRECT_PREFIX')
+    if prefix and blob is not None:
+        response = current_app.response_class(mimetype=blob.content_type or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + blob.storage_key
+        disposition = 'attachment' if as_attachment else 'inline'
+        response.headers.set('Content-Disposition', disposition, filename=attachment.filename)
+        response.headers['ETag'] = f'"{blob.sha256}"'
+        response.cache_control.private = True
+        return response
+    
+    response = send_file(
+        path,
+        mimetype=blob.content_type if blob is not None else None,
+        as_attachment=as_attachment,
+        download_name=attachment.filename,
+        conditional=True,
+        # Content-addressed files never change, so the hash is a strong validator
+        etag=blob.sha256 if blob is not None else True,
+        max_age=DOWNLOAD_MAX_AGE
+    )
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
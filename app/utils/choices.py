@@ -0,0 +1,131 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.models.cache import bump_cache_versions, cache_versions
+from app.models.user import User, UserRole, display_name
+from app.models.task import Task
+from app.utils.cache import TTLCache
+
+CHOICE_TTL = 300
+
+# Keyed by the list's CacheVersion, which the writing transaction bumps, so
+# every process moves to a new entry as soon as the write commits
+choice_cache = TTLCache('choice_lists', ttl=CHOICE_TTL, maxsize=4096)
+
+USER_CHOICES = 'choices:users'
+
+# User columns shown in or deciding the user lists
+USER_CHOICE_FIELDS = ('username', 'first_name', 'last_name', 'role')
+# Task columns shown in or deciding the parent-task lists
+PARENT_CHOICE_FIELDS = ('name', 'parent_id', 'project_id')
+
+
+def _task_choices_name(project_id):
+    return f'choices:tasks:{project_id}'
+
+
+def _user_choices(*criteria):
+    rows = db.session.query(User.id, User.first_name, User.last_name, User.username).filter(
+        *criteria
+    ).order_by(User.first_name, User.last_name, User.username).all()
+    return tuple((row.id, display_name(row.username, row.first_name, row.last_name)) for row in rows)
+
+
+def project_manager_choices():
+    """(id, name) of every project manager"""
+    return list(choice_cache.get_or_set(
+        ('project_managers', cache_versions(USER_CHOICES)),
+        lambda: _user_choices(User.role == UserRole.PROJECT_MANAGER)
+    ))
+
+
+def assignable_user_choices():
+    """(id, name) of every user who can be assigned to a task, i.e. everyone but admins"""
+    return list(choice_cache.get_or_set(
+        ('assignable_users', cache_versions(USER_CHOICES)),
+        lambda: _user_choices(User.role != UserRole.ADMIN)
+    ))
+
+
+def parent_task_choices(project_id, exclude_task_id=None):
+    """(id, name) of a project's top-level tasks, optionally without one task
+
+    Only top-level tasks can be parents, and the only one of them inside a
+    task's own subtree is the task itself, so excluding it is enough.
+    """
+    def load():
+        rows = db.session.query(Task.id, Task.name).filter(
+            Task.project_id == project_id,
+            Task.parent_id == None
+        ).order_by(Task.start_date, Task.id).all()
+        return tuple((row.id, row.name) for row in rows)
+
+    name = _task_choices_name(project_id)
+    choices = choice_cache.get_or_set((name, cache_versions(name)), load)
+    return [choice for choice in choices if choice[0] != exclude_task_id]
+
+
+def mark_task_choices_changed(session, project_id):
+    """Retire a project's parent-task list when the session commits, for writes that bypass the ORM"""
+    bump_cache_versions(session.connection(), [_task_choices_name(project_id)])
+
+
+def _queue_task_choices(session, project_id):
+    session.info.setdefault('changed_task_choices', set()).add(project_id)
+
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_delete')
+def _user_added_or_removed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info['changed_user_choices'] = True
+
+
+@event.listens_for(User, 'after_update')
+def _user_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        return
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in USER_CHOICE_FIELDS):
+        session.info['changed_user_choices'] = True
+
+
+@event.listens_for(Task, 'after_insert')
+@event.listens_for(Task, 'after_delete')
+def _task_added_or_removed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        _queue_task_choices(session, target.project_id)
+
+
+@event.listens_for(Task, 'after_update')
+def _task_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        return
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in PARENT_CHOICE_FIELDS):
+        return
+    _queue_task_choices(session, target.project_id)
+    # A task moved to another project leaves the old project's list too
+    for project_id in state.attrs.project_id.history.deleted or ():
+        _queue_task_choices(session, project_id)
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_changed(session, flush_context):
+    names = {_task_choices_name(project_id) for project_id in session.info.pop('changed_task_choices', ())}
+    if session.info.pop('changed_user_choices', False):
+        names.add(USER_CHOICES)
+    if names:
+        bump_cache_versions(session.connection(), names)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    # Queued by a flush that failed; bumps already made roll back with the data
+    session.info.pop('changed_user_choices', None)
+    session.info.pop('changed_task_choices', None)
@@ -0,0 +1,126 @@
+from datetime import datetime
+
+from sqlalchemy import case, func, select, union, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.user import User, UserRole
+from app.models.project import Project
+from app.models.task import Task, TaskComment, TaskCommentRead, TaskCommentUnread, TaskResource
+
+
+def comment_audience(task):
+    """Ids of the users whose unread counters a comment on this task raises
+
+    That is the project manager, the users assigned to the task and the
+    admins, who see every task.
+    """
+    return {user_id for (user_id,) in db.session.execute(union(
+        select(Project.project_manager_id).where(Project.id == task.project_id),
+        select(TaskResource.user_id).where(TaskResource.task_id == task.id),
+        select(User.id).where(User.role == UserRole.ADMIN)
+    ))}
+
+
+def _insert_or_run(table, row, fallback):
+    """Insert a row in a savepoint; if a concurrent request created it first, run fallback instead"""
+    try:
+        with db.session.begin_nested():
+            db.session.execute(table.insert().values(**row))
+    except IntegrityError:
+        db.session.execute(fallback)
+
+
+def record_comment(task, author_id):
+    """Count a new comment as unread for everyone in the task's audience but its author. The caller commits."""
+    readers = comment_audience(task) - {author_id}
+    if not readers:
+        return
+    table = TaskCommentUnread.__table__
+    now = datetime.utcnow()
+    counted = update(table).where(table.c.task_id == task.id).values(
+        unread_count=table.c.unread_count + 1,
+        last_comment_at=now
+    )
+
+    # One statement for the readers who already have a counter on this task
+    existing = {user_id for (user_id,) in db.session.execute(
+        select(table.c.user_id).where(table.c.task_id == task.id, table.c.user_id.in_(readers))
+    )}
+    if existing:
+        db.session.execute(counted.where(table.c.user_id.in_(existing)))
+    for user_id in sorted(readers - existing):
+        _insert_or_run(
+            table,
+            {'user_id': user_id, 'task_id': task.id, 'unread_count': 1, 'last_comment_at': now},
+            counted.where(table.c.user_id == user_id)
+        )
+
+
+def mark_comments_read(user_id, task_id, last_comment_id):
+    """Record that a user has read a task's comments up to last_comment_id. The caller commits.
+
+    The unread counter drops by the comments of others read now; it is only
+    removed when no newer comment is left, so one posted while the page was
+    rendering stays unread. Returns (the comment id read up to before this
+    call, whether anything was written). Views that change nothing run one
+    primary-key lookup.
+    """
+    receipt = db.session.get(TaskCommentRead, (user_id, task_id))
+    previous = receipt.last_read_comment_id if receipt else None
+    if last_comment_id is None or (previous is not None and previous >= last_comment_id):
+        return previous, False
+
+    table = TaskCommentRead.__table__
+    now = datetime.utcnow()
+    advanced = update(table).where(
+        table.c.user_id == user_id,
+        table.c.task_id == task_id,
+        table.c.last_read_comment_id < last_comment_id
+    ).values(last_read_comment_id=last_comment_id, read_at=now)
+    if receipt:
+        db.session.execute(advanced)
+    else:
+        _insert_or_run(
+            table,
+            {'user_id': user_id, 'task_id': task_id, 'last_read_comment_id': last_comment_id, 'read_at': now},
+            advanced
+        )
+
+    # Comments by others since the previous receipt: read now, or still newer than what was read
+    read, newer = db.session.query(
+        func.count(case((TaskComment.id <= last_comment_id, 1))),
+        func.count(case((TaskComment.id > last_comment_id, 1)))
+    ).filter(
+        TaskComment.task_id == task_id,
+        TaskComment.user_id != user_id,
+        TaskComment.id > (previous or 0)
+    ).one()
+    unread = TaskCommentUnread.__table__
+    mine = (unread.c.user_id == user_id, unread.c.task_id == task_id)
+    if newer:
+        if read:
+            db.session.execute(update(unread).where(*mine).values(unread_count=unread.c.unread_count - read))
+        db.session.execute(unread.delete().where(*mine, unread.c.unread_count <= 0))
+    else:
+        db.session.execute(unread.delete().where(*mine))
+    # The receipt was written with Core, so reload it if this session has it
+    if receipt:
+        db.session.expire(receipt)
+    return previous, True
+
+
+def unread_comment_tasks(user_id, limit=5):
+    """(task, unread count) for a user's tasks with unread comments, most recently commented first"""
+    return db.session.query(Task, TaskCommentUnread.unread_count).join(
+        TaskCommentUnread, TaskCommentUnread.task_id == Task.id
+    ).filter(
+        TaskCommentUnread.user_id == user_id
+    ).order_by(TaskCommentUnread.last_comment_at.desc()).limit(limit).all()
+
+
+def unread_comment_total(user_id):
+    """Unread comments across all of a user's tasks"""
+    return db.session.query(func.coalesce(func.sum(TaskCommentUnread.unread_count), 0)).filter(
+        TaskCommentUnread.user_id == user_id
+    ).scalar()
@@ -0,0 +1,164 @@
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy import func
+
+from app import db
+from app.models.task import Task
+from app.models.schedule import ScheduleVersion
+from app.utils.cache import TTLCache
+
+cpm_cache = TTLCache('critical_path', ttl=3600, maxsize=128)
+
+
+class DependencyCycle(ValueError):
+    pass
+
+
+def follows_parent(child_start, parent_end):
+    """Whether a child task succeeds its parent, rather than being part of the parent's own work
+
+    Only a child starting after its parent's end depends on the parent; one
+    starting on or before it runs inside the parent's dates.
+    """
+    return child_start > parent_end
+
+
+def topological_levels(count, pred, succ):
+    """Level of every node (longest edge path from a source), by Kahn's algorithm one frontier at a time"""
+    indegree = np.bincount(succ, minlength=count)
+    level = np.full(count, -1, dtype=np.int64)
+    
+    # Successors grouped by predecessor (CSR), so a frontier's out-edges are a gather
+    by_pred = np.argsort(pred, kind='stable')
+    targets_by_pred = succ[by_pred]
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(pred, minlength=count))))
+    
+    frontier = np.flatnonzero(indegree == 0)
+    current = 0
+    placed = 0
+    while frontier.size:
+        level[frontier] = current
+        placed += frontier.size
+        counts = offsets[frontier + 1] - offsets[frontier]
+        total = int(counts.sum())
+        firsts = np.repeat(offsets[frontier], counts)
+        within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        targets = targets_by_pred[firsts + within]
+        np.subtract.at(indegree, targets, 1)
+        targets = np.unique(targets)
+        frontier = targets[indegree[targets] == 0]
+        current += 1
+    if placed != count:
+        raise DependencyCycle('Task dependencies contain a cycle')
+    return level
+
+
+def compute_cpm(durations, earliest, pred, succ, lag):
+    """Forward and backward CPM pass over array-backed finish-to-start edges
+
+    All values are whole days. durations and earliest (start-no-earlier-than
+    offsets) are indexed by node; pred, succ and lag describe one edge each,
+    meaning succ may start lag days after pred finishes. Returns ES, EF, LS,
+    LF and slack arrays, with EF/LF exclusive.
+    """
+    durations = np.asarray(durations, dtype=np.int64)
+    count = durations.size
+    pred = np.asarray(pred, dtype=np.int64)
+    succ = np.asarray(succ, dtype=np.int64)
+    lag = np.asarray(lag, dtype=np.int64)
+
+    level = topological_levels(count, pred, succ)
+    depth = int(level.max()) + 1 if count else 0
+
+    # Edges and nodes grouped by level, so each pass is one vectorized step per level
+    edges_by_succ_level = np.argsort(level[succ], kind='stable')
+    succ_level_bounds = np.searchsorted(level[succ][edges_by_succ_level], np.arange(depth + 1))
+    edges_by_pred_level = np.argsort(level[pred], kind='stable')
+    pred_level_bounds = np.searchsorted(level[pred][edges_by_pred_level], np.arange(depth + 1))
+    nodes_by_level = np.argsort(level, kind='stable')
+    node_level_bounds = np.searchsorted(level[nodes_by_level], np.arange(depth + 1))
+
+    # Forward pass: earliest start and finish
+    es = np.asarray(earliest, dtype=np.int64).copy()
+    ef = es + durations
+    for current in range(1, depth):
+        edges = edges_by_succ_level[succ_level_bounds[current]:succ_level_bounds[current + 1]]
+        np.maximum.at(es, succ[edges], ef[pred[edges]] + lag[edges])
+        nodes = nodes_by_level[node_level_bounds[current]:node_level_bounds[current + 1]]
+        ef[nodes] = es[nodes] + durations[nodes]
+
+    # Backward pass: latest finish and start
+    finish = int(ef.max()) if count else 0
+    lf = np.full(count, finish, dtype=np.int64)
+    ls = lf - durations
+    for current in range(depth - 2, -1, -1):
+        edges = edges_by_pred_level[pred_level_bounds[current]:pred_level_bounds[current + 1]]
+        np.minimum.at(lf, pred[edges], ls[succ[edges]] - lag[edges])
+        nodes = nodes_by_level[node_level_bounds[current]:node_level_bounds[current + 1]]
+        ls[nodes] = lf[nodes] - durations[nodes]
+
+    return {'es': es, 'ef': ef, 'ls': ls, 'lf': lf, 'slack': ls - es, 'level': level, 'finish': finish}
+
+
+def _cache_key(project_id):
+    """Changes whenever the project's tasks or schedule version change"""
+    version_id = db.session.query(func.max(ScheduleVersion.id)).filter_by(project_id=project_id).scalar()
+    count, updated_at = db.session.query(func.count(Task.id), func.max(Task.updated_at)).filter(
+        Task.project_id == project_id).one()
+    return (project_id, version_id, count, updated_at)
+
+
+def project_critical_path(project_id):
+    """Critical path, slack and early/late dates of every task in a project
+
+    A task starting after its parent ends depends on it, starting
+    dependency_days after the parent finishes; a task starting within its
+    parent's dates is part of it and has no edge. Every task also keeps its
+    planned start as a start-no-earlier-than constraint. Cached per
+    schedule version.
+    """
+    return cpm_cache.get_or_set(_cache_key(project_id), lambda: _build_critical_path(project_id))
+
+
+def _build_critical_path(project_id):
+    rows = db.session.query(
+        Task.id, Task.parent_id, Task.start_date, Task.end_date, Task.dependency_days
+    ).filter(Task.project_id == project_id).order_by(Task.id).all()
+    if not rows:
+        return {'project_id': project_id, 'finish': None, 'critical_path': [], 'tasks': {}}
+
+    ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows))
+    index = {task_id: position for position, task_id in enumerate(ids.tolist())}
+    origin = min(row.start_date for row in rows)
+    earliest = np.fromiter(((row.start_date - origin).days for row in rows), dtype=np.int64, count=len(rows))
+    durations = np.fromiter(((row.end_date - row.start_date).days + 1 for row in rows), dtype=np.int64, count=len(rows))
+
+    ends = {row.id: row.end_date for row in rows}
+    edges = [(index[row.parent_id], index[row.id], row.dependency_days or 0)
+             for row in rows if row.parent_id in index and follows_parent(row.start_date, ends[row.parent_id])]
+    edge_array = np.array(edges, dtype=np.int64).reshape(-1, 3)
+    result = compute_cpm(durations, earliest, edge_array[:, 0], edge_array[:, 1], edge_array[:, 2])
+
+    def day(offset):
+        return (origin + timedelta(days=int(offset))).isoformat()
+
+    critical = result['slack'] == 0
+    order = np.lexsort((result['es'], result['level']))
+    tasks = {}
+    for position, task_id in enumerate(ids.tolist()):
+        tasks[task_id] = {
+            'earliest_start': day(result['es'][position]),
+            'earliest_finish': day(result['ef'][position] - 1),
+            'latest_start': day(result['ls'][position]),
+            'latest_finish': day(result['lf'][position] - 1),
+            'slack_days': int(result['slack'][position]),
+            'critical': bool(critical[position])
+        }
+
+    return {
+        'project_id': project_id,
+        'finish': day(result['finish'] - 1),
+        'critical_path': [int(ids[position]) for position in order if critical[position]],
+        'tasks': tasks
+    }
@@ -0,0 +1,180 @@
+from datetime import date, timedelta
+
+from sqlalchemy import func
+
+from app import db
+from app.models.cache import bump_cache_versions, cache_versions
+from app.models.user import UserRole
+from app.models.project import Project, ProjectStatus
+from app.models.task import Task, TaskResource, TaskStatus
+from app.utils.cache import TTLCache
+from app.utils.comment_tracking import unread_comment_tasks, unread_comment_total
+
+# Seconds a summary may be served without an invalidation
+DASHBOARD_TTL = {
+    UserRole.ADMIN: 60,
+    UserRole.PROJECT_MANAGER: 300,
+    UserRole.TEAM_MEMBER: 300
+}
+
+dashboard_cache = TTLCache('dashboard', ttl=300, maxsize=4096)
+
+# CacheVersion of the figures every summary shows, bumped by project writes
+DASHBOARD_PROJECTS = 'dashboard:projects'
+# CacheVersion of the summary admins share
+DASHBOARD_ADMINS = 'dashboard:admins'
+
+
+def _project_row(project):
+    return {
+        'id': project.id,
+        'project_id': project.project_id,
+        'name': project.name,
+        'start_date': project.start_date,
+        'end_date': project.end_date,
+        'status': project.status,
+        'project_manager_id': project.project_manager_id
+    }
+
+
+def _task_row(task):
+    return {
+        'id': task.id,
+        'project_id': task.project_id,
+        'name': task.name,
+        'start_date': task.start_date,
+        'end_date': task.end_date,
+        'status': task.status,
+        'is_milestone': task.is_milestone
+    }
+
+
+def _cache_key(user):
+    # Admins all see the same summary, so they share one entry
+    if user.role == UserRole.ADMIN:
+        return (UserRole.ADMIN.name, None)
+    return (user.role.name, user.id)
+
+
+def _user_version_name(user_id):
+    return f'dashboard:user:{user_id}'
+
+
+def _version_names(user):
+    if user.role == UserRole.ADMIN:
+        return (DASHBOARD_PROJECTS, DASHBOARD_ADMINS)
+    return (DASHBOARD_PROJECTS, _user_version_name(user.id))
+
+
+def _invalidate(names):
+    # Its own transaction: callers invalidate once their write has committed
+    bump_cache_versions(db.session.connection(), names)
+    db.session.commit()
+
+
+def build_dashboard_summary(user):
+    """Run the dashboard queries for a user and return plain, cacheable data"""
+    today = date.today()
+    due_window = Task.end_date.between(today, today + timedelta(days=7))
+
+    active_projects_count = Project.query.filter_by(status=ProjectStatus.APPROVED_ACTIVE).count()
+
+    if user.role == UserRole.PROJECT_MANAGER:
+        # Project managers see only their projects
+        active_projects = Project.query.filter_by(
+            project_manager_id=user.id,
+            status=ProjectStatus.APPROVED_ACTIVE
+        ).all()
+
+        tasks_due_soon = Task.query.join(Project).filter(
+            Project.project_manager_id == user.id,
+            Project.status == ProjectStatus.APPROVED_ACTIVE,
+            due_window,
+            Task.status != TaskStatus.COMPLETED
+        ).order_by(Task.end_date).limit(5).all()
+    else:
+        active_projects = Project.query.filter_by(status=ProjectStatus.APPROVED_ACTIVE).limit(5).all()
+
+        if user.role == UserRole.TEAM_MEMBER:
+            # Team members see the tasks they are assigned to
+            assigned = db.session.query(TaskResource.task_id).filter_by(user_id=user.id)
+            tasks_due_soon = Task.query.filter(
+                Task.id.in_(assigned),
+                due_window,
+                Task.status != TaskStatus.COMPLETED
+            ).order_by(Task.end_date).limit(5).all()
+        else:
+            tasks_due_soon = Task.query.filter(
+                due_window,
+                Task.status != TaskStatus.COMPLETED
+            ).order_by(Task.end_date).limit(5).all()
+
+    # Project status counts for chart
+    project_status_counts = db.session.query(
+        Project.status, func.count(Project.id)
+    ).group_by(Project.status).all()
+
+    return {
+        'active_projects_count': active_projects_count,
+        'active_projects': [_project_row(project) for project in active_projects],
+        'tasks_due_soon': [_task_row(task) for task in tasks_due_soon],
+        'status_data': {status.value: count for status, count in project_status_counts}
+    }
+
+
+def unread_comments_summary(user_id):
+    """The user's unread comment total and most recently commented tasks, from the counter table"""
+    tasks = unread_comment_tasks(user_id)
+    return {
+        'unread_comments_count': unread_comment_total(user_id),
+        'tasks_with_comments': [dict(_task_row(task), unread_comments=count) for task, count in tasks]
+    }
+
+
+def get_dashboard_summary(user):
+    """Cached dashboard summary for a user, rebuilt on miss, expiry, a new day, or an invalidation
+
+    Entries are stamped with the summary's CacheVersion rows, read in one
+    primary-key query, so an invalidation in any worker process retires
+    them in all of them. The unread comments are read fresh every time: they are per user even
+    where the rest is shared, and a read in one worker process has to show
+    in all of them. The counter table answers with two indexed lookups on
+    the user.
+    """
+    stamp = (cache_versions(*_version_names(user)), date.today())
+    key = _cache_key(user)
+
+    entry = dashboard_cache.get(key)
+    if entry is not None and entry[0] == stamp:
+        summary = entry[1]
+    else:
+        summary = build_dashboard_summary(user)
+        dashboard_cache.set(key, (stamp, summary), ttl=DASHBOARD_TTL.get(user.role))
+
+    return dict(summary, **unread_comments_summary(user.id))
+
+
+def invalidate_dashboards_for_users(user_ids):
+    """Retire the summaries of the given users plus the shared admin summary. Commits."""
+    _invalidate([DASHBOARD_ADMINS] + [_user_version_name(user_id) for user_id in set(user_ids)])
+
+
+def invalidate_dashboards_for_task(task, moved_task_ids=()):
+    """A task write touches its project manager, its assignees and the admins
+
+    moved_task_ids are other tasks of the same project the write changed,
+    such as rescheduled dependents; their assignees are dropped as well.
+    """
+    task_ids = {task.id, *moved_task_ids}
+    user_ids = {user_id for (user_id,) in db.session.query(TaskResource.user_id).filter(
+        TaskResource.task_id.in_(task_ids)
+    ).distinct()}
+    project_manager_id = db.session.query(Project.project_manager_id).filter_by(id=task.project_id).scalar()
+    if project_manager_id:
+        user_ids.add(project_manager_id)
+    invalidate_dashboards_for_users(user_ids)
+
+
+def invalidate_all_dashboards():
+    """Project writes change figures every summary shows. Commits."""
+    _invalidate([DASHBOARD_PROJECTS])
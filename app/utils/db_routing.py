@@ -0,0 +1,112 @@
+import os
+import time
+
+from flask import current_app, g, has_request_context, request, session as http_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND = 'replica'
+
+# Endpoints that only read; their queries go to the replica when one is configured
+READ_ONLY_ENDPOINTS = (
+    'main.dashboard',
+    'project.index',
+    'project.versions',
+    'project.export',
+    'task.gantt_chart',
+    'task.schedule_versions',
+    'task.schedule_diff',
+    'task.critical_path',
+    'task.resource_heatmap',
+    'task.resource_overallocations',
+    'task.export_project_tasks'
+)
+
+# Seconds a user keeps reading from the primary after one of their commits,
+# so replica lag never hides their own writes
+REPLICA_STICKY_SECONDS = 10
+
+STICKY_SESSION_KEY = '_primary_until'
+
+
+def engine_options(url, prefix='DB'):
+    """Pool settings for a database URL from <prefix>_POOL_* environment variables
+
+    SQLite keeps Flask-SQLAlchemy's own pool choice, which does not take
+    these options.
+    """
+    if url.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': int(os.environ.get(f'{prefix}_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get(f'{prefix}_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get(f'{prefix}_POOL_TIMEOUT', 30)),
+        # Replace connections before server or proxy idle timeouts (often 300s) close them
+        'pool_recycle': int(os.environ.get(f'{prefix}_POOL_RECYCLE', 280)),
+        'pool_pre_ping': os.environ.get(f'{prefix}_POOL_PRE_PING', 'true').lower() in ['true', 'on', '1']
+    }
+
+
+def _reads_from_replica(session):
+    if not has_request_context() or not g.get('use_replica') or g.get('committed_to_primary'):
+        return False
+    # Once this request has written anything, stay on the primary
+    if session.info.get('wrote') or session._flushing or session.new or session.dirty or session.deleted:
+        return False
+    return True
+
+
+class RoutingSession(Session):
+    """Session that sends the queries of read-only requests to the replica bind
+
+    Anything that would go to the default engine goes to the replica instead
+    while the request is marked read-only and nothing has been written yet.
+    Models with their own bind key are left alone.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is None and _reads_from_replica(self):
+            engines = self._db.engines
+            if engine is engines.get(None) and REPLICA_BIND in engines:
+                return engines[REPLICA_BIND]
+        return engine
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_written(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _remember_commit(session):
+    # Savepoint releases fire this too; only the outermost commit is visible to others
+    if session.in_nested_transaction():
+        return
+    if session.info.pop('wrote', False) and has_request_context():
+        g.committed_to_primary = True
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_writes(session):
+    if not session.in_nested_transaction():
+        session.info.pop('wrote', None)
+
+
+def init_read_replica(app):
+    """Mark read-only requests and keep users on the primary right after their own commits"""
+    read_only = set(app.config.get('READ_REPLICA_ENDPOINTS', READ_ONLY_ENDPOINTS))
+
+    @app.before_request
+    def _choose_database():
+        if REPLICA_BIND not in current_app.config.get('SQLALCHEMY_BINDS', {}):
+            return
+        sticky_until = http_session.get(STICKY_SESSION_KEY, 0)
+        g.use_replica = request.endpoint in read_only and sticky_until < time.time()
+
+    @app.after_request
+    def _stick_to_primary(response):
+        if g.get('committed_to_primary'):
+            sticky = current_app.config.get('REPLICA_STICKY_SECONDS', REPLICA_STICKY_SECONDS)
+            http_session[STICKY_SESSION_KEY] = time.time() + sticky
+        return response
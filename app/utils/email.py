@@ -0,0 +1,188 @@
+from datetime import datetime, timedelta
+import logging
+import secrets
+import smtplib
+import threading
+
+from flask import current_app
+from flask_mail import Message
+
+from app import db, mail
+from app.models.outbox import OutboxEmail, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 8
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+# How long a claimed message stays reserved before another worker may retry it
+CLAIM_LEASE_SECONDS = 300
+POLL_SECONDS = 2
+# An idle SMTP connection is closed after this many empty polls
+IDLE_POLLS_BEFORE_DISCONNECT = 15
+
+
+def queue_email(subject, recipients, body, sender=None):
+    """Add an email to the outbox in the current transaction
+
+    The message is written with the caller's commit and delivered by the
+    outbox worker, so the request never waits on the mail server. Bodies
+    can carry temporary passwords and reset links, so the worker blanks
+    them once a message is sent or given up on; only the envelope stays.
+    """
+    email = OutboxEmail(
+        subject=subject,
+        recipients=','.join(recipients),
+        sender=sender,
+        body=body
+    )
+    db.session.add(email)
+    ensure_outbox_worker(current_app._get_current_object())
+    return email
+
+
+def _retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def claim_due_emails(limit=BATCH_SIZE):
+    """Reserve up to `limit` due messages for this worker and return them"""
+    now = datetime.utcnow()
+    due_ids = [email_id for (email_id,) in db.session.query(OutboxEmail.id).filter(
+        OutboxEmail.status.in_([OutboxStatus.PENDING, OutboxStatus.SENDING]),
+        OutboxEmail.next_attempt_at <= now
+    ).order_by(OutboxEmail.next_attempt_at).limit(limit)]
+    if not due_ids:
+        return []
+
+    # The conditional UPDATE decides which worker gets each message
+    token = secrets.token_hex(16)
+    OutboxEmail.query.filter(
+        OutboxEmail.id.in_(due_ids),
+        OutboxEmail.status.in_([OutboxStatus.PENDING, OutboxStatus.SENDING]),
+        OutboxEmail.next_attempt_at <= now
+    ).update({
+        'status': OutboxStatus.SENDING,
+        'claim_token': token,
+        'next_attempt_at': now + timedelta(seconds=CLAIM_LEASE_SECONDS)
+    }, synchronize_session=False)
+    db.session.commit()
+
+    return OutboxEmail.query.filter_by(claim_token=token, status=OutboxStatus.SENDING).all()
+
+
+class OutboxDeliverer:
+    """Sends outbox messages over one SMTP connection that is kept open between batches"""
+
+    def __init__(self):
+        self.connection = None
+        self.idle_polls = 0
+
+    def _connect(self):
+        if self.connection is None:
+            self.connection = mail.connect().__enter__()
+        return self.connection
+
+    def disconnect(self):
+        if self.connection is not None:
+            try:
+                self.connection.__exit__(None, None, None)
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.connection = None
+
+    def _send(self, email):
+        message = Message(
+            email.subject,
+            recipients=email.recipient_list(),
+            body=email.body,
+            sender=email.sender or current_app.config.get('MAIL_DEFAULT_SENDER')
+        )
+        try:
+            self._connect().send(message)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped an idle connection; reconnect once
+            self.disconnect()
+            self._connect().send(message)
+
+    def deliver_batch(self, limit=BATCH_SIZE):
+        """Send one batch of due messages; returns (sent, failed)
+
+        Each message's outcome is committed before the next is sent; if the
+        batch stops early, the rest keep their claim until the lease runs out.
+        """
+        emails = claim_due_emails(limit)
+        if not emails:
+            self.idle_polls += 1
+            if self.idle_polls >= IDLE_POLLS_BEFORE_DISCONNECT:
+                self.disconnect()
+            return 0, 0
+        self.idle_polls = 0
+
+        sent = failed = 0
+        for email in emails:
+            email.attempts += 1
+            try:
+                self._send(email)
+            except (smtplib.SMTPException, OSError) as e:
+                self.disconnect()
+                email.last_error = str(e)
+                if email.attempts >= MAX_ATTEMPTS:
+                    email.status = OutboxStatus.FAILED
+                    email.body = ''
+                    logger.error('Giving up on outbox email %s after %s attempts: %s', email.id, email.attempts, e)
+                else:
+                    email.status = OutboxStatus.PENDING
+                    email.next_attempt_at = datetime.utcnow() + _retry_delay(email.attempts)
+                failed += 1
+            else:
+                email.status = OutboxStatus.SENT
+                email.sent_at = datetime.utcnow()
+                email.last_error = None
+                email.body = ''
+                sent += 1
+            email.claim_token = None
+            # Settled one by one, so a crash later in the batch cannot send this message again
+            db.session.commit()
+        return sent, failed
+
+
+def run_outbox_worker(app, stop_event=None, once=False):
+    """Deliver outbox messages until stopped (or until the outbox is empty with once=True)"""
+    deliverer = OutboxDeliverer()
+    stop_event = stop_event or threading.Event()
+    with app.app_context():
+        try:
+            while not stop_event.is_set():
+                try:
+                    sent, failed = deliverer.deliver_batch()
+                except Exception:
+                    logger.exception('Outbox delivery failed')
+                    db.session.rollback()
+                    deliverer.disconnect()
+                    sent = failed = 0
+                finally:
+                    db.session.remove()
+                if sent or failed:
+                    continue
+                if once:
+                    break
+                stop_event.wait(POLL_SECONDS)
+        finally:
+            deliverer.disconnect()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def ensure_outbox_worker(app):
+    """Start this process's background delivery thread unless disabled or already running"""
+    global _worker
+    if app.config.get('MAIL_OUTBOX_WORKER', 'thread') != 'thread':
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=run_outbox_worker, args=(app,), name='outbox-worker', daemon=True)
+            _worker.start()
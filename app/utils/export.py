@@ -0,0 +1,227 @@
+import csv
+from datetime import date, datetime
+import enum
+import io
+import re
+from xml.sax.saxutils import escape, quoteattr
+import zipfile
+
+from flask import Response, stream_with_context
+from sqlalchemy import and_
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.models.user import User, display_name
+from app.models.project import Project
+from app.models.task import Task, TaskClosure
+from app.utils.task_import import CSV_COLUMNS, FORMULA_GUARD, FORMULA_PREFIXES
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH = 2000
+# Buffered output is sent once it reaches this size
+FLUSH_BYTES = 64 * 1024
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+TASK_EXPORT_COLUMNS = CSV_COLUMNS + ('level', 'hours')
+PROJECT_EXPORT_COLUMNS = ('project_id', 'name', 'project_type', 'status', 'start_date', 'end_date',
+                          'project_manager', 'customer_po_number', 'created_at')
+
+XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+# Characters Excel does not allow in a sheet name
+SHEET_NAME_ILLEGAL = re.compile(r'[\[\]:*?/\\]')
+
+
+def stream_rows(query):
+    """Iterate a column query through a server-side cursor, EXPORT_BATCH rows at a time"""
+    return query.yield_per(EXPORT_BATCH)
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'yes' if value else 'no'
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        # Enums export their display value, which the importer accepts too
+        return value.value
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES + (FORMULA_GUARD,)):
+        # Guarded, and unguarded again by the importer
+        return FORMULA_GUARD + value
+    return value
+
+
+def csv_chunks(columns, rows):
+    """CSV output in chunks of about FLUSH_BYTES; the header goes out before the query runs"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue().encode('utf-8-sig')
+    buffer.seek(0)
+    buffer.truncate()
+
+    for row in rows:
+        writer.writerow([_cell(value) for value in row])
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkSink:
+    """Write-only, unseekable file object for zipfile that hands out what was written"""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    )
+}
+
+
+def _xlsx_row(values):
+    cells = []
+    for value in values:
+        value = _cell(value)
+        if isinstance(value, (int, float)):
+            cells.append(f'<c t="n"><v>{value}</v></c>')
+        else:
+            text = escape(XML_ILLEGAL.sub('', str(value)))
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return '<row>' + ''.join(cells) + '</row>'
+
+
+def _sheet_name(name):
+    """A name Excel accepts: no []:*?/\\, no quote at either end, at most 31 characters"""
+    name = SHEET_NAME_ILLEGAL.sub('', XML_ILLEGAL.sub('', name))[:31].strip("'")
+    return name or 'Sheet1'
+
+
+def xlsx_chunks(sheet_name, columns, rows):
+    """A single-sheet XLSX workbook, written as a zip stream in chunks
+
+    Cells are inline strings and plain numbers, so the workbook needs no
+    shared-string table and nothing has to be kept until the end.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        for name, content in _XLSX_PARTS.items():
+            workbook.writestr(name, content)
+        workbook.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name={quoteattr(_sheet_name(sheet_name))} sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ))
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + _xlsx_row(columns)
+            ).encode('utf-8'))
+            yield sink.drain()
+
+            pending = []
+            size = 0
+            for row in rows:
+                line = _xlsx_row(row)
+                pending.append(line)
+                size += len(line)
+                if size >= FLUSH_BYTES:
+                    sheet.write(''.join(pending).encode('utf-8'))
+                    pending = []
+                    size = 0
+                    data = sink.drain()
+                    if data:
+                        yield data
+            sheet.write((''.join(pending) + '</sheetData></worksheet>').encode('utf-8'))
+    yield sink.drain()
+
+
+def export_response(file_format, filename, sheet_name, columns, rows):
+    """Chunked download response; rows is consumed lazily while the body is sent"""
+    if file_format == 'xlsx':
+        chunks = xlsx_chunks(sheet_name, columns, rows)
+    else:
+        file_format = 'csv'
+        chunks = csv_chunks(columns, rows)
+    response = Response(stream_with_context(chunks), mimetype=EXPORT_FORMATS[file_format])
+    response.headers.set('Content-Disposition', 'attachment', filename=f'{filename}.{file_format}')
+    # Ask a buffering front server (nginx) to pass chunks straight through
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def task_tree_rows(project_id):
+    """A project's tasks in importable CSV layout, parents before children
+
+    Tasks come grouped by their top-level task and then by depth, from one
+    closure-table query streamed off a server-side cursor.
+    """
+    root = aliased(Task)
+    query = db.session.query(
+        Task.id, Task.name, Task.description, Task.start_date, Task.end_date, Task.parent_id,
+        Task.dependency_days, Task.is_milestone, Task.is_active, Task.status,
+        TaskClosure.depth, Task.hours
+    ).join(TaskClosure, TaskClosure.descendant_id == Task.id).join(
+        root, and_(root.id == TaskClosure.ancestor_id, root.parent_id == None)
+    ).filter(Task.project_id == project_id).order_by(
+        TaskClosure.ancestor_id, TaskClosure.depth, Task.id)
+    return stream_rows(query)
+
+
+def project_list_rows(query):
+    """Rows for the filtered project list, newest first"""
+    query = query.outerjoin(User, User.id == Project.project_manager_id).with_entities(
+        Project.project_id, Project.name, Project.project_type, Project.status,
+        Project.start_date, Project.end_date,
+        User.username, User.first_name, User.last_name,
+        Project.customer_po_number, Project.created_at
+    ).order_by(Project.created_at.desc(), Project.id.desc())
+    for row in stream_rows(query):
+        yield row[:6] + (display_name(row.username, row.first_name, row.last_name),) + row[9:]
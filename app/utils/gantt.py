@@ -0,0 +1,63 @@
+from app import db
+from app.models.user import User, display_name
+from app.models.task import Task, TaskResource, TaskStatus
+
+
+def _progress(status):
+    if status == TaskStatus.COMPLETED:
+        return 100
+    if status == TaskStatus.IN_PROGRESS:
+        return 50
+    return 0
+
+
+def load_gantt_data(project_id):
+    """Build the gantt chart rows for a project in a fixed number of queries
+
+    Tasks and resource names are fetched with one query each; parent names are
+    resolved from the already loaded tasks, with at most one extra query for
+    parents that live outside the project.
+    """
+    # Query 1: all tasks of the project, plain columns only
+    tasks = db.session.query(
+        Task.id, Task.name, Task.start_date, Task.end_date,
+        Task.status, Task.is_milestone, Task.parent_id
+    ).filter(Task.project_id == project_id).order_by(Task.id).all()
+
+    if not tasks:
+        return []
+
+    # Query 2: resource assignments joined with their users
+    resource_rows = db.session.query(
+        TaskResource.task_id, User.username, User.first_name, User.last_name
+    ).join(User, User.id == TaskResource.user_id).join(
+        Task, Task.id == TaskResource.task_id
+    ).filter(Task.project_id == project_id).order_by(TaskResource.id).all()
+
+    resource_names = {}
+    for task_id, username, first_name, last_name in resource_rows:
+        resource_names.setdefault(task_id, []).append(display_name(username, first_name, last_name))
+
+    # Parent names come from the tasks we already have
+    names = {task.id: task.name for task in tasks}
+    missing_parents = {task.parent_id for task in tasks if task.parent_id and task.parent_id not in names}
+    if missing_parents:
+        # Query 3 (rare): parents that belong to another project
+        for parent_id, parent_name in db.session.query(Task.id, Task.name).filter(Task.id.in_(missing_parents)):
+            names[parent_id] = parent_name
+
+    gantt_data = []
+    for task in tasks:
+        gantt_data.append({
+            'id': task.id,
+            'name': task.name,
+            'start': task.start_date.strftime('%Y-%m-%d'),
+            'end': task.end_date.strftime('%Y-%m-%d'),
+            'progress': _progress(task.status),
+            'dependencies': names.get(task.parent_id) if task.parent_id else None,
+            'resources': ', '.join(resource_names.get(task.id, [])),
+            'status': task.status.value,
+            'is_milestone': task.is_milestone
+        })
+
+    return gantt_data
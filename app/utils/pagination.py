@@ -0,0 +1,96 @@
+from datetime import datetime
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import and_, or_
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='keyset-cursor')
+
+
+def encode_cursor(created_at, row_id):
+    """Opaque, signed cursor for a (created_at, id) position"""
+    return _serializer().dumps([created_at.isoformat(), row_id])
+
+
+def decode_cursor(cursor):
+    """Position from a cursor, or None if it is missing or has been tampered with"""
+    if not cursor:
+        return None
+    try:
+        created_at, row_id = _serializer().loads(cursor)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (BadSignature, ValueError, TypeError):
+        return None
+
+
+class KeysetPage:
+    """One page of a seek-paginated query, newest first
+
+    Mirrors the attributes templates use on Flask-SQLAlchemy's Pagination
+    (items, has_next, has_prev, total, per_page) and adds the cursors for
+    the neighbouring pages.
+    """
+
+    def __init__(self, items, per_page, total, next_cursor, prev_cursor):
+        self.items = items
+        self.per_page = per_page
+        self.total = total
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+def keyset_paginate(query, created_col, id_col, per_page, after=None, before=None, total=None):
+    """Seek to the page after (or before) a cursor on (created_at DESC, id DESC)
+
+    Uses a range condition on the ordering columns instead of OFFSET, so every
+    page costs the same index range scan no matter how deep it is.
+    """
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before)
+
+    if before_key:
+        created_at, row_id = before_key
+        query = query.filter(or_(
+            created_col > created_at,
+            and_(created_col == created_at, id_col > row_id)
+        )).order_by(created_col.asc(), id_col.asc())
+    else:
+        if after_key:
+            created_at, row_id = after_key
+            query = query.filter(or_(
+                created_col < created_at,
+                and_(created_col == created_at, id_col < row_id)
+            ))
+        query = query.order_by(created_col.desc(), id_col.desc())
+
+    # One extra row tells us whether there is another page in this direction
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if before_key:
+        rows.reverse()
+
+    def cursor_for(row):
+        return encode_cursor(getattr(row, created_col.key), getattr(row, id_col.key))
+
+    if before_key:
+        next_cursor = cursor_for(rows[-1]) if rows else None
+        prev_cursor = cursor_for(rows[0]) if rows and has_more else None
+    else:
+        next_cursor = cursor_for(rows[-1]) if rows and has_more else None
+        prev_cursor = cursor_for(rows[0]) if rows and after_key else None
+
+    return KeysetPage(rows, per_page, total, next_cursor, prev_cursor)
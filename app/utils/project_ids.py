@@ -0,0 +1,114 @@
+from collections import deque
+import os
+import threading
+
+from flask import current_app
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.project import Project, ProjectIdSequence
+
+# 5-digit numeric project IDs
+MIN_PROJECT_ID = 10000
+MAX_PROJECT_ID = 99999
+SEQUENCE_NAME = 'project_id'
+DEFAULT_BLOCK_SIZE = 20
+
+
+class ProjectIdSpaceExhausted(RuntimeError):
+    pass
+
+
+class ProjectIdAllocator:
+    """Hands out project IDs from blocks reserved in the ProjectIdSequence row
+
+    Each process reserves a block of consecutive values with one atomic UPDATE
+    and drops the values already taken by existing projects with one range
+    query, so a create normally needs no lookup at all. Blocks never overlap,
+    which keeps concurrent creates in different workers apart. When the
+    counter passes the top of the space it wraps around and reuses the gaps.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._free = deque()
+        self._pid = os.getpid()
+
+    def allocate(self):
+        with self._lock:
+            # A forked worker must not reuse its parent's block
+            if self._pid != os.getpid():
+                self._free.clear()
+                self._pid = os.getpid()
+            
+            checked = 0
+            while not self._free:
+                if checked > MAX_PROJECT_ID - MIN_PROJECT_ID:
+                    raise ProjectIdSpaceExhausted('All 5-digit project IDs are in use')
+                start, end = self._reserve_block()
+                checked += end - start + 1
+                self._free.extend(self._unused_in(start, end))
+            return str(self._free.popleft())
+
+    def _block_size(self):
+        return current_app.config.get('PROJECT_ID_BLOCK_SIZE', DEFAULT_BLOCK_SIZE)
+
+    def _reserve_block(self):
+        """Atomically move the sequence forward and return the reserved range"""
+        size = self._block_size()
+        table = ProjectIdSequence.__table__
+        with db.engine.begin() as connection:
+            result = connection.execute(
+                update(table).where(table.c.name == SEQUENCE_NAME).values(next_value=table.c.next_value + size)
+            )
+            if result.rowcount == 0:
+                try:
+                    with connection.begin_nested():
+                        connection.execute(table.insert().values(name=SEQUENCE_NAME, next_value=MIN_PROJECT_ID + size))
+                    return MIN_PROJECT_ID, MIN_PROJECT_ID + size - 1
+                except IntegrityError:
+                    # Another worker created the row first; take the normal path
+                    connection.execute(
+                        update(table).where(table.c.name == SEQUENCE_NAME).values(next_value=table.c.next_value + size)
+                    )
+            
+            start = connection.execute(
+                select(table.c.next_value).where(table.c.name == SEQUENCE_NAME)
+            ).scalar() - size
+            if start > MAX_PROJECT_ID:
+                # Wrap around and look for gaps left by deleted projects
+                start = MIN_PROJECT_ID
+                connection.execute(
+                    update(table).where(table.c.name == SEQUENCE_NAME).values(next_value=MIN_PROJECT_ID + size)
+                )
+        return start, min(start + size - 1, MAX_PROJECT_ID)
+
+    def _unused_in(self, start, end):
+        # Fixed-width strings sort like the numbers, so this is an index range scan
+        used = {int(value) for (value,) in db.session.query(Project.project_id).filter(
+            Project.project_id.between(str(start), str(end))
+        )}
+        return [value for value in range(start, end + 1) if value not in used]
+
+
+_allocator = ProjectIdAllocator()
+
+
+def allocate_project_id():
+    """Next free 5-digit project ID for this process"""
+    return _allocator.allocate()
+
+
+def project_id_usage():
+    """How much of the project ID space is taken"""
+    total = MAX_PROJECT_ID - MIN_PROJECT_ID + 1
+    used = db.session.query(Project.id).count()
+    next_value = db.session.query(ProjectIdSequence.next_value).filter_by(name=SEQUENCE_NAME).scalar()
+    return {
+        'total': total,
+        'used': used,
+        'free': total - used,
+        'used_ratio': round(used / total, 4),
+        'sequence_position': next_value
+    }
@@ -0,0 +1,52 @@
+from sqlalchemy import func
+
+from app import db
+from app.models.project import Project, ProjectSearchTrigram, SEARCH_FIELDS, trigrams
+
+BATCH_SIZE = 5000
+
+
+def _candidate_ids(field, text):
+    """Projects whose field holds every trigram of text, via the trigram index"""
+    grams = trigrams(text)
+    return db.session.query(ProjectSearchTrigram.project_id).filter(
+        ProjectSearchTrigram.field == field,
+        ProjectSearchTrigram.trigram.in_(grams)
+    ).group_by(ProjectSearchTrigram.project_id).having(
+        func.count(ProjectSearchTrigram.trigram) == len(grams)
+    )
+
+
+def contains_filter(attribute, text):
+    """Substring condition on a Project column that can use the trigram index
+
+    Terms of three or more characters narrow the rows through the index first;
+    the LIKE then only re-checks the candidates. Shorter terms have no trigram
+    and fall back to the plain LIKE, as do terms carrying LIKE wildcards.
+    """
+    field = next(key for key, name in SEARCH_FIELDS.items() if name == attribute)
+    column = getattr(Project, attribute)
+    condition = column.like(f'%{text}%')
+    if len(text) >= 3 and '%' not in text and '_' not in text:
+        condition = Project.id.in_(_candidate_ids(field, text)) & condition
+    return condition
+
+
+def rebuild_project_search_index():
+    """Re-create the whole trigram index from the project table. The caller commits."""
+    table = ProjectSearchTrigram.__table__
+    db.session.execute(table.delete())
+    
+    written = 0
+    batch = []
+    for project_id, code, name in db.session.query(Project.id, Project.project_id, Project.name).all():
+        for field, value in (('i', code), ('n', name)):
+            batch.extend({'field': field, 'trigram': trigram, 'project_id': project_id} for trigram in trigrams(value))
+        if len(batch) >= BATCH_SIZE:
+            db.session.execute(table.insert(), batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+        written += len(batch)
+    return written
@@ -0,0 +1,112 @@
+from collections import deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam
+
+from app import db
+from app.models.task import Task, TaskClosure
+from app.models.schedule import TaskVersionHistory
+from app.utils.critical_path import follows_parent
+from app.utils.working_time import get_working_calendar
+
+
+def _successor_shift(finish_delta, slack):
+    """Days a successor moves when its predecessor's finish moves by finish_delta
+
+    A later finish first uses up the successor's free slack and pushes it
+    by the rest. An earlier finish pulls the successor in only when it was
+    scheduled tight against the predecessor.
+    """
+    if finish_delta > 0:
+        return max(finish_delta - max(slack, 0), 0)
+    if finish_delta < 0 and slack == 0:
+        return finish_delta
+    return 0
+
+
+def reschedule_dependents(task, old_end_date):
+    """Shift the tasks downstream of an edited task and return what moved
+
+    Successors are the child tasks that start dependency_days after their
+    parent finishes; a child starting on or before its parent's end is part
+    of the parent's work, not a successor, and stays put (the same model as
+    the critical path). Only the edited
+    task's subtree is loaded, in one closure-table query, and only tasks whose
+    predecessor actually moved are marked dirty and visited. The moves are
+    written with one executemany UPDATE; the caller commits.
+    """
+    finish_delta = (task.end_date - old_end_date).days
+    if finish_delta == 0:
+        return []
+
+    rows = db.session.query(
+        Task.id, Task.parent_id, Task.start_date, Task.end_date, Task.dependency_days
+    ).join(TaskClosure, TaskClosure.descendant_id == Task.id).filter(
+        TaskClosure.ancestor_id == task.id,
+        TaskClosure.depth > 0
+    ).all()
+
+    children = {}
+    for row in rows:
+        children.setdefault(row.parent_id, []).append(row)
+
+    calendar = get_working_calendar()
+    changes = []
+    # Dirty queue of (predecessor id, its old end, its new end)
+    dirty = deque([(task.id, old_end_date, task.end_date)])
+    while dirty:
+        parent_id, parent_old_end, parent_new_end = dirty.popleft()
+        delta = (parent_new_end - parent_old_end).days
+        for child in children.get(parent_id, []):
+            # Contained in the parent rather than following it
+            if not follows_parent(child.start_date, parent_old_end):
+                continue
+            slack = (child.start_date - parent_old_end).days - 1 - (child.dependency_days or 0)
+            shift = _successor_shift(delta, slack)
+            if shift == 0:
+                continue
+            new_start = child.start_date + timedelta(days=shift)
+            new_end = child.end_date + timedelta(days=shift)
+            changes.append({
+                'task_id': child.id,
+                'old_start': child.start_date,
+                'old_end': child.end_date,
+                'new_start': new_start,
+                'new_end': new_end,
+                'new_hours': calendar.hours_between(new_start, new_end)
+            })
+            dirty.append((child.id, child.end_date, new_end))
+
+    if changes:
+        table = Task.__table__
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('task_id')).values(
+                start_date=bindparam('new_start'),
+                end_date=bindparam('new_end'),
+                hours=bindparam('new_hours'),
+                updated_at=datetime.utcnow()
+            ),
+            changes
+        )
+        # Objects already in the session must not keep their old dates
+        for change in changes:
+            moved = db.session.identity_map.get((Task, (change['task_id'],), None))
+            if moved is not None:
+                db.session.expire(moved, ['start_date', 'end_date', 'hours', 'updated_at'])
+
+    return changes
+
+
+def record_rescheduled(changes, schedule_version_id):
+    """History rows for rescheduled tasks in an existing schedule version, in one executemany"""
+    if not changes:
+        return
+    statuses = dict(db.session.query(Task.id, Task.status).filter(
+        Task.id.in_([change['task_id'] for change in changes])))
+    db.session.execute(TaskVersionHistory.__table__.insert(), [{
+        'task_id': change['task_id'],
+        'schedule_version_id': schedule_version_id,
+        'start_date': change['new_start'],
+        'end_date': change['new_end'],
+        'status': statuses[change['task_id']].name
+    } for change in changes])
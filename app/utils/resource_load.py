@@ -0,0 +1,243 @@
+from datetime import date, timedelta
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.models.user import User, UserRole, display_name
+from app.models.task import Task, TaskResource
+from app.utils.working_time import get_working_calendar
+
+# Window kept in memory: a quarter back and two years ahead
+WINDOW_PAST_DAYS = 90
+WINDOW_FUTURE_DAYS = 730
+# Seconds before the cached matrix is rebuilt to pick up other processes' writes
+LOAD_MAX_AGE = 300
+# Up to this many intervals are applied as row slices instead of a full difference array
+SLICE_UPDATE_LIMIT = 64
+
+
+class ResourceLoad:
+    """Dense users x days matrix of concurrent assignments and allocated hours
+
+    counts[u, d] is how many active tasks user u is assigned to on day d. A
+    task assigned to someone takes the full working hours of each of its days,
+    so allocated hours are counts times the day's calendar hours, and a user
+    is over-allocated on any working day with more than one task.
+    """
+
+    def __init__(self, start, end, users, assignments):
+        self.start = start
+        self.end = end
+        self.days = (end - start).days + 1
+        self.user_ids = np.array([user_id for user_id, _ in users], dtype=np.int64)
+        self.user_names = [name for _, name in users]
+        self.row_of = {user_id: row for row, user_id in enumerate(self.user_ids.tolist())}
+
+        calendar = get_working_calendar()
+        ordinals = np.arange(start.toordinal(), end.toordinal() + 1)
+        self.capacity = calendar.hours_between_many(ordinals, ordinals).astype(np.int32)
+        self.counts = np.zeros((len(self.user_ids), self.days), dtype=np.int32)
+        self._add_intervals(assignments, 1)
+        self.built_at = time.monotonic()
+
+    def _add_intervals(self, assignments, sign):
+        """Add (user_id, start_date, end_date) intervals with a difference array and one cumsum"""
+        rows, firsts, lasts = [], [], []
+        for user_id, start_date, end_date in assignments:
+            row = self.row_of.get(user_id)
+            if row is None or end_date < self.start or start_date > self.end:
+                continue
+            rows.append(row)
+            firsts.append(max((start_date - self.start).days, 0))
+            lasts.append(min((end_date - self.start).days, self.days - 1))
+        if not rows:
+            return
+        if len(rows) <= SLICE_UPDATE_LIMIT:
+            for row, first, last in zip(rows, firsts, lasts):
+                self.counts[row, first:last + 1] += sign
+            return
+        diff = np.zeros((len(self.user_ids), self.days + 1), dtype=np.int32)
+        np.add.at(diff, (np.array(rows), np.array(firsts)), sign)
+        np.add.at(diff, (np.array(rows), np.array(lasts) + 1), -sign)
+        self.counts += np.cumsum(diff[:, :-1], axis=1, dtype=np.int32)
+
+    def apply(self, assignments, sign):
+        """Incrementally add (sign=1) or remove (sign=-1) assignment intervals"""
+        self._add_intervals(assignments, sign)
+
+    def covers(self, start, end):
+        return self.start <= start and end <= self.end
+
+    def window(self, start, end, user_ids=None):
+        """Counts, hours and capacity for a sub-window and optional subset of users"""
+        first = (start - self.start).days
+        last = (end - self.start).days + 1
+        rows = np.arange(len(self.user_ids))
+        if user_ids:
+            rows = np.array([self.row_of[user_id] for user_id in user_ids if user_id in self.row_of], dtype=np.int64)
+        counts = self.counts[rows, first:last]
+        capacity = self.capacity[first:last]
+        return rows, counts, counts * capacity, capacity
+
+    def heatmap(self, start, end, user_ids=None):
+        rows, counts, hours, capacity = self.window(start, end, user_ids)
+        return {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'capacity': capacity.tolist(),
+            'users': [{
+                'id': int(self.user_ids[row]),
+                'name': self.user_names[row],
+                'hours': hours[position].tolist()
+            } for position, row in enumerate(rows.tolist())]
+        }
+
+    def overallocations(self, start, end, user_ids=None):
+        """Users with any working day carrying more than one task, with those days"""
+        rows, counts, hours, capacity = self.window(start, end, user_ids)
+        over = (counts > 1) & (capacity > 0)
+        result = []
+        for position in np.flatnonzero(over.any(axis=1)).tolist():
+            row = rows[position]
+            days = np.flatnonzero(over[position])
+            result.append({
+                'id': int(self.user_ids[row]),
+                'name': self.user_names[row],
+                'days': [{
+                    'date': (start + timedelta(days=int(day))).isoformat(),
+                    'tasks': int(counts[position, day]),
+                    'allocated_hours': int(hours[position, day]),
+                    'capacity_hours': int(capacity[day])
+                } for day in days.tolist()]
+            })
+        return result
+
+
+def build_resource_load(start, end):
+    """Load matrix for a window: one query for users, one for assignments"""
+    users = [(user_id, display_name(username, first_name, last_name))
+             for user_id, username, first_name, last_name in db.session.query(
+                 User.id, User.username, User.first_name, User.last_name
+             ).filter(User.role != UserRole.ADMIN).order_by(User.id)]
+    assignments = db.session.query(TaskResource.user_id, Task.start_date, Task.end_date).join(
+        Task, Task.id == TaskResource.task_id
+    ).filter(
+        Task.is_active == True,
+        Task.end_date >= start,
+        Task.start_date <= end
+    ).all()
+    return ResourceLoad(start, end, users, assignments)
+
+
+_load = None
+_load_lock = threading.Lock()
+
+
+def get_resource_load(start, end):
+    """Cached matrix when the window fits the standing one, otherwise a one-off build"""
+    global _load
+    with _load_lock:
+        today = date.today()
+        load = _load
+        if load is None or time.monotonic() - load.built_at > LOAD_MAX_AGE or \
+                load.start != today - timedelta(days=WINDOW_PAST_DAYS):
+            load = _load = build_resource_load(today - timedelta(days=WINDOW_PAST_DAYS),
+                                               today + timedelta(days=WINDOW_FUTURE_DAYS))
+    if load.covers(start, end):
+        return load
+    return build_resource_load(start, end)
+
+
+def invalidate_resource_load():
+    global _load
+    _load = None
+
+
+# Assignment changes are collected per session and applied to the cached
+# matrix only once they are committed
+def _pending(session):
+    return session.info.setdefault('resource_load_deltas', [])
+
+
+def _record_assignment(connection, target, sign):
+    session = object_session(target)
+    if session is None or _load is None:
+        return
+    task = Task.__table__
+    dates = connection.execute(
+        select(task.c.start_date, task.c.end_date, task.c.is_active).where(task.c.id == target.task_id)
+    ).first()
+    if dates is None:
+        # The task went in the same flush
+        session.info['resource_load_stale'] = True
+    elif dates.is_active:
+        _pending(session).append((sign, [(target.user_id, dates.start_date, dates.end_date)]))
+
+
+@event.listens_for(TaskResource, 'after_insert')
+def _assignment_added(mapper, connection, target):
+    _record_assignment(connection, target, 1)
+
+
+@event.listens_for(TaskResource, 'after_delete')
+def _assignment_removed(mapper, connection, target):
+    _record_assignment(connection, target, -1)
+
+
+@event.listens_for(Task, 'after_update')
+def _task_dates_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is None or _load is None:
+        return
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in ('start_date', 'end_date', 'is_active')):
+        return
+    # Date moves also shift dependents through bulk updates; rebuild after commit
+    session.info['resource_load_stale'] = True
+
+
+@event.listens_for(Task, 'after_delete')
+def _task_deleted(mapper, connection, target):
+    session = object_session(target)
+    if session is not None and _load is not None:
+        session.info['resource_load_stale'] = True
+
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_delete')
+def _users_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None and _load is not None:
+        session.info['resource_load_stale'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_committed(session):
+    # Releasing a savepoint commits nothing yet
+    if session.in_nested_transaction():
+        return
+    deltas = session.info.pop('resource_load_deltas', None)
+    stale = session.info.pop('resource_load_stale', False)
+    load = _load
+    if load is None:
+        return
+    if stale:
+        invalidate_resource_load()
+        return
+    for sign, assignments in deltas or []:
+        load.apply(assignments, sign)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    if session.in_nested_transaction():
+        # The savepoint's own deltas cannot be told apart; rebuild after the outer commit
+        if session.info.get('resource_load_deltas'):
+            session.info['resource_load_stale'] = True
+        return
+    session.info.pop('resource_load_deltas', None)
+    session.info.pop('resource_load_stale', None)
@@ -0,0 +1,188 @@
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import func, literal, select
+
+from app import db
+from app.models.task import Task
+from app.models.schedule import ScheduleVersion, TaskVersionHistory
+from app.utils.cache import TTLCache
+
+
+def latest_schedule_version(project_id):
+    return ScheduleVersion.query.filter_by(project_id=project_id).order_by(
+        ScheduleVersion.created_at.desc(), ScheduleVersion.id.desc()).first()
+
+
+def next_version_number(latest, major=False):
+    """"1.3" -> "1.4", or "2.0" for a major step; "1.0" when there is no version yet"""
+    if latest is None:
+        return "1.0"
+    current_major, minor = latest.version.split('.')
+    if major:
+        return f"{int(current_major) + 1}.0"
+    return f"{current_major}.{int(minor) + 1}"
+
+
+def create_baseline(project_id, user_id, notes=None):
+    """Snapshot every task of a project into a new baseline ScheduleVersion
+
+    The snapshot is a single INSERT ... SELECT from the task table, so the
+    rows never pass through Python. The caller commits.
+    """
+    latest = latest_schedule_version(project_id)
+    baseline = ScheduleVersion(
+        project_id=project_id,
+        version=next_version_number(latest, major=True),
+        created_by=user_id,
+        notes=notes or 'Schedule baseline',
+        is_baseline=True
+    )
+    db.session.add(baseline)
+    db.session.flush()
+    
+    history = TaskVersionHistory.__table__
+    task = Task.__table__
+    # Task.status is stored by enum name, which is what history rows hold as well
+    db.session.execute(history.insert().from_select(
+        ['task_id', 'schedule_version_id', 'start_date', 'end_date', 'status', 'created_at'],
+        select(
+            task.c.id,
+            literal(baseline.id),
+            task.c.start_date,
+            task.c.end_date,
+            task.c.status,
+            literal(datetime.utcnow())
+        ).where(task.c.project_id == project_id)
+    ))
+    return baseline
+
+
+# Diffs are keyed by the version pair plus a fingerprint of the history rows,
+# so rows added to an existing version later never serve a stale diff
+diff_cache = TTLCache('schedule_diff', ttl=3600, maxsize=256)
+
+
+def _history_fingerprint(project_id, up_to_version_id):
+    return db.session.query(func.max(TaskVersionHistory.id), func.count(TaskVersionHistory.id)).join(
+        ScheduleVersion, ScheduleVersion.id == TaskVersionHistory.schedule_version_id
+    ).filter(
+        ScheduleVersion.project_id == project_id,
+        ScheduleVersion.id <= up_to_version_id
+    ).one()
+
+
+def schedule_states(project_id, earlier_id, later_id):
+    """Task state {task_id: (start, end, status)} as of two versions, from one pass over history
+
+    A version only records the tasks touched in it, so the state at a version
+    is the newest history row of every task up to that version. The scan
+    starts at the last baseline at or before the earlier version, since a
+    baseline already holds every task. For the same reason a later baseline
+    replaces the state outright, which drops the tasks deleted before it.
+    """
+    baseline_id = db.session.query(func.max(ScheduleVersion.id)).filter(
+        ScheduleVersion.project_id == project_id,
+        ScheduleVersion.is_baseline == True,
+        ScheduleVersion.id <= earlier_id
+    ).scalar() or 0
+    
+    rows = db.session.query(
+        TaskVersionHistory.schedule_version_id, TaskVersionHistory.task_id,
+        TaskVersionHistory.start_date, TaskVersionHistory.end_date, TaskVersionHistory.status
+    ).join(ScheduleVersion, ScheduleVersion.id == TaskVersionHistory.schedule_version_id).filter(
+        ScheduleVersion.project_id == project_id,
+        ScheduleVersion.id >= baseline_id,
+        ScheduleVersion.id <= later_id
+    ).order_by(TaskVersionHistory.schedule_version_id, TaskVersionHistory.id)
+    
+    later_baselines = deque(version_id for (version_id,) in db.session.query(ScheduleVersion.id).filter(
+        ScheduleVersion.project_id == project_id,
+        ScheduleVersion.is_baseline == True,
+        ScheduleVersion.id > baseline_id,
+        ScheduleVersion.id <= later_id
+    ).order_by(ScheduleVersion.id))
+    
+    state = {}
+    earlier_state = None
+    
+    def start_baseline(version_id):
+        nonlocal state, earlier_state
+        if earlier_state is None and version_id > earlier_id:
+            earlier_state = dict(state)
+        state = {}
+    
+    for version_id, task_id, start_date, end_date, status in rows:
+        while later_baselines and later_baselines[0] <= version_id:
+            start_baseline(later_baselines.popleft())
+        if earlier_state is None and version_id > earlier_id:
+            earlier_state = dict(state)
+        state[task_id] = (start_date, end_date, status)
+    # Baselines of a project with no tasks left have no rows
+    for version_id in later_baselines:
+        start_baseline(version_id)
+    if earlier_state is None:
+        earlier_state = dict(state)
+    return earlier_state, state
+
+
+def _task_entry(task_id, names, values):
+    start_date, end_date, status = values
+    return {
+        'task_id': task_id,
+        'name': names.get(task_id),
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'status': status
+    }
+
+
+def diff_schedule_versions(from_version, to_version):
+    """Added, removed, moved and status-changed tasks between two versions of a project"""
+    project_id = from_version.project_id
+    fingerprint = _history_fingerprint(project_id, max(from_version.id, to_version.id))
+    key = (from_version.id, to_version.id, tuple(fingerprint))
+    
+    def build():
+        earlier_id, later_id = sorted((from_version.id, to_version.id))
+        earlier, later = schedule_states(project_id, earlier_id, later_id)
+        if from_version.id > to_version.id:
+            earlier, later = later, earlier
+        
+        before_ids = earlier.keys()
+        after_ids = later.keys()
+        common = before_ids & after_ids
+        moved_ids = sorted(task_id for task_id in common if earlier[task_id][:2] != later[task_id][:2])
+        status_ids = sorted(task_id for task_id in common if earlier[task_id][2] != later[task_id][2])
+        added_ids = sorted(after_ids - before_ids)
+        removed_ids = sorted(before_ids - after_ids)
+        
+        # Names for every task that shows up in the result, in one query
+        involved = set(moved_ids) | set(status_ids) | set(added_ids) | set(removed_ids)
+        names = dict(db.session.query(Task.id, Task.name).filter(Task.id.in_(involved))) if involved else {}
+        
+        return {
+            'project_id': project_id,
+            'from_version': {'id': from_version.id, 'version': from_version.version},
+            'to_version': {'id': to_version.id, 'version': to_version.version},
+            'added': [_task_entry(task_id, names, later[task_id]) for task_id in added_ids],
+            'removed': [_task_entry(task_id, names, earlier[task_id]) for task_id in removed_ids],
+            'moved': [{
+                'task_id': task_id,
+                'name': names.get(task_id),
+                'from_start': earlier[task_id][0].isoformat(),
+                'from_end': earlier[task_id][1].isoformat(),
+                'to_start': later[task_id][0].isoformat(),
+                'to_end': later[task_id][1].isoformat(),
+                'start_shift_days': (later[task_id][0] - earlier[task_id][0]).days,
+                'end_shift_days': (later[task_id][1] - earlier[task_id][1]).days
+            } for task_id in moved_ids],
+            'status_changed': [{
+                'task_id': task_id,
+                'name': names.get(task_id),
+                'from_status': earlier[task_id][2],
+                'to_status': later[task_id][2]
+            } for task_id in status_ids]
+        }
+    
+    return diff_cache.get_or_set(key, build)
@@ -0,0 +1,155 @@
+import logging
+import random
+import re
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Statements of the same shape run this many times in one request are reported as N+1
+N_PLUS_ONE_THRESHOLD = 10
+# Longest statement text written to the log
+LOGGED_STATEMENT_LENGTH = 300
+
+# Placeholder lists from expanded IN (...) parameters, e.g. (?, ?, ?) or (%s, %s)
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+_listening = False
+_endpoint_totals = {}
+_totals_lock = threading.Lock()
+
+
+def statement_shape(statement):
+    """Statement text with IN lists collapsed, so calls that differ only in parameters compare equal"""
+    return _WHITESPACE.sub(' ', _PLACEHOLDER_LIST.sub('(?)', statement)).strip()
+
+
+class RequestSqlStats:
+    """Statements run while handling one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = {}
+
+    def add(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        entry = self.shapes.get(statement)
+        if entry is None:
+            self.shapes[statement] = [1, duration]
+        else:
+            entry[0] += 1
+            entry[1] += duration
+
+    def repeated(self, threshold):
+        """(shape, count, seconds) for shapes run at least threshold times, most frequent first"""
+        merged = {}
+        for statement, (count, duration) in self.shapes.items():
+            shape = statement_shape(statement)
+            entry = merged.setdefault(shape, [0, 0.0])
+            entry[0] += count
+            entry[1] += duration
+        return sorted(((shape, count, duration) for shape, (count, duration) in merged.items()
+                       if count >= threshold), key=lambda item: -item[1])
+
+    def duplicated(self):
+        """Statements beyond the first of each shape"""
+        return self.count - len({statement_shape(statement) for statement in self.shapes})
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'sql_stats' in g:
+        conn.info.setdefault('sql_stats_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('sql_stats_started')
+    if started and has_request_context():
+        stats = g.get('sql_stats')
+        elapsed = time.perf_counter() - started.pop()
+        if stats is not None:
+            stats.add(statement, elapsed)
+
+
+def _record(endpoint, stats, elapsed, repeated):
+    with _totals_lock:
+        totals = _endpoint_totals.setdefault(endpoint, {
+            'requests': 0, 'statements': 0, 'max_statements': 0, 'db_ms': 0.0, 'total_ms': 0.0,
+            'n_plus_one_requests': 0
+        })
+        totals['requests'] += 1
+        totals['statements'] += stats.count
+        totals['max_statements'] = max(totals['max_statements'], stats.count)
+        totals['db_ms'] += stats.duration * 1000
+        totals['total_ms'] += elapsed * 1000
+        totals['n_plus_one_requests'] += 1 if repeated else 0
+
+
+def endpoint_sql_stats():
+    """Per-endpoint totals and averages for the requests sampled by this process"""
+    with _totals_lock:
+        return {
+            endpoint: dict(
+                totals,
+                db_ms=round(totals['db_ms'], 2),
+                total_ms=round(totals['total_ms'], 2),
+                avg_statements=round(totals['statements'] / totals['requests'], 2),
+                avg_db_ms=round(totals['db_ms'] / totals['requests'], 2)
+            )
+            for endpoint, totals in sorted(_endpoint_totals.items())
+        }
+
+
+def init_sql_instrumentation(app):
+    """Count statements and database time per request when SQL_INSTRUMENTATION is on
+
+    A sampled request gets a Server-Timing header (db and app time, visible
+    in the browser's network panel), a one-line summary in the log and,
+    when one statement shape repeats SQL_N_PLUS_ONE_THRESHOLD times or
+    more, a warning naming it. Statements a streamed response runs after
+    the view returns are not counted.
+    """
+    if not app.config.get('SQL_INSTRUMENTATION'):
+        return
+    global _listening
+    if not _listening:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _listening = True
+    sample_rate = app.config.get('SQL_INSTRUMENTATION_SAMPLE_RATE', 1.0)
+    threshold = app.config.get('SQL_N_PLUS_ONE_THRESHOLD', N_PLUS_ONE_THRESHOLD)
+    server_timing = app.config.get('SQL_SERVER_TIMING', True)
+
+    @app.before_request
+    def _start_sql_stats():
+        if sample_rate >= 1 or random.random() < sample_rate:
+            g.sql_stats = RequestSqlStats()
+
+    @app.after_request
+    def _report_sql_stats(response):
+        stats = g.pop('sql_stats', None)
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - stats.started
+        endpoint = request.endpoint or 'unmatched'
+        repeated = stats.repeated(threshold)
+        _record(endpoint, stats, elapsed, repeated)
+
+        if server_timing:
+            db_ms = stats.duration * 1000
+            response.headers.add('Server-Timing', f'db;dur={db_ms:.1f};desc="{stats.count} queries"')
+            response.headers.add('Server-Timing', f'app;dur={elapsed * 1000 - db_ms:.1f}')
+        logger.info('%s %s: %d statements (%d duplicated) in %.1f ms, %.1f ms total',
+                    request.method, endpoint, stats.count, stats.duplicated(),
+                    stats.duration * 1000, elapsed * 1000)
+        for shape, count, duration in repeated:
+            logger.warning('Possible N+1 in %s: %d x %.1f ms: %s', endpoint, count,
+                           duration * 1000, shape[:LOGGED_STATEMENT_LENGTH])
+        return response
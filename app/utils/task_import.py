@@ -0,0 +1,420 @@
+from collections import OrderedDict
+import csv
+from datetime import date, datetime
+import io
+import time
+
+from defusedxml import ElementTree
+from sqlalchemy import bindparam, func, select
+
+from app import db
+from app.models.project import Project
+from app.models.task import Task, TaskClosure, TaskStatus
+from app.models.schedule import ScheduleVersion, TaskVersionHistory
+from app.utils.choices import mark_task_choices_changed
+from app.utils.schedule import latest_schedule_version, next_version_number
+from app.utils.working_time import get_working_calendar
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+# Parent references are looked up here before going to the database
+RECENT_REFS = 10000
+
+CSV_COLUMNS = ('ref', 'name', 'description', 'start_date', 'end_date', 'parent_ref',
+               'dependency_days', 'is_milestone', 'is_active', 'status')
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+FALSE_VALUES = ('0', 'false', 'no', 'n')
+# Cells starting with these are treated as formulas by spreadsheet programs
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+# Exports put this before such cells, and before cells already starting with it
+FORMULA_GUARD = "'"
+
+
+class ImportRowError(ValueError):
+    def __init__(self, where, message):
+        super().__init__(f'{where}: {message}')
+        self.where = where
+        self.message = message
+
+
+def unguard_cell(value):
+    """Undo the export's formula guard, so an exported file imports the values it was made from"""
+    if value.startswith(FORMULA_GUARD) and value[1:].startswith(FORMULA_PREFIXES + (FORMULA_GUARD,)):
+        return value[1:]
+    return value
+
+
+def parse_csv(stream):
+    """Yield (where, raw row) from a CSV file with a header row, one line at a time"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    header = [column.strip().lower() for column in next(reader, [])]
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        raw = {column: unguard_cell(value).strip() for column, value in zip(header, values)}
+        raw.setdefault('ref', str(reader.line_num))
+        yield f'line {reader.line_num}', raw
+
+
+def _local(tag):
+    return tag.rpartition('}')[2]
+
+
+def _msproject_status(percent_complete):
+    percent = int(percent_complete or 0)
+    if percent >= 100:
+        return TaskStatus.COMPLETED.name
+    if percent > 0:
+        return TaskStatus.IN_PROGRESS.name
+    return TaskStatus.NOT_STARTED.name
+
+
+def parse_msproject_xml(stream):
+    """Yield (where, raw row) for each task of an MS Project XML file
+
+    The file is read with iterparse and every finished element is cleared,
+    so memory does not grow with the number of tasks. Parents follow from
+    OutlineLevel; the project summary task (level 0) is skipped. Uploads are
+    untrusted, so DOCTYPE and entity declarations are rejected (defusedxml
+    raises DTDForbidden) instead of being expanded.
+    """
+    elements = []
+    task = None
+    outline = []  # (outline level, UID) of the open ancestors
+    for event, element in ElementTree.iterparse(stream, events=('start', 'end'), forbid_dtd=True):
+        if event == 'start':
+            elements.append(element)
+            if len(elements) == 3 and _local(element.tag) == 'Task' and _local(elements[1].tag) == 'Tasks':
+                task = {}
+            continue
+
+        elements.pop()
+        if task is not None and len(elements) == 3:
+            # A field of the current task
+            task[_local(element.tag)] = (element.text or '').strip()
+        elif len(elements) == 2:
+            if task is not None:
+                raw = _msproject_row(task, outline)
+                task = None
+                if raw is not None:
+                    yield f"task UID {raw['ref']}", raw
+            # Drop finished top-level entries (tasks, resources, assignments)
+            elements[-1].clear()
+
+
+def _msproject_row(task, outline):
+    if task.get('IsNull') == '1' or not task.get('UID'):
+        return None
+    level = int(task.get('OutlineLevel') or 1)
+    if level == 0:
+        return None
+    while outline and outline[-1][0] >= level:
+        outline.pop()
+    parent_ref = outline[-1][1] if outline else ''
+    outline.append((level, task['UID']))
+    return {
+        'ref': task['UID'],
+        'name': task.get('Name', ''),
+        'description': task.get('Notes', ''),
+        'start_date': task.get('Start', '')[:10],
+        'end_date': task.get('Finish', '')[:10],
+        'parent_ref': parent_ref,
+        'dependency_days': '0',
+        'is_milestone': task.get('Milestone', ''),
+        'is_active': task.get('Active', ''),
+        'status': _msproject_status(task.get('PercentComplete'))
+    }
+
+
+PARSERS = {
+    'csv': parse_csv,
+    'xml': parse_msproject_xml
+}
+
+
+def _parse_date(where, raw, field):
+    value = raw.get(field, '')
+    try:
+        if len(value) != 10:
+            raise ValueError(value)
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ImportRowError(where, f'{field} must be a date as YYYY-MM-DD')
+
+
+def _parse_bool(where, raw, field, default):
+    value = raw.get(field, '').lower()
+    if not value:
+        return default
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ImportRowError(where, f'{field} must be yes or no')
+
+
+def _parse_status(where, value):
+    if not value:
+        return TaskStatus.NOT_STARTED
+    for status in TaskStatus:
+        if value.upper().replace(' ', '_') == status.name or value.lower() == status.value.lower():
+            return status
+    raise ImportRowError(where, f'unknown status "{value}"')
+
+
+def validate_row(where, raw):
+    """Typed task values for a raw row, with the same rules as TaskForm"""
+    name = raw.get('name', '')
+    if not name:
+        raise ImportRowError(where, 'name is required')
+    if len(name) > 100:
+        raise ImportRowError(where, 'name is longer than 100 characters')
+    description = raw.get('description', '')
+    if len(description) > 500:
+        raise ImportRowError(where, 'description is longer than 500 characters')
+    ref = raw.get('ref', '')
+    if not ref or len(ref) > 64:
+        raise ImportRowError(where, 'ref must be 1 to 64 characters')
+
+    start_date = _parse_date(where, raw, 'start_date')
+    end_date = _parse_date(where, raw, 'end_date')
+    if end_date < start_date:
+        raise ImportRowError(where, 'end date must be after start date')
+
+    try:
+        dependency_days = int(raw.get('dependency_days') or 0)
+    except ValueError:
+        raise ImportRowError(where, 'dependency_days must be a whole number')
+    if dependency_days < 0:
+        raise ImportRowError(where, 'dependency_days cannot be negative')
+
+    return {
+        'where': where,
+        'ref': ref,
+        'parent_ref': raw.get('parent_ref', ''),
+        'name': name,
+        'description': description or None,
+        'start_date': start_date,
+        'end_date': end_date,
+        'dependency_days': dependency_days,
+        'is_milestone': _parse_bool(where, raw, 'is_milestone', False),
+        'is_active': _parse_bool(where, raw, 'is_active', True),
+        'status': _parse_status(where, raw.get('status', ''))
+    }
+
+
+class ImportReport:
+    def __init__(self, version):
+        self.version = version
+        self.imported = 0
+        self.rows = 0
+        self.errors = []
+        self.error_count = 0
+        self.seconds = 0.0
+
+    @property
+    def ok(self):
+        return self.error_count == 0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def add_error(self, error):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(str(error))
+
+
+class TaskImporter:
+    """Bulk-load tasks into a project inside the caller's transaction
+
+    Rows are validated as they stream in and written in chunks with Core
+    executemany statements: tasks, their parent links, closure rows and
+    schedule history, all into one new schedule version. Parent references
+    name the ref of an earlier row; they are resolved against the current
+    chunk, a bounded cache of recent refs, and finally the rows already
+    written, so memory depends on the chunk size and not on the file.
+
+    Nothing is committed here. Check report.ok and commit or roll back.
+    """
+
+    def __init__(self, project_id, user_id, chunk_size=CHUNK_SIZE):
+        self.project_id = project_id
+        self.user_id = user_id
+        self.chunk_size = chunk_size
+        self.recent = OrderedDict()
+        self.calendar = get_working_calendar()
+
+    def run(self, rows):
+        started = time.perf_counter()
+        # Serialize imports per project, so refs written after the floor are ours
+        db.session.query(Project.id).filter(Project.id == self.project_id).with_for_update().one()
+        self.floor = db.session.query(func.coalesce(func.max(Task.id), 0)).scalar()
+
+        version = ScheduleVersion(
+            project_id=self.project_id,
+            version=next_version_number(latest_schedule_version(self.project_id)),
+            created_by=self.user_id,
+            notes='Bulk task import'
+        )
+        db.session.add(version)
+        db.session.flush()
+        report = self.report = ImportReport(version)
+
+        chunk = []
+        for where, raw in rows:
+            report.rows += 1
+            try:
+                chunk.append(validate_row(where, raw))
+            except ImportRowError as e:
+                report.add_error(e)
+                continue
+            if len(chunk) >= self.chunk_size:
+                self._write_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._write_chunk(chunk)
+
+        version.notes = f'Bulk task import of {report.imported} tasks'
+        report.seconds = time.perf_counter() - started
+        return report
+
+    def _lookup_written(self, refs):
+        """{ref: [ids]} for refs written by this import"""
+        found = {}
+        if refs:
+            for ref, task_id in db.session.query(Task.external_ref, Task.id).filter(
+                Task.project_id == self.project_id,
+                Task.id > self.floor,
+                Task.external_ref.in_(refs)
+            ):
+                found.setdefault(ref, []).append(task_id)
+        return found
+
+    def _remember(self, ref, task_id):
+        self.recent[ref] = task_id
+        self.recent.move_to_end(ref)
+        if len(self.recent) > RECENT_REFS:
+            self.recent.popitem(last=False)
+
+    def _write_chunk(self, chunk):
+        report = self.report
+
+        # Resolve parents: same chunk, recent refs, then one query for the rest
+        in_chunk = {}
+        for row in chunk:
+            if row['ref'] in in_chunk:
+                report.add_error(ImportRowError(row['where'], f'duplicate ref "{row["ref"]}"'))
+            in_chunk[row['ref']] = row
+        missing = {row['parent_ref'] for row in chunk
+                   if row['parent_ref'] and row['parent_ref'] not in self.recent}
+        written = self._lookup_written(list(missing))
+
+        rows = []
+        for row in chunk:
+            parent_ref = row['parent_ref']
+            row['parent_id'] = None
+            row['level'] = 0
+            if parent_ref in in_chunk and in_chunk[parent_ref].get('level') is not None \
+                    and in_chunk[parent_ref] is not row:
+                # Parent is earlier in this chunk; linked once it has an id
+                row['level'] = in_chunk[parent_ref]['level'] + 1
+            elif parent_ref in self.recent:
+                row['parent_id'] = self.recent[parent_ref]
+            elif parent_ref in written:
+                if len(written[parent_ref]) > 1:
+                    report.add_error(ImportRowError(row['where'], f'parent ref "{parent_ref}" is not unique'))
+                    continue
+                row['parent_id'] = written[parent_ref][0]
+            elif parent_ref:
+                report.add_error(ImportRowError(row['where'], f'parent ref "{parent_ref}" is not an earlier row'))
+                row['level'] = None
+                continue
+            rows.append(row)
+
+        # Once anything failed the import is rolled back, so only keep validating
+        if not report.ok or not rows:
+            return
+
+        hours = self.calendar.hours_between_many(
+            [row['start_date'].toordinal() for row in rows],
+            [row['end_date'].toordinal() for row in rows]
+        ).tolist()
+        now = datetime.utcnow()
+        db.session.execute(Task.__table__.insert(), [{
+            'project_id': self.project_id,
+            'parent_id': row['parent_id'],
+            'name': row['name'],
+            'description': row['description'],
+            'start_date': row['start_date'],
+            'end_date': row['end_date'],
+            'dependency_days': row['dependency_days'],
+            'hours': row_hours,
+            'is_milestone': row['is_milestone'],
+            'is_active': row['is_active'],
+            'status': row['status'],
+            'has_unread_comments': False,
+            'external_ref': row['ref'],
+            'created_at': now,
+            'updated_at': now
+        } for row, row_hours in zip(rows, hours)])
+
+        # Read back the new ids; a ref seen twice in the file shows up here
+        ids = self._lookup_written([row['ref'] for row in rows])
+        for row in rows:
+            if len(ids[row['ref']]) > 1:
+                report.add_error(ImportRowError(row['where'], f'duplicate ref "{row["ref"]}"'))
+                return
+            row['id'] = ids[row['ref']][0]
+            self._remember(row['ref'], row['id'])
+
+        task = Task.__table__
+        linked = [{'task_id': row['id'], 'new_parent_id': in_chunk[row['parent_ref']]['id']}
+                  for row in rows if row['level']]
+        if linked:
+            db.session.execute(
+                task.update().where(task.c.id == bindparam('task_id')).values(parent_id=bindparam('new_parent_id')),
+                linked
+            )
+
+        # Closure rows, one level of the chunk at a time so parents come first
+        closure = TaskClosure.__table__
+        db.session.execute(closure.insert(), [
+            {'ancestor_id': row['id'], 'descendant_id': row['id'], 'depth': 0} for row in rows
+        ])
+        levels = {}
+        for row in rows:
+            if row['level'] or row['parent_id']:
+                levels.setdefault(row['level'], []).append(row['id'])
+        for level in sorted(levels):
+            db.session.execute(closure.insert().from_select(
+                ['ancestor_id', 'descendant_id', 'depth'],
+                select(closure.c.ancestor_id, task.c.id, closure.c.depth + 1).select_from(
+                    task.join(closure, closure.c.descendant_id == task.c.parent_id)
+                ).where(task.c.id.in_(levels[level]))
+            ))
+
+        db.session.execute(TaskVersionHistory.__table__.insert(), [{
+            'task_id': row['id'],
+            'schedule_version_id': report.version.id,
+            'start_date': row['start_date'],
+            'end_date': row['end_date'],
+            'status': row['status'].name,
+            'created_at': now
+        } for row in rows])
+        report.imported += len(rows)
+
+
+def import_tasks(project_id, user_id, stream, file_format, chunk_size=CHUNK_SIZE):
+    """Import a CSV or MS Project XML stream into a project; returns an ImportReport. The caller commits.
+
+    Raises ValueError for a file_format other than those in PARSERS.
+    """
+    if file_format not in PARSERS:
+        raise ValueError(f"Unsupported import format '{file_format}'; expected one of: {', '.join(PARSERS)}")
+    report = TaskImporter(project_id, user_id, chunk_size).run(PARSERS[file_format](stream))
+    # Rows went in through Core inserts, which the ORM events do not see
+    mark_task_choices_changed(db.session, project_id)
+    return report
@@ -0,0 +1,99 @@
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.models.task import Task, TaskClosure, TaskResource
+
+BATCH_SIZE = 5000
+
+
+def _closure_rows(parents):
+    """Yield closure rows for an {id: parent_id} map, walking each chain once"""
+    chains = {}
+    for task_id in parents:
+        # Walk up until we reach a task whose chain is already known
+        path = []
+        current = task_id
+        while current is not None and current not in chains:
+            if current in path:
+                raise ValueError(f'Task hierarchy contains a cycle at task {current}')
+            path.append(current)
+            parent_id = parents.get(current)
+            current = parent_id if parent_id in parents else None
+        
+        known = chains[current] if current is not None else []
+        for node in reversed(path):
+            known = [(node, 0)] + [(ancestor_id, depth + 1) for ancestor_id, depth in known]
+            chains[node] = known
+    
+    for task_id, chain in chains.items():
+        for ancestor_id, depth in chain:
+            yield {'ancestor_id': ancestor_id, 'descendant_id': task_id, 'depth': depth}
+
+
+def rebuild_task_closure(project_id=None):
+    """Backfill the closure table from Task.parent_id, for one project or for all tasks
+
+    Returns the number of closure rows written. The caller commits.
+    """
+    query = db.session.query(Task.id, Task.parent_id)
+    if project_id is not None:
+        query = query.filter(Task.project_id == project_id)
+    parents = dict(query.all())
+    
+    closure = TaskClosure.__table__
+    if project_id is None:
+        db.session.execute(closure.delete())
+    elif parents:
+        db.session.execute(closure.delete().where(closure.c.descendant_id.in_(
+            db.session.query(Task.id).filter(Task.project_id == project_id))))
+    
+    written = 0
+    batch = []
+    for row in _closure_rows(parents):
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            db.session.execute(closure.insert(), batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(closure.insert(), batch)
+        written += len(batch)
+    
+    return written
+
+
+def build_task_tree(project_id, status=None, resource_id=None, milestones_only=False):
+    """A project's top-level tasks with child_tasks filled in at every depth, from one query
+
+    With filters, a task is kept when it or one of its subtasks matches, so
+    each match is shown under its full chain of parents. Siblings are
+    ordered by start date.
+    """
+    query = Task.query.filter(Task.project_id == project_id)
+    if status or resource_id or milestones_only:
+        # Ancestors (the match itself included) of every matching task in the project
+        match = aliased(Task)
+        matched = select(TaskClosure.ancestor_id).join(match, match.id == TaskClosure.descendant_id).where(
+            match.project_id == project_id)
+        if status:
+            matched = matched.where(match.status == status)
+        if resource_id:
+            matched = matched.join(TaskResource, TaskResource.task_id == match.id).where(
+                TaskResource.user_id == resource_id)
+        if milestones_only:
+            matched = matched.where(match.is_milestone == True)
+        query = query.filter(Task.id.in_(matched))
+    tasks = query.order_by(Task.start_date, Task.id).all()
+    
+    by_id = {task.id: task for task in tasks}
+    roots = []
+    for task in tasks:
+        task.child_tasks = []
+    for task in tasks:
+        parent = by_id.get(task.parent_id)
+        if parent is not None:
+            parent.child_tasks.append(task)
+        else:
+            roots.append(task)
+    return roots
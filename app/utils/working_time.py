@@ -0,0 +1,112 @@
+from array import array
+import time
+
+from app import db
+
+# Hours per weekday (Monday first) for dates without a Calendar row
+DEFAULT_WEEK_HOURS = (8, 8, 8, 8, 8, 0, 0)
+
+# Seconds before a loaded calendar is re-read even without a local write,
+# so that edits made by other processes are picked up
+CALENDAR_MAX_AGE = 300
+
+
+class WorkingCalendar:
+    """Working hours between dates as an O(1) prefix-sum lookup
+
+    Hours follow the weekly pattern, corrected by the Calendar rows. The
+    weekly pattern is closed-form; the corrections are kept as a prefix sum
+    over the span of dates that have Calendar rows, so any range costs two
+    array lookups whatever its length.
+    """
+
+    def __init__(self, overrides=None, week_hours=DEFAULT_WEEK_HOURS):
+        self.week_hours = tuple(week_hours)
+        self.week_total = sum(self.week_hours)
+        self.week_prefix = [sum(self.week_hours[:i]) for i in range(8)]
+
+        overrides = overrides or {}
+        if overrides:
+            self.first = min(overrides).toordinal()
+            last = max(overrides).toordinal()
+        else:
+            self.first = last = 0
+
+        # corrections[i] = override - default, summed over the days before first + i
+        self.corrections = array('q', [0]) * (last - self.first + 2 if overrides else 1)
+        deltas = {day.toordinal(): hours - self._default_hours(day.toordinal()) for day, hours in overrides.items()}
+        running = 0
+        for i in range(1, len(self.corrections)):
+            running += deltas.get(self.first + i - 1, 0)
+            self.corrections[i] = running
+
+        self.loaded_at = time.monotonic()
+
+    def _default_hours(self, ordinal):
+        # Ordinal 1 (0001-01-01) is a Monday
+        return self.week_hours[(ordinal - 1) % 7]
+
+    def _hours_before(self, ordinal):
+        """Working hours of every day before the given ordinal"""
+        weeks, rest = divmod(ordinal - 1, 7)
+        index = min(max(ordinal - self.first, 0), len(self.corrections) - 1)
+        return weeks * self.week_total + self.week_prefix[rest] + self.corrections[index]
+
+    def hours_between(self, start_date, end_date):
+        """Working hours from start_date to end_date, both inclusive"""
+        if end_date < start_date:
+            return 0
+        return self._hours_before(end_date.toordinal() + 1) - self._hours_before(start_date.toordinal())
+
+    def _hours_before_many(self, ordinals):
+        import numpy as np
+
+        weeks, rest = np.divmod(ordinals - 1, 7)
+        index = np.clip(ordinals - self.first, 0, len(self.corrections) - 1)
+        corrections = np.frombuffer(self.corrections, dtype=np.int64)
+        return weeks * self.week_total + np.asarray(self.week_prefix, dtype=np.int64)[rest] + corrections[index]
+
+    def hours_between_many(self, start_ordinals, end_ordinals):
+        """Vectorized hours_between over arrays of date ordinals"""
+        # NumPy is only loaded by the bulk paths, not by every process that needs a calendar
+        import numpy as np
+
+        starts = np.asarray(start_ordinals, dtype=np.int64)
+        ends = np.asarray(end_ordinals, dtype=np.int64)
+        hours = self._hours_before_many(ends + 1) - self._hours_before_many(starts)
+        return np.where(ends < starts, 0, hours)
+
+    def hours_on(self, day):
+        """Working hours of a single day"""
+        return self.hours_between(day, day)
+
+    @classmethod
+    def from_database(cls):
+        """Load every Calendar row in one query"""
+        from app.models.task import Calendar
+
+        rows = db.session.query(Calendar.date, Calendar.is_working_day, Calendar.working_hours).all()
+        overrides = {}
+        for day, is_working_day, working_hours in rows:
+            if is_working_day is False:
+                overrides[day] = 0
+            else:
+                overrides[day] = working_hours if working_hours is not None else 8
+        return cls(overrides)
+
+
+_calendar = None
+
+
+def get_working_calendar():
+    """Process-wide WorkingCalendar, reloaded after Calendar writes or once stale"""
+    global _calendar
+    calendar = _calendar
+    if calendar is None or time.monotonic() - calendar.loaded_at > CALENDAR_MAX_AGE:
+        calendar = _calendar = WorkingCalendar.from_database()
+    return calendar
+
+
+def invalidate_working_calendar():
+    global _calendar
+    _calendar = None
@@ -0,0 +1,62 @@
+"""Whole-project schedule baseline: one INSERT ... SELECT
+
+Usage: python benchmarks/bench_baseline.py [sizes...]   (default: 1000 10000 50000)
+
+Runs against a SQLite file in a temp directory and reports the time to
+snapshot every task of one project into TaskVersionHistory.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+from app import create_app, db
+from app.models.user import User
+from app.models.project import Project, ProjectType
+from app.models.task import Task, TaskStatus
+from app.models.schedule import TaskVersionHistory
+from app.utils.schedule import create_baseline
+
+
+def seed(size):
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    user = User('bench', 'bench@example.com', 'x')
+    db.session.add(user)
+    db.session.flush()
+    start = date(2024, 1, 1)
+    project = Project('Bench', start, start + timedelta(days=365), ProjectType.FIXED_PRICE,
+                      user.id, project_id='10000')
+    db.session.add(project)
+    db.session.flush()
+    statuses = list(TaskStatus)
+    db.session.execute(Task.__table__.insert(), [
+        {'project_id': project.id, 'name': f'Task {i}', 'start_date': start + timedelta(days=i % 300),
+         'end_date': start + timedelta(days=i % 300 + 5), 'status': statuses[i % 4].name}
+        for i in range(size)
+    ])
+    db.session.commit()
+    return project.id, user.id
+
+
+def main(sizes):
+    app = create_app()
+    with app.app_context():
+        print(f"{'tasks':>8} {'seconds':>10} {'rows':>8}")
+        for size in sizes:
+            project_id, user_id = seed(size)
+            started = time.perf_counter()
+            baseline = create_baseline(project_id, user_id)
+            db.session.commit()
+            elapsed = time.perf_counter() - started
+            rows = TaskVersionHistory.query.filter_by(schedule_version_id=baseline.id).count()
+            print(f"{size:>8} {elapsed:>10.3f} {rows:>8}")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000])
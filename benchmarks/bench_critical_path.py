@@ -0,0 +1,45 @@
+"""CPM forward/backward pass on synthetic DAGs
+
+Usage: python benchmarks/bench_critical_path.py [sizes...]   (default: 1000 10000 50000)
+
+Each task gets up to three predecessors among the tasks before it (random
+finish-to-start edges with small lags), which gives deep, wide graphs.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.critical_path import compute_cpm
+
+
+def synthetic_dag(size, seed=42):
+    rng = np.random.default_rng(seed)
+    durations = rng.integers(1, 15, size)
+    earliest = np.zeros(size, dtype=np.int64)
+    succ = np.repeat(np.arange(1, size), 3)
+    # Predecessors lie within the previous 200 tasks, which keeps the graph deep
+    pred = succ - rng.integers(1, 200, succ.size)
+    keep = pred >= 0
+    pred, succ = pred[keep], succ[keep]
+    lag = rng.integers(0, 3, succ.size)
+    return durations, earliest, pred, succ, lag
+
+
+def main(sizes):
+    print(f"{'tasks':>8} {'edges':>8} {'levels':>8} {'ms':>10} {'critical':>9}")
+    for size in sizes:
+        durations, earliest, pred, succ, lag = synthetic_dag(size)
+        started = time.perf_counter()
+        result = compute_cpm(durations, earliest, pred, succ, lag)
+        elapsed = time.perf_counter() - started
+        levels = int(result['level'].max()) + 1
+        critical = int((result['slack'] == 0).sum())
+        print(f"{size:>8} {pred.size:>8} {levels:>8} {elapsed * 1000:>10.1f} {critical:>9}")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000])
@@ -0,0 +1,90 @@
+"""Streaming task export: time to first byte, throughput and memory
+
+Usage: python benchmarks/bench_export.py [rows] [csv|xlsx]   (default: 500000 csv)
+
+Seeds one project with the given number of tasks in a temporary SQLite
+file, then downloads /tasks/export/<id> through the test client and
+reports the time to the first chunk, the total time and the peak Python
+memory while streaming (tracemalloc, so totals are slower than in
+production).
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_db_file = os.path.join(tempfile.mkdtemp(), 'export.db')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{_db_file}')
+
+from app import create_app, db
+from app.models.user import User, UserRole
+from app.models.project import Project, ProjectType
+from app.models.task import Task
+import app.models.schedule  # noqa: F401
+from app.utils.task_tree import rebuild_task_closure
+
+
+def seed(rows):
+    db.drop_all()
+    db.create_all()
+    user = User('bench', 'bench@example.com', 'x', role=UserRole.ADMIN)
+    db.session.add(user)
+    db.session.flush()
+    start = date(2024, 1, 1)
+    project = Project('Bench', start, start + timedelta(days=365), ProjectType.FIXED_PRICE,
+                      user.id, project_id='10000')
+    db.session.add(project)
+    db.session.flush()
+    batch = []
+    for i in range(rows):
+        # Every fifth task starts a new tree; the others hang under the task before
+        batch.append({'id': i + 1, 'project_id': project.id, 'parent_id': None if i % 5 == 0 else i,
+                      'name': f'Task {i}', 'start_date': start + timedelta(days=i % 300),
+                      'end_date': start + timedelta(days=i % 300 + 5), 'status': 'NOT_STARTED', 'hours': 48})
+        if len(batch) == 10000:
+            db.session.execute(Task.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Task.__table__.insert(), batch)
+    rebuild_task_closure(project.id)
+    db.session.commit()
+    return project.id, user.id
+
+
+def main(rows, file_format):
+    app = create_app()
+    if 'task' not in app.blueprints:
+        # The task blueprint is not registered by create_app in this tree
+        from app.routes.task import task_bp
+        app.register_blueprint(task_bp)
+    with app.app_context():
+        project_id, user_id = seed(rows)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get(f'/tasks/export/{project_id}?format={file_format}', buffered=False)
+    assert response.status_code == 200, response.status
+    body = iter(response.response)
+    size = len(next(body))
+    first_byte = time.perf_counter() - started
+    for chunk in body:
+        size += len(chunk)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    response.close()
+
+    print(f"{rows} tasks as {file_format}: first byte {first_byte * 1000:.1f} ms, "
+          f"total {elapsed:.1f} s, {size / 1e6:.1f} MB, peak memory {peak / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 500000, args[1] if len(args) > 1 else 'csv')
@@ -0,0 +1,118 @@
+"""Gantt chart data: per-row lookups vs the batched loader
+
+Usage: python benchmarks/bench_gantt.py [sizes...]   (default: 100 1000 10000)
+
+Runs against an in-memory SQLite database and reports the number of SQL
+statements and the wall time for building the gantt rows of one project.
+"""
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models.user import User, UserRole
+from app.models.project import Project, ProjectType
+from app.models.task import Task, TaskResource, TaskStatus
+from app.models.schedule import ScheduleVersion  # noqa: F401  (registers the mapper)
+from app.utils.gantt import load_gantt_data
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+def legacy_gantt_data(project_id):
+    """The per-row implementation the route used before the batched loader"""
+    gantt_data = []
+    for task in Task.query.filter_by(project_id=project_id).all():
+        resource_names = []
+        for resource in TaskResource.query.filter_by(task_id=task.id).all():
+            resource_names.append(User.query.get(resource.user_id).get_full_name())
+        parent_name = Task.query.get(task.parent_id).name if task.parent_id else None
+        gantt_data.append({
+            'id': task.id,
+            'name': task.name,
+            'start': task.start_date.strftime('%Y-%m-%d'),
+            'end': task.end_date.strftime('%Y-%m-%d'),
+            'progress': 100 if task.status == TaskStatus.COMPLETED else
+                        50 if task.status == TaskStatus.IN_PROGRESS else 0,
+            'dependencies': parent_name,
+            'resources': ', '.join(resource_names),
+            'status': task.status.value,
+            'is_milestone': task.is_milestone
+        })
+    return gantt_data
+
+
+def seed(size):
+    db.drop_all()
+    db.create_all()
+
+    users = [User(f'user{i}', f'user{i}@example.com', 'x', role=UserRole.TEAM_MEMBER,
+                  first_name='User', last_name=str(i)) for i in range(50)]
+    db.session.add_all(users)
+    db.session.flush()
+
+    start = date(2024, 1, 1)
+    project = Project('Bench', start, start + timedelta(days=365), ProjectType.FIXED_PRICE,
+                      users[0].id, project_id='10000')
+    db.session.add(project)
+    db.session.flush()
+
+    # One top-level task per ten, the rest hang below it
+    parent_id = None
+    for i in range(size):
+        task = Task(project_id=project.id, name=f'Task {i}', start_date=start + timedelta(days=i % 300),
+                    end_date=start + timedelta(days=i % 300 + 5), status=TaskStatus.IN_PROGRESS,
+                    parent_id=None if i % 10 == 0 else parent_id)
+        db.session.add(task)
+        db.session.flush()
+        if i % 10 == 0:
+            parent_id = task.id
+        db.session.add(TaskResource(task_id=task.id, user_id=users[i % 50].id))
+        db.session.add(TaskResource(task_id=task.id, user_id=users[(i + 7) % 50].id))
+    db.session.commit()
+    return project.id
+
+
+def measure(fn, project_id):
+    db.session.expunge_all()
+    with QueryCounter(db.engine) as counter:
+        started = time.perf_counter()
+        rows = fn(project_id)
+        elapsed = time.perf_counter() - started
+    return rows, counter.count, elapsed
+
+
+def main(sizes):
+    app = create_app()
+    with app.app_context():
+        print(f"{'tasks':>8} {'legacy q':>10} {'legacy s':>10} {'batched q':>10} {'batched s':>10}")
+        for size in sizes:
+            project_id = seed(size)
+            legacy_rows, legacy_q, legacy_s = measure(legacy_gantt_data, project_id)
+            rows, batched_q, batched_s = measure(load_gantt_data, project_id)
+            assert rows == legacy_rows
+            print(f"{size:>8} {legacy_q:>10} {legacy_s:>10.3f} {batched_q:>10} {batched_s:>10.3f}")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000])
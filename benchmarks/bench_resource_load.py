@@ -0,0 +1,87 @@
+"""Resource utilization matrix for many users over a long window
+
+Usage: python benchmarks/bench_resource_load.py [users] [assignments]   (default: 1000 20000)
+
+Seeds an in-memory database with the given number of users and random task
+assignments over two years, then times the full matrix build, the heatmap
+and over-allocation queries, and one incremental assignment update.
+"""
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from app import create_app, db
+from app.models.user import User
+from app.models.project import Project, ProjectType
+from app.models.task import Task, TaskResource
+import app.models.schedule  # noqa: F401
+from app.utils.resource_load import build_resource_load
+
+
+def seed(users, assignments, seed=42):
+    rng = np.random.default_rng(seed)
+    db.drop_all()
+    db.create_all()
+    manager = User('bench', 'bench@example.com', 'x')
+    db.session.add(manager)
+    db.session.flush()
+    start = date.today()
+    project = Project('Bench', start, start + timedelta(days=730), ProjectType.FIXED_PRICE,
+                      manager.id, project_id='10000')
+    db.session.add(project)
+    db.session.flush()
+    db.session.execute(User.__table__.insert(), [
+        {'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': 'x', 'role': 'TEAM_MEMBER'}
+        for i in range(users)
+    ])
+    offsets = rng.integers(0, 700, assignments)
+    lengths = rng.integers(1, 30, assignments)
+    db.session.execute(Task.__table__.insert(), [
+        {'project_id': project.id, 'name': f'Task {i}', 'start_date': start + timedelta(days=int(offsets[i])),
+         'end_date': start + timedelta(days=int(offsets[i] + lengths[i])), 'status': 'NOT_STARTED'}
+        for i in range(assignments)
+    ])
+    task_ids = [task_id for (task_id,) in db.session.query(Task.id).order_by(Task.id)]
+    user_ids = [user_id for (user_id,) in db.session.query(User.id).filter(User.id != manager.id)]
+    owners = rng.integers(0, len(user_ids), assignments)
+    db.session.execute(TaskResource.__table__.insert(), [
+        {'task_id': task_ids[i], 'user_id': user_ids[int(owners[i])]} for i in range(assignments)
+    ])
+    db.session.commit()
+    return start
+
+
+def timed(label, func):
+    started = time.perf_counter()
+    result = func()
+    print(f"{label:<32} {(time.perf_counter() - started) * 1000:>9.1f} ms")
+    return result
+
+
+def main(users, assignments):
+    app = create_app()
+    with app.app_context():
+        start = seed(users, assignments)
+        end = start + timedelta(days=730)
+        print(f"{users} users, {assignments} assignments, {(end - start).days + 1} days")
+        load = timed('build matrix', lambda: build_resource_load(start, end))
+        body = timed('heatmap (all users, 2 years)', lambda: json.dumps(load.heatmap(start, end)))
+        print(f"{'heatmap JSON size':<32} {len(body) / 1e6:>9.1f} MB")
+        timed('heatmap (50 users, 12 weeks)',
+              lambda: json.dumps(load.heatmap(start, start + timedelta(weeks=12), load.user_ids[:50].tolist())))
+        over = timed('over-allocation scan', lambda: load.overallocations(start, end))
+        print(f"{'over-allocated users':<32} {len(over):>9}")
+        user_id = int(load.user_ids[0])
+        timed('incremental assignment', lambda: load.apply([(user_id, start, start + timedelta(days=10))], 1))
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*(args + [1000, 20000][len(args):]))
@@ -0,0 +1,218 @@
+"""Route benchmark suite: latency percentiles, SQL statement counts and peak memory per page
+
+Usage: python benchmarks/bench_routes.py [--scale small|medium|large] [--database-url URL]
+                                         [--iterations N] [--warm] [--seed N]
+                                         [--save-baseline FILE] [--compare FILE] [--tolerance 0.25]
+
+Seeds the database with benchmarks/seed_data.py unless it already holds
+projects (so a large dataset is generated once and reused), then requests
+main.dashboard, project.index, task.project_tasks, task.gantt_chart and
+task.view through the Flask test client, as the admin and as a project
+manager. Pages and the users requesting them are picked from the seed, so
+two runs at the same scale and seed hit the same rows.
+
+Each request starts with empty application caches unless --warm is given.
+Latencies are wall-clock through the whole WSGI stack; peak memory comes
+from a separate pass under tracemalloc so it does not slow the timed one.
+--save-baseline writes the results as JSON; --compare prints the change
+against such a file and exits with status 1 when a page got slower than
+the tolerance allows (and by more than MIN_REGRESSION_MS) or now runs more
+SQL statements.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from seed_data import SCALES, seed_database
+
+MEMORY_SAMPLES = 3
+# Slowdowns smaller than this are timer noise on fast pages, whatever the percentage
+MIN_REGRESSION_MS = 2.0
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def pick_targets(rng, projects, tasks, samples):
+    """Deterministic (user id, path) pairs per route name"""
+    from app.models.project import Project
+    from app.models.task import Task
+    from app.models.user import User, UserRole
+
+    admin = User.query.filter_by(role=UserRole.ADMIN).order_by(User.id).first()
+    project_ids = sorted(rng.sample(range(1, projects + 1), min(samples, projects)))
+    owned = Project.query.filter(Project.id.in_(project_ids)).order_by(Project.id).all()
+    manager_id = owned[0].project_manager_id
+    task_ids = sorted(rng.sample(range(1, tasks + 1), min(samples, tasks)))
+    viewed = Task.query.filter(Task.id.in_(task_ids)).order_by(Task.id).all()
+    owner_of = dict(Project.query.with_entities(Project.id, Project.project_manager_id).filter(
+        Project.id.in_({task.project_id for task in viewed})).all())
+
+    return {
+        'main.dashboard[admin]': [(admin.id, '/dashboard')],
+        'main.dashboard[pm]': [(manager_id, '/dashboard')],
+        'project.index[admin]': [(admin.id, '/projects/')],
+        'project.index[pm]': [(manager_id, '/projects/')],
+        'task.project_tasks': [(project.project_manager_id, f'/tasks/project/{project.id}') for project in owned],
+        'task.gantt_chart': [(project.project_manager_id, f'/tasks/gantt/{project.id}') for project in owned],
+        'task.view': [(owner_of[task.project_id], f'/tasks/{task.id}') for task in viewed]
+    }
+
+
+def run(app, targets, iterations, warm):
+    from sqlalchemy import event
+
+    from app import db
+    from app.utils.cache import _registry
+
+    statements = [0]
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements[0] += 1
+
+    for engine in db.engines.values():
+        event.listen(engine, 'before_cursor_execute', count_statement)
+
+    client = app.test_client()
+    results = {}
+    for name, requests in targets.items():
+        def fetch(index):
+            user_id, path = requests[index % len(requests)]
+            with client.session_transaction() as session:
+                session['_user_id'] = str(user_id)
+                session['_fresh'] = True
+            if not warm:
+                for cache in _registry:
+                    cache.clear()
+            response = client.get(path)
+            if response.status_code != 200:
+                raise SystemExit(f'{name}: GET {path} returned {response.status_code}')
+            response.close()
+            db.session.remove()
+
+        # One untimed round so imports and first-use setup are not measured
+        for index in range(len(requests)):
+            fetch(index)
+
+        timings = []
+        counts = []
+        for index in range(iterations):
+            statements[0] = 0
+            started = time.perf_counter()
+            fetch(index)
+            timings.append((time.perf_counter() - started) * 1000)
+            counts.append(statements[0])
+
+        peak = 0
+        for index in range(min(MEMORY_SAMPLES, iterations)):
+            tracemalloc.start()
+            fetch(index)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        results[name] = {
+            'p50_ms': round(percentile(timings, 0.50), 2),
+            'p90_ms': round(percentile(timings, 0.90), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'max_ms': round(max(timings), 2),
+            'statements': max(counts),
+            'peak_kb': round(peak / 1024)
+        }
+
+    for engine in db.engines.values():
+        event.remove(engine, 'before_cursor_execute', count_statement)
+    return results
+
+
+def report(results, baseline=None, tolerance=0.25):
+    """Print the results table and return the routes that regressed against the baseline"""
+    regressed = []
+    print(f"{'route':<24} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'SQL':>5} {'peak KB':>8}")
+    for name, row in results.items():
+        line = (f"{name:<24} {row['p50_ms']:>9.2f} {row['p90_ms']:>9.2f} {row['p99_ms']:>9.2f} "
+                f"{row['max_ms']:>9.2f} {row['statements']:>5} {row['peak_kb']:>8}")
+        previous = (baseline or {}).get(name)
+        if previous:
+            change = (row['p50_ms'] - previous['p50_ms']) / previous['p50_ms'] if previous['p50_ms'] else 0
+            line += f"   p50 {change:+.0%}, SQL {row['statements'] - previous['statements']:+d}"
+            slower = change > tolerance and row['p50_ms'] - previous['p50_ms'] > MIN_REGRESSION_MS
+            if slower or row['statements'] > previous['statements']:
+                regressed.append(name)
+                line += '  REGRESSED'
+        print(line)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--projects', type=int)
+    parser.add_argument('--tasks', type=int)
+    parser.add_argument('--history', type=int)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--samples', type=int, default=10, help='distinct projects and tasks per route')
+    parser.add_argument('--warm', action='store_true', help='keep application caches between requests')
+    parser.add_argument('--save-baseline', metavar='FILE')
+    parser.add_argument('--compare', metavar='FILE')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p50 slowdown (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'routes.db')}"
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('MAIL_OUTBOX_WORKER', 'off')
+
+    from app import create_app, db
+    from app.models.project import Project
+    import app.models.schedule  # noqa: F401
+
+    scale = dict(SCALES[args.scale])
+    scale.update({key: getattr(args, key) for key in scale if getattr(args, key) is not None})
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if not db.session.query(Project.id).first():
+            started = time.perf_counter()
+            seed_database(seed=args.seed, **scale)
+            print(f"seeded {scale['projects']} projects, {scale['tasks']} tasks, "
+                  f"{scale['history']} history rows in {time.perf_counter() - started:.1f}s")
+        targets = pick_targets(random.Random(args.seed), scale['projects'], scale['tasks'], args.samples)
+        db.session.remove()
+        results = run(app, targets, args.iterations, args.warm)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)['routes']
+    regressed = report(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as handle:
+            json.dump({
+                'meta': {
+                    'scale': scale, 'seed': args.seed, 'iterations': args.iterations, 'warm': args.warm,
+                    'dialect': database_url.split(':', 1)[0],
+                    'python': platform.python_version(), 'machine': platform.machine()
+                },
+                'routes': results
+            }, handle, indent=2)
+            handle.write('\n')
+        print(f"baseline written to {args.save_baseline}")
+    if regressed:
+        print(f"regressed: {', '.join(regressed)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
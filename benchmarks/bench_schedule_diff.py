@@ -0,0 +1,62 @@
+"""Diff of two whole-project schedule baselines
+
+Usage: python benchmarks/bench_schedule_diff.py [tasks]   (default: 10000)
+
+Takes a baseline, moves, re-statuses, adds and deletes a share of the
+tasks, takes a second baseline and times the diff (cold and cached).
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+from datetime import timedelta
+
+from sqlalchemy import bindparam
+
+from app import create_app, db
+from app.models.task import Task, TaskStatus
+from app.utils.schedule import create_baseline, diff_schedule_versions
+from bench_baseline import seed
+
+
+def main(size):
+    app = create_app()
+    with app.app_context():
+        project_id, user_id = seed(size)
+        first = create_baseline(project_id, user_id)
+        db.session.commit()
+
+        task = Task.__table__
+        moved = db.session.query(Task.id, Task.end_date).filter(Task.id % 10 == 0).all()
+        db.session.execute(
+            task.update().where(task.c.id == bindparam('task_id')).values(end_date=bindparam('new_end')),
+            [{'task_id': task_id, 'new_end': end_date + timedelta(days=3)} for task_id, end_date in moved]
+        )
+        db.session.execute(task.update().where(task.c.id % 7 == 0).values(status=TaskStatus.COMPLETED.name))
+        first_task = db.session.query(Task).filter_by(project_id=project_id).first()
+        db.session.add(Task(project_id=project_id, name='Added', start_date=first_task.start_date,
+                            end_date=first_task.start_date + timedelta(days=2)))
+        second = create_baseline(project_id, user_id)
+        db.session.commit()
+
+        started = time.perf_counter()
+        diff = diff_schedule_versions(first, second)
+        cold = time.perf_counter() - started
+        started = time.perf_counter()
+        diff_schedule_versions(first, second)
+        cached = time.perf_counter() - started
+
+        print(f'tasks:          {size}')
+        print(f'moved:          {len(diff["moved"])}')
+        print(f'status changed: {len(diff["status_changed"])}')
+        print(f'added:          {len(diff["added"])}')
+        print(f'cold diff:      {cold * 1000:.1f} ms')
+        print(f'cached diff:    {cached * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
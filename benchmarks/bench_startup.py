@@ -0,0 +1,96 @@
+"""Process startup time and an import-time breakdown
+
+Usage: python benchmarks/bench_startup.py [runs]   (default: 5)
+
+Each run is a fresh interpreter against a SQLite file that already has the
+schema, timing the import of `app`, create_app() and the first request.
+Modes:
+  create_all     DB_CREATE_ALL=true, the default
+  no_create_all  DB_CREATE_ALL=false, schema left to Flask-Migrate
+  preload_fork   create_app() and preload() in a parent, then the time a
+                 forked worker takes to answer its first request
+Then `python -X importtime` is summarised per top-level package.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, os, sys, time
+sys.path.insert(0, ROOT)
+started = time.perf_counter()
+from app import create_app, preload
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+result = {'import_ms': (imported - started) * 1000, 'create_app_ms': (created - imported) * 1000}
+if MODE == 'preload_fork':
+    preload(app)
+    result['preload_ms'] = (time.perf_counter() - created) * 1000
+    read_end, write_end = os.pipe()
+    forked = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        app.test_client().get('/auth/login')
+        os.write(write_end, str((time.perf_counter() - forked) * 1000).encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    result['worker_first_request_ms'] = float(os.read(read_end, 64))
+else:
+    app.test_client().get('/auth/login')
+    result['first_request_ms'] = (time.perf_counter() - created) * 1000
+result['total_ms'] = (time.perf_counter() - started) * 1000
+print(json.dumps(result))
+'''
+
+
+def run_probe(mode, env):
+    code = PROBE.replace('ROOT', repr(ROOT)).replace('MODE', repr(mode))
+    output = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def import_breakdown(env, top=15):
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'from app import create_app; create_app()'],
+        env=env, cwd=ROOT, capture_output=True, text=True, check=True)
+    self_time = {}
+    for line in output.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        self_time[package] = self_time.get(package, 0) + int(own)
+    total = sum(self_time.values())
+    print(f"\nimport time by top-level package (self time, total {total / 1000:.0f} ms)")
+    for package, micros in sorted(self_time.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {package:<24} {micros / 1000:>7.1f} ms  {micros / total:>6.1%}")
+
+
+def main(runs):
+    db_file = os.path.join(tempfile.mkdtemp(), 'startup.db')
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_file}', MAIL_OUTBOX_WORKER='off')
+    # Create the schema once, so every mode starts from an existing database
+    run_probe('create_all', dict(env, DB_CREATE_ALL='true'))
+
+    modes = [
+        ('create_all', {'DB_CREATE_ALL': 'true'}),
+        ('no_create_all', {'DB_CREATE_ALL': 'false'}),
+        ('preload_fork', {'DB_CREATE_ALL': 'false'})
+    ]
+    for mode, extra in modes:
+        results = [run_probe(mode, dict(env, **extra)) for _ in range(runs)]
+        summary = ', '.join(f"{key} {statistics.median(result[key] for result in results):.0f}"
+                            for key in results[0])
+        print(f"{mode:<14} median of {runs} (ms): {summary}")
+
+    import_breakdown(dict(env, DB_CREATE_ALL='false'))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
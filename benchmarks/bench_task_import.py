@@ -0,0 +1,82 @@
+"""Streaming bulk task import: throughput and memory against file size
+
+Usage: python benchmarks/bench_task_import.py [--memory] [rows...]   (default: 10000 50000 200000)
+
+Writes a CSV of the given size to a temp file (a forest of five-level
+task trees), imports it into an in-memory database and reports rows per
+second. With --memory the import runs under tracemalloc (several times
+slower) and also reports its peak Python memory, which should stay flat
+as the file grows.
+"""
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from app import create_app, db
+from app.models.user import User
+from app.models.project import Project, ProjectType
+from app.models.task import Task
+import app.models.schedule  # noqa: F401
+from app.utils.task_import import import_tasks
+
+
+def write_csv(path, rows):
+    start = date(2024, 1, 1)
+    with open(path, 'w', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(['ref', 'name', 'start_date', 'end_date', 'parent_ref', 'status'])
+        for i in range(rows):
+            # Every fifth row starts a new tree; the others hang under the row before
+            parent = '' if i % 5 == 0 else f'T{i - 1}'
+            first = start + timedelta(days=i % 300)
+            writer.writerow([f'T{i}', f'Task {i}', first.isoformat(), (first + timedelta(days=5)).isoformat(),
+                             parent, 'Not Started'])
+
+
+def main(sizes, memory=False):
+    app = create_app()
+    print(f"{'rows':>8} {'seconds':>8} {'rows/s':>9}" + (f" {'peak MB':>8}" if memory else ''))
+    with app.app_context():
+        for size in sizes:
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+            user = User('bench', 'bench@example.com', 'x')
+            db.session.add(user)
+            db.session.flush()
+            project = Project('Bench', date(2024, 1, 1), date(2025, 1, 1), ProjectType.FIXED_PRICE,
+                              user.id, project_id='10000')
+            db.session.add(project)
+            db.session.commit()
+
+            fd, path = tempfile.mkstemp(suffix='.csv')
+            os.close(fd)
+            try:
+                write_csv(path, size)
+                if memory:
+                    tracemalloc.start()
+                started = time.perf_counter()
+                with open(path, 'rb') as stream:
+                    report = import_tasks(project.id, user.id, stream, 'csv')
+                db.session.commit()
+                elapsed = time.perf_counter() - started
+                if memory:
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+            finally:
+                os.unlink(path)
+            assert report.ok and Task.query.count() == size, report.errors
+            print(f"{size:>8} {elapsed:>8.2f} {size / elapsed:>9.0f}" + (f" {peak / 1e6:>8.1f}" if memory else ''))
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    memory = '--memory' in args
+    main([int(arg) for arg in args if arg != '--memory'] or [10000, 50000, 200000], memory)
@@ -0,0 +1,64 @@
+"""Working hours lookups on the prefix-sum calendar
+
+Usage: python benchmarks/bench_working_hours.py [ranges]   (default: 1000000)
+
+Builds a calendar with ten years of holidays and short days, checks a
+sample against a day-by-day count, then times hours_between over random
+date ranges.
+"""
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.working_time import WorkingCalendar
+
+
+def naive_hours(overrides, week_hours, start, end):
+    total = 0
+    day = start
+    while day <= end:
+        total += overrides.get(day, week_hours[day.weekday()])
+        day += timedelta(days=1)
+    return total
+
+
+def main(count):
+    rng = random.Random(42)
+    base = date(2020, 1, 1)
+
+    overrides = {}
+    for _ in range(400):
+        day = base + timedelta(days=rng.randrange(3650))
+        overrides[day] = rng.choice([0, 0, 4, 6, 10])
+
+    started = time.perf_counter()
+    calendar = WorkingCalendar(overrides)
+    build_s = time.perf_counter() - started
+
+    ranges = []
+    for _ in range(count):
+        start = base + timedelta(days=rng.randrange(-400, 4000))
+        ranges.append((start, start + timedelta(days=rng.randrange(0, 700))))
+
+    for start, end in ranges[:2000]:
+        assert calendar.hours_between(start, end) == naive_hours(overrides, calendar.week_hours, start, end)
+
+    hours_between = calendar.hours_between
+    started = time.perf_counter()
+    for start, end in ranges:
+        hours_between(start, end)
+    elapsed = time.perf_counter() - started
+
+    print(f'calendar rows:    {len(overrides)}')
+    print(f'index build:      {build_s * 1000:.2f} ms ({len(calendar.corrections)} slots)')
+    print(f'ranges:           {count}')
+    print(f'total:            {elapsed:.3f} s')
+    print(f'per lookup:       {elapsed / count * 1e9:.0f} ns')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,29 @@
+"""Block-reserving sequence for project IDs
+
+Revision ID: 0b9d5e2f7a54
+Revises: e4c8a1b6d743
+Create Date: 2026-10-17 09:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b9d5e2f7a54'
+down_revision = 'e4c8a1b6d743'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The allocator creates its row on first use and skips IDs already taken
+    op.create_table('project_id_sequence',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('next_value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('project_id_sequence')
@@ -0,0 +1,33 @@
+"""Schedule baselines and the history lookup index
+
+Revision ID: 2f6a0d8c3e87
+Revises: 9c2e4a7b1d76
+Create Date: 2026-10-17 09:35:00.000000
+
+Versions created before baselines existed only hold the tasks touched in
+them, so they all start out as non-baseline versions.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f6a0d8c3e87'
+down_revision = '9c2e4a7b1d76'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('schedule_version', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('is_baseline', sa.Boolean(), nullable=True, server_default=sa.false()))
+
+    op.create_index('ix_task_version_history_version_task', 'task_version_history',
+                    ['schedule_version_id', 'task_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_task_version_history_version_task', table_name='task_version_history')
+
+    with op.batch_alter_table('schedule_version', schema=None) as batch_op:
+        batch_op.drop_column('is_baseline')
@@ -0,0 +1,24 @@
+"""Index for keyset pagination of the project list
+
+Revision ID: 5a7e9f3d2c32
+Revises: 8d2b6c4e1f21
+Create Date: 2026-10-17 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a7e9f3d2c32'
+down_revision = '8d2b6c4e1f21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_project_created_at_id', 'project', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_project_created_at_id', table_name='project')
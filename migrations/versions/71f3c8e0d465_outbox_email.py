@@ -0,0 +1,40 @@
+"""Durable outbox for outgoing mail
+
+Revision ID: 71f3c8e0d465
+Revises: 0b9d5e2f7a54
+Create Date: 2026-10-17 09:25:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '71f3c8e0d465'
+down_revision = '0b9d5e2f7a54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('outbox_email',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(length=255), nullable=False),
+    sa.Column('recipients', sa.Text(), nullable=False),
+    sa.Column('sender', sa.String(length=255), nullable=True),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=10), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('claim_token', sa.String(length=32), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbox_email_due', 'outbox_email', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_outbox_email_due', table_name='outbox_email')
+    op.drop_table('outbox_email')
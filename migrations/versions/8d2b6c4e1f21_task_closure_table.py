@@ -0,0 +1,52 @@
+"""Task closure table for hierarchy queries
+
+Revision ID: 8d2b6c4e1f21
+Revises: 3c1f0e7a9b10
+Create Date: 2026-10-17 09:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2b6c4e1f21'
+down_revision = '3c1f0e7a9b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('task_closure',
+    sa.Column('ancestor_id', sa.Integer(), nullable=False),
+    sa.Column('descendant_id', sa.Integer(), nullable=False),
+    sa.Column('depth', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['ancestor_id'], ['task.id'], ),
+    sa.ForeignKeyConstraint(['descendant_id'], ['task.id'], ),
+    sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    op.create_index('ix_task_closure_descendant', 'task_closure', ['descendant_id', 'depth'], unique=False)
+
+    # Backfill from Task.parent_id one level at a time: every task is its own
+    # ancestor at depth 0, and the parent of a depth-d ancestor is one at d + 1
+    op.execute(
+        'INSERT INTO task_closure (ancestor_id, descendant_id, depth) '
+        'SELECT id, id, 0 FROM task'
+    )
+    connection = op.get_bind()
+    depth = 0
+    while True:
+        inserted = connection.execute(sa.text(
+            'INSERT INTO task_closure (ancestor_id, descendant_id, depth) '
+            'SELECT task.parent_id, task_closure.descendant_id, :next_depth '
+            'FROM task_closure JOIN task ON task.id = task_closure.ancestor_id '
+            'WHERE task_closure.depth = :depth AND task.parent_id IS NOT NULL'
+        ), {'depth': depth, 'next_depth': depth + 1}).rowcount
+        if not inserted:
+            break
+        depth += 1
+
+
+def downgrade():
+    op.drop_index('ix_task_closure_descendant', table_name='task_closure')
+    op.drop_table('task_closure')
@@ -0,0 +1,119 @@
+"""Content-addressed attachment storage
+
+Revision ID: 9c2e4a7b1d76
+Revises: 71f3c8e0d465
+Create Date: 2026-10-17 09:30:00.000000
+
+Existing PO and SOW attachments are hashed into the store and linked to
+their blob. Their original files under static/ are copied, not moved, so
+a downgrade still finds them; files that are missing are left unlinked.
+"""
+from datetime import datetime
+import hashlib
+import mimetypes
+import os
+import shutil
+import tempfile
+
+from alembic import op
+from flask import current_app
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c2e4a7b1d76'
+down_revision = '71f3c8e0d465'
+branch_labels = None
+depends_on = None
+
+CHUNK_SIZE = 64 * 1024
+ATTACHMENT_TABLES = ('po_attachment', 'sow_attachment')
+
+
+def _store(path, storage_dir):
+    """Copy a file into the store under its hash; returns (sha256, size)"""
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=storage_dir, prefix='.upload-')
+    try:
+        with open(path, 'rb') as source, os.fdopen(fd, 'wb') as temp_file:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                temp_file.write(chunk)
+                size += len(chunk)
+        sha256 = digest.hexdigest()
+        final_path = os.path.join(storage_dir, sha256[:2], sha256[2:4], sha256)
+        if not os.path.exists(final_path):
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            shutil.move(temp_path, final_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+    return sha256, size
+
+
+def _backfill():
+    connection = op.get_bind()
+    storage_dir = current_app.config['ATTACHMENT_STORAGE_DIR']
+    static_dir = os.path.join(current_app.root_path, 'static')
+    os.makedirs(storage_dir, exist_ok=True)
+    blob_table = sa.table(
+        'attachment_blob',
+        sa.column('id', sa.Integer), sa.column('sha256', sa.String), sa.column('size', sa.BigInteger),
+        sa.column('content_type', sa.String), sa.column('created_at', sa.DateTime)
+    )
+
+    blob_ids = {}
+    for name in ATTACHMENT_TABLES:
+        table = sa.table(name, sa.column('id', sa.Integer), sa.column('filename', sa.String),
+                         sa.column('file_path', sa.String), sa.column('blob_id', sa.Integer))
+        rows = connection.execute(
+            sa.select(table.c.id, table.c.filename, table.c.file_path).where(table.c.blob_id == None)
+        ).all()
+        for attachment_id, filename, file_path in rows:
+            path = os.path.join(static_dir, file_path)
+            if not os.path.isfile(path):
+                continue
+            sha256, size = _store(path, storage_dir)
+            if sha256 not in blob_ids:
+                connection.execute(blob_table.insert().values(
+                    sha256=sha256, size=size, content_type=mimetypes.guess_type(filename)[0],
+                    created_at=datetime.utcnow()
+                ))
+                blob_ids[sha256] = connection.execute(
+                    sa.select(blob_table.c.id).where(blob_table.c.sha256 == sha256)
+                ).scalar()
+            connection.execute(table.update().where(table.c.id == attachment_id).values(blob_id=blob_ids[sha256]))
+
+
+def upgrade():
+    op.create_table('attachment_blob',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('content_type', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('sha256')
+    )
+    for name in ATTACHMENT_TABLES:
+        with op.batch_alter_table(name, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('blob_id', sa.Integer(), nullable=True))
+            batch_op.create_index(batch_op.f(f'ix_{name}_blob_id'), ['blob_id'], unique=False)
+            batch_op.create_foreign_key(f'fk_{name}_blob_id_attachment_blob', 'attachment_blob', ['blob_id'], ['id'])
+
+    _backfill()
+
+
+def downgrade():
+    # Stored files are left in ATTACHMENT_STORAGE_DIR; the originals under static/ were never removed
+    for name in ATTACHMENT_TABLES:
+        with op.batch_alter_table(name, schema=None) as batch_op:
+            batch_op.drop_constraint(f'fk_{name}_blob_id_attachment_blob', type_='foreignkey')
+            batch_op.drop_index(batch_op.f(f'ix_{name}_blob_id'))
+            batch_op.drop_column('blob_id')
+
+    op.drop_table('attachment_blob')
@@ -0,0 +1,28 @@
+"""External reference of imported tasks
+
+Revision ID: b8e1f5a2c498
+Revises: 2f6a0d8c3e87
+Create Date: 2026-10-17 09:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e1f5a2c498'
+down_revision = '2f6a0d8c3e87'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('external_ref', sa.String(length=64), nullable=True))
+        batch_op.create_index('ix_task_project_external_ref', ['project_id', 'external_ref'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_project_external_ref')
+        batch_op.drop_column('external_ref')
@@ -0,0 +1,88 @@
+"""Per-user comment read receipts and unread counters
+
+Revision ID: d3a7c9e6f1a9
+Revises: b8e1f5a2c498
+Create Date: 2026-10-17 09:45:00.000000
+
+Tasks still flagged with the legacy has_unread_comments get one unread
+comment, their newest, for everyone in the comment audience (project
+manager, assignees and admins) other than that comment's author. The flag
+was shared by all users and cleared by any viewer, so this is the closest
+per-user state it can tell; it does not know how many comments were missed.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a7c9e6f1a9'
+down_revision = 'b8e1f5a2c498'
+branch_labels = None
+depends_on = None
+
+
+def _backfill_unread():
+    task = sa.table('task', sa.column('id'), sa.column('project_id'), sa.column('has_unread_comments'))
+    project = sa.table('project', sa.column('id'), sa.column('project_manager_id'))
+    task_resource = sa.table('task_resource', sa.column('task_id'), sa.column('user_id'))
+    user = sa.table('user', sa.column('id'), sa.column('role'))
+    comment = sa.table('task_comment', sa.column('id'), sa.column('task_id'), sa.column('user_id'),
+                       sa.column('created_at'))
+    unread = sa.table('task_comment_unread', sa.column('user_id'), sa.column('task_id'),
+                      sa.column('unread_count'), sa.column('last_comment_at'))
+
+    flagged = task.c.has_unread_comments == sa.true()
+    audience = sa.union(
+        sa.select(task.c.id.label('task_id'), project.c.project_manager_id.label('user_id')).select_from(
+            task.join(project, project.c.id == task.c.project_id)).where(flagged),
+        sa.select(task_resource.c.task_id, task_resource.c.user_id).select_from(
+            task_resource.join(task, task.c.id == task_resource.c.task_id)).where(flagged),
+        sa.select(task.c.id, user.c.id).select_from(task.join(user, sa.true())).where(flagged, user.c.role == 'ADMIN')
+    ).subquery()
+    newest = sa.select(comment.c.task_id, sa.func.max(comment.c.id).label('comment_id')).group_by(
+        comment.c.task_id).subquery()
+
+    op.execute(unread.insert().from_select(
+        ['user_id', 'task_id', 'unread_count', 'last_comment_at'],
+        sa.select(
+            audience.c.user_id, audience.c.task_id, sa.literal(1),
+            sa.func.coalesce(comment.c.created_at, sa.func.current_timestamp())
+        ).select_from(
+            audience.join(newest, newest.c.task_id == audience.c.task_id).join(
+                comment, comment.c.id == newest.c.comment_id)
+        ).where(audience.c.user_id != comment.c.user_id)
+    ))
+
+
+def upgrade():
+    op.create_table('task_comment_read',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('last_read_comment_id', sa.Integer(), nullable=False),
+    sa.Column('read_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['task_id'], ['task.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'task_id')
+    )
+    op.create_index(op.f('ix_task_comment_read_task_id'), 'task_comment_read', ['task_id'], unique=False)
+    op.create_table('task_comment_unread',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('unread_count', sa.Integer(), nullable=False),
+    sa.Column('last_comment_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['task_id'], ['task.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'task_id')
+    )
+    op.create_index(op.f('ix_task_comment_unread_task_id'), 'task_comment_unread', ['task_id'], unique=False)
+    op.create_index('ix_task_comment_unread_user_recent', 'task_comment_unread', ['user_id', 'last_comment_at'], unique=False)
+
+    _backfill_unread()
+
+
+def downgrade():
+    op.drop_index('ix_task_comment_unread_user_recent', table_name='task_comment_unread')
+    op.drop_index(op.f('ix_task_comment_unread_task_id'), table_name='task_comment_unread')
+    op.drop_table('task_comment_unread')
+    op.drop_index(op.f('ix_task_comment_read_task_id'), table_name='task_comment_read')
+    op.drop_table('task_comment_read')
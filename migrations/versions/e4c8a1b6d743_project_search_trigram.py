@@ -0,0 +1,54 @@
+"""Trigram index for project ID and name search
+
+Revision ID: e4c8a1b6d743
+Revises: 5a7e9f3d2c32
+Create Date: 2026-10-17 09:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4c8a1b6d743'
+down_revision = '5a7e9f3d2c32'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def _trigrams(text):
+    # Same windows as app.models.project.trigrams, frozen here with the migration
+    text = (text or '').lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def upgrade():
+    trigram_table = op.create_table('project_search_trigram',
+    sa.Column('field', sa.String(length=1), nullable=False),
+    # Binary on MySQL, whose default collation treats trigrams differing only in case or accents as equal
+    sa.Column('trigram', sa.String(length=3).with_variant(sa.String(length=3, collation='utf8mb4_bin'), 'mysql'),
+              nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['project_id'], ['project.id'], ),
+    sa.PrimaryKeyConstraint('field', 'trigram', 'project_id')
+    )
+    op.create_index(op.f('ix_project_search_trigram_project_id'), 'project_search_trigram', ['project_id'], unique=False)
+
+    # Index the existing projects; 'i' is the project ID, 'n' the name
+    connection = op.get_bind()
+    batch = []
+    for project_id, code, name in connection.execute(sa.text('SELECT id, project_id, name FROM project')):
+        for field, value in (('i', code), ('n', name)):
+            batch.extend({'field': field, 'trigram': trigram, 'project_id': project_id} for trigram in _trigrams(value))
+        if len(batch) >= BATCH_SIZE:
+            connection.execute(trigram_table.insert(), batch)
+            batch = []
+    if batch:
+        connection.execute(trigram_table.insert(), batch)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_project_search_trigram_project_id'), table_name='project_search_trigram')
+    op.drop_table('project_search_trigram')
@@ -0,0 +1,29 @@
+"""Shared versions for cached data sets
+
+Revision ID: f5b2d8e4a0c1
+Revises: d3a7c9e6f1a9
+Create Date: 2026-10-17 09:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5b2d8e4a0c1'
+down_revision = 'd3a7c9e6f1a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows are created by the first write that changes a data set
+    op.create_table('cache_version',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('cache_version')
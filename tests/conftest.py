@@ -0,0 +1,83 @@
+import pytest
+
+from app import create_app, db
+import app.models.outbox  # noqa: F401
+import app.models.schedule  # noqa: F401
+from app.models.user import User, UserRole
+from app.utils.cache import _registry
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """An app on a fresh SQLite file, with its app context pushed"""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setenv('MAIL_OUTBOX_WORKER', 'off')
+    monkeypatch.setenv('ATTACHMENT_STORAGE_DIR', str(tmp_path / 'attachments'))
+    monkeypatch.delenv('DATABASE_REPLICA_URL', raising=False)
+    for cache in _registry:
+        cache.clear()
+    
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def users(app):
+    """An admin, a project manager and a team member"""
+    created = {}
+    for name, role in (('admin', UserRole.ADMIN), ('manager', UserRole.PROJECT_MANAGER),
+                       ('member', UserRole.TEAM_MEMBER)):
+        user = User(name, f'{name}@example.com', 'secret', role=role, first_name=name.title(), last_name='Tester')
+        user.is_first_login = False
+        db.session.add(user)
+        created[name] = user
+    db.session.commit()
+    return created
+
+
+@pytest.fixture
+def login(app):
+    """Log a test client in as a user, without going through the login form"""
+    from flask import g
+    
+    def login_as(client, user):
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+            session['_fresh'] = True
+        # Requests share the fixture's app context; start with an empty g, as a fresh context would,
+        # so neither Flask-Login's cached user nor other per-request state carries over
+        for name in list(g):
+            g.pop(name)
+    
+    return login_as
+
+
+@pytest.fixture
+def project(users):
+    """A project of the manager with one task, assigned to the member"""
+    from datetime import date
+    
+    from app.models.project import Project, ProjectType
+    from app.models.task import Task, TaskResource
+    
+    project = Project(project_id='10001', name='Apollo', start_date=date(2024, 1, 1), end_date=date(2024, 12, 31),
+                      project_type=ProjectType.FIXED_PRICE, project_manager_id=users['manager'].id)
+    db.session.add(project)
+    db.session.flush()
+    task = Task(project_id=project.id, name='Design', start_date=date(2024, 1, 8), end_date=date(2024, 1, 19))
+    db.session.add(task)
+    db.session.flush()
+    db.session.add(TaskResource(task_id=task.id, user_id=users['member'].id))
+    db.session.commit()
+    return project
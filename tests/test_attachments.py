@@ -0,0 +1,38 @@
+import io
+import os
+
+from werkzeug.datastructures import FileStorage
+
+from app import db
+from app.models.project import AttachmentBlob
+from app.utils.attachments import blob_path, store_upload
+
+
+def _upload(content):
+    return FileStorage(stream=io.BytesIO(content), filename='po.pdf', content_type='application/pdf')
+
+
+def test_rollback_removes_files_of_new_blobs(project):
+    # As in the project routes, the upload joins a transaction that has written already
+    # (pysqlite opens none for reads, and a savepoint outside one commits on release)
+    project.description = 'With a PO'
+    db.session.flush()
+    path = blob_path(store_upload(_upload(b'rolled back')))
+    assert os.path.exists(path)
+    
+    db.session.rollback()
+    
+    assert not os.path.exists(path)
+    assert AttachmentBlob.query.count() == 0
+
+
+def test_commit_keeps_files_and_later_rollbacks_leave_them(app):
+    path = blob_path(store_upload(_upload(b'kept')))
+    db.session.commit()
+    
+    # Same content again: the existing blob is reused, and its file survives a rollback
+    store_upload(_upload(b'kept'))
+    db.session.rollback()
+    
+    assert os.path.exists(path)
+    assert AttachmentBlob.query.count() == 1
@@ -0,0 +1,32 @@
+from app import db
+from app.models.cache import CacheVersion
+from app.models.task import Task
+from app.models.user import User, UserRole
+from app.utils.choices import USER_CHOICES, assignable_user_choices, parent_task_choices
+
+
+def test_committed_user_shows_up_in_every_process(users):
+    assert [name for _, name in assignable_user_choices()] == ['Manager Tester', 'Member Tester']
+    
+    db.session.add(User('newcomer', 'newcomer@example.com', 'secret', role=UserRole.TEAM_MEMBER))
+    db.session.commit()
+    # The version lives in the database, so a worker that never saw the write moves on too
+    assert db.session.get(CacheVersion, USER_CHOICES).version >= 1
+    assert 'newcomer' in [name for _, name in assignable_user_choices()]
+
+
+def test_rolled_back_task_leaves_the_version(project):
+    task = project.tasks.first()
+    version_name = f'choices:tasks:{project.id}'
+    before = db.session.get(CacheVersion, version_name).version
+    assert parent_task_choices(project.id) == [(task.id, 'Design')]
+    
+    db.session.add(Task(project_id=project.id, name='Build', start_date=task.start_date, end_date=task.end_date))
+    db.session.flush()
+    db.session.rollback()
+    assert db.session.get(CacheVersion, version_name).version == before
+    assert parent_task_choices(project.id) == [(task.id, 'Design')]
+    
+    task.name = 'Discovery'
+    db.session.commit()
+    assert parent_task_choices(project.id) == [(task.id, 'Discovery')]
@@ -0,0 +1,52 @@
+from app import db
+from app.models.task import TaskComment, TaskCommentUnread
+from app.utils.comment_tracking import mark_comments_read, record_comment
+
+
+def _comment(task, user):
+    comment = TaskComment(task_id=task.id, user_id=user.id, content='Note')
+    db.session.add(comment)
+    db.session.flush()
+    record_comment(task, user.id)
+    db.session.commit()
+    return comment
+
+
+def _unread(user, task):
+    row = db.session.get(TaskCommentUnread, (user.id, task.id))
+    return row.unread_count if row else 0
+
+
+def test_reading_everything_clears_the_counter(users, project):
+    task = project.tasks.first()
+    _comment(task, users['member'])
+    latest = _comment(task, users['member'])
+    assert _unread(users['manager'], task) == 2
+    
+    assert mark_comments_read(users['manager'].id, task.id, latest.id) == (None, True)
+    db.session.commit()
+    assert _unread(users['manager'], task) == 0
+    # The author never had the comments as unread
+    assert _unread(users['member'], task) == 0
+
+
+def test_comment_newer_than_the_page_stays_unread(users, project):
+    task = project.tasks.first()
+    first = _comment(task, users['member'])
+    _comment(task, users['member'])
+    # Posted after the manager's page loaded the first two
+    shown = _comment(task, users['member'])
+    late = _comment(task, users['admin'])
+    assert _unread(users['manager'], task) == 4
+    
+    mark_comments_read(users['manager'].id, task.id, first.id)
+    db.session.commit()
+    assert _unread(users['manager'], task) == 3
+    
+    assert mark_comments_read(users['manager'].id, task.id, shown.id) == (first.id, True)
+    db.session.commit()
+    assert _unread(users['manager'], task) == 1
+    
+    mark_comments_read(users['manager'].id, task.id, late.id)
+    db.session.commit()
+    assert _unread(users['manager'], task) == 0
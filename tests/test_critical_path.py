@@ -0,0 +1,56 @@
+from datetime import date, timedelta
+
+from app import db
+from app.models.task import Task
+from app.utils.critical_path import compute_cpm, project_critical_path
+
+
+def _add_child(parent, name, start, end, dependency_days=0):
+    task = Task(project_id=parent.project_id, parent_id=parent.id, name=name, start_date=start, end_date=end,
+                dependency_days=dependency_days)
+    db.session.add(task)
+    db.session.flush()
+    return task
+
+
+def test_forward_and_backward_pass():
+    # 0 -> 1 -> 3 and 0 -> 2 -> 3, with a one-day lag on 0 -> 2
+    result = compute_cpm([3, 4, 2, 1], [0, 0, 0, 0], [0, 1, 0, 2], [1, 3, 2, 3], [0, 0, 1, 0])
+    
+    assert result['es'].tolist() == [0, 3, 4, 7]
+    assert result['ef'].tolist() == [3, 7, 6, 8]
+    assert result['lf'].tolist() == [3, 7, 7, 8]
+    assert result['ls'].tolist() == [0, 3, 5, 7]
+    assert result['slack'].tolist() == [0, 0, 1, 0]
+    assert result['finish'] == 8
+
+
+def test_contained_children_do_not_follow_their_parent(project):
+    design = project.tasks.first()
+    first_week = _add_child(design, 'Sketch', date(2024, 1, 8), date(2024, 1, 12))
+    second_week = _add_child(design, 'Refine', date(2024, 1, 15), date(2024, 1, 19))
+    db.session.commit()
+    
+    result = project_critical_path(project.id)
+    
+    assert result['finish'] == '2024-01-19'
+    assert result['tasks'][first_week.id]['earliest_start'] == '2024-01-08'
+    assert result['tasks'][first_week.id]['slack_days'] == 7
+    assert result['tasks'][second_week.id]['earliest_start'] == '2024-01-15'
+    assert result['tasks'][design.id]['critical']
+
+
+def test_successor_pushes_the_finish(project):
+    design = project.tasks.first()
+    review = _add_child(design, 'Review', date(2024, 1, 22), date(2024, 1, 26), dependency_days=2)
+    early = _add_child(design, 'Sketch', date(2024, 1, 8), date(2024, 1, 10))
+    db.session.commit()
+    
+    result = project_critical_path(project.id)
+    
+    # Review waits two days after Design's 01-19 finish, then runs its five days
+    assert result['tasks'][review.id]['earliest_start'] == '2024-01-22'
+    assert result['finish'] == '2024-01-26'
+    assert result['critical_path'] == [design.id, review.id]
+    assert result['tasks'][early.id]['slack_days'] == (date(2024, 1, 26) - date(2024, 1, 10)).days
+    assert not result['tasks'][early.id]['critical']
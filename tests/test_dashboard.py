@@ -0,0 +1,75 @@
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from app import db
+from app.models.cache import CacheVersion
+from app.models.project import ProjectStatus
+from app.models.task import TaskComment
+from app.utils.comment_tracking import mark_comments_read, record_comment
+from app.utils.dashboard import (DASHBOARD_PROJECTS, dashboard_cache, get_dashboard_summary,
+                                 invalidate_all_dashboards, invalidate_dashboards_for_task)
+
+
+def test_comments_and_reads_refresh_the_unread_summary(users, project):
+    task = project.tasks.first()
+    manager = users['manager']
+    assert get_dashboard_summary(manager)['unread_comments_count'] == 0
+    
+    comment = TaskComment(task_id=task.id, user_id=users['member'].id, content='Note')
+    db.session.add(comment)
+    db.session.flush()
+    record_comment(task, users['member'].id)
+    db.session.commit()
+    summary = get_dashboard_summary(manager)
+    assert summary['unread_comments_count'] == 1
+    assert [row['id'] for row in summary['tasks_with_comments']] == [task.id]
+    
+    mark_comments_read(manager.id, task.id, comment.id)
+    db.session.commit()
+    assert get_dashboard_summary(manager)['unread_comments_count'] == 0
+
+
+def test_cached_dashboard_only_reads_versions_and_unread_counters(client, users, project, login):
+    login(client, users['manager'])
+    assert client.get('/dashboard').status_code == 200
+    
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    login(client, users['manager'])
+    assert client.get('/dashboard').status_code == 200
+    assert len(statements) == 3
+    assert 'cache_version' in statements[0]
+    assert all('task_comment_unread' in statement for statement in statements[1:])
+
+
+def test_project_write_retires_every_summary(users, project):
+    manager = users['manager']
+    assert get_dashboard_summary(manager)['active_projects_count'] == 0
+    
+    project.status = ProjectStatus.APPROVED_ACTIVE
+    db.session.commit()
+    # Cached until the write is announced
+    assert get_dashboard_summary(manager)['active_projects_count'] == 0
+    invalidate_all_dashboards()
+    assert get_dashboard_summary(manager)['active_projects_count'] == 1
+    assert db.session.get(CacheVersion, DASHBOARD_PROJECTS).version == 1
+
+
+def test_task_write_retires_the_assignees_summaries(users, project):
+    member = users['member']
+    task = project.tasks.first()
+    project.status = ProjectStatus.APPROVED_ACTIVE
+    db.session.commit()
+    assert get_dashboard_summary(member)['tasks_due_soon'] == []
+    
+    task.end_date = date.today() + timedelta(days=2)
+    db.session.commit()
+    assert get_dashboard_summary(member)['tasks_due_soon'] == []
+    stale = dashboard_cache.get(('TEAM_MEMBER', member.id))
+    invalidate_dashboards_for_task(task)
+    assert [row['id'] for row in get_dashboard_summary(member)['tasks_due_soon']] == [task.id]
+    
+    # A worker still holding the old entry rebuilds too, as the versions live in the database
+    dashboard_cache.set(('TEAM_MEMBER', member.id), stale)
+    assert [row['id'] for row in get_dashboard_summary(member)['tasks_due_soon']] == [task.id]
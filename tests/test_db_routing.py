@@ -0,0 +1,91 @@
+import shutil
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models.project import Project
+from app.utils.cache import _registry
+from app.utils.db_routing import REPLICA_BIND, STICKY_SESSION_KEY
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """An app with a primary and a replica SQLite file"""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setenv('DATABASE_REPLICA_URL', f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setenv('MAIL_OUTBOX_WORKER', 'off')
+    for cache in _registry:
+        cache.clear()
+    
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    # init_app registered metadata for the bind on the shared db; apps without a replica would try to create it
+    db.metadatas.pop(REPLICA_BIND, None)
+
+
+@pytest.fixture
+def statements(app, users, project, tmp_path):
+    """Statements run per database, once the replica holds a copy of the primary"""
+    # Load what the tests use first, so only their own statements are recorded
+    for instance in (*users.values(), project):
+        db.session.refresh(instance)
+    shutil.copy(tmp_path / 'primary.db', tmp_path / 'replica.db')
+    
+    ran = {}
+    for name, engine in (('primary', db.engines[None]), ('replica', db.engines[REPLICA_BIND])):
+        event.listen(engine, 'before_cursor_execute',
+                     lambda *args, name=name: ran.setdefault(name, []).append(args[2]))
+    return ran
+
+
+def test_read_only_pages_read_from_the_replica(client, users, login, statements):
+    login(client, users['admin'])
+    assert client.get('/projects/').status_code == 200
+    assert statements.get('replica')
+    assert 'primary' not in statements
+
+
+def test_writes_and_flushes_go_to_the_primary(app, users, statements):
+    with app.test_request_context('/projects/'):
+        app.preprocess_request()
+        assert db.session.query(Project.name).scalar() == 'Apollo'
+        assert 'primary' not in statements
+        
+        db.session.get(Project, 1).name = 'Apollo 2'
+        db.session.flush()
+        assert any(statement.startswith('UPDATE project') for statement in statements['primary'])
+        # Once the request has written, its reads stay on the primary too
+        replica_count = len(statements['replica'])
+        assert db.session.query(Project.name).scalar() == 'Apollo 2'
+        assert len(statements['replica']) == replica_count
+        db.session.rollback()
+
+
+def test_own_commit_pins_reads_to_the_primary(client, users, project, login, statements):
+    login(client, users['manager'])
+    task = project.tasks.first()
+    response = client.post(f'/tasks/{task.id}/comment', data={'content': 'Ready for review'})
+    assert response.status_code == 302
+    with client.session_transaction() as session:
+        assert session[STICKY_SESSION_KEY] > 0
+    
+    statements.clear()
+    login(client, users['manager'])
+    assert client.get('/projects/').status_code == 200
+    assert statements.get('primary')
+    assert 'replica' not in statements
+    
+    # Once the sticky window has passed, the replica serves the page again
+    with client.session_transaction() as session:
+        session[STICKY_SESSION_KEY] = 0
+    statements.clear()
+    login(client, users['manager'])
+    assert client.get('/projects/').status_code == 200
+    assert 'primary' not in statements
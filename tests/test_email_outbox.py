@@ -0,0 +1,210 @@
+from datetime import datetime, timedelta
+from email import message_from_string
+import socketserver
+import threading
+
+import pytest
+
+from app import db
+from app.models.outbox import OutboxEmail, OutboxStatus
+from app.utils.email import (CLAIM_LEASE_SECONDS, MAX_ATTEMPTS, RETRY_BASE_SECONDS, OutboxDeliverer,
+                             claim_due_emails, queue_email)
+
+
+class SMTPStubHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: accepts or, with server.reject set, temporarily refuses mail"""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply('220 localhost SMTP stub')
+        envelope = None
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb in ('HELO', 'EHLO', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'MAIL':
+                if server.reject:
+                    self.reply('451 Temporary failure, try again later')
+                    continue
+                envelope = {'sender': command[10:].strip('<>'), 'recipients': []}
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                envelope['recipients'].append(command[8:].strip('<>'))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                for data in iter(self.rfile.readline, b''):
+                    if data.rstrip(b'\r\n') == b'.':
+                        break
+                    lines.append(data.decode())
+                envelope['message'] = message_from_string(''.join(lines))
+                server.messages.append(envelope)
+                self.reply('250 OK')
+            elif verb == 'RSET':
+                envelope = None
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('500 Command not recognized')
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SMTPStubHandler)
+    server.daemon_threads = True
+    server.messages = []
+    server.connections = 0
+    server.reject = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv('MAIL_SERVER', '127.0.0.1')
+    monkeypatch.setenv('MAIL_PORT', str(server.server_address[1]))
+    monkeypatch.setenv('MAIL_USE_TLS', 'false')
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def app(smtp_server, app):
+    # The mail settings above have to be in place before the app is created
+    return app
+
+
+def _queue(count=1):
+    emails = [queue_email(f'Report {index}', [f'user{index}@example.com', 'pm@example.com'], 'Body')
+              for index in range(count)]
+    db.session.commit()
+    return emails
+
+
+def test_due_messages_go_out_over_one_connection(app, smtp_server):
+    emails = _queue(2)
+    deliverer = OutboxDeliverer()
+    
+    assert deliverer.deliver_batch() == (2, 0)
+    deliverer.disconnect()
+    
+    assert smtp_server.connections == 1
+    assert [message['message']['Subject'] for message in smtp_server.messages] == ['Report 0', 'Report 1']
+    assert sorted(smtp_server.messages[0]['recipients']) == ['pm@example.com', 'user0@example.com']
+    for email in emails:
+        db.session.refresh(email)
+        assert email.status == OutboxStatus.SENT
+        assert email.sent_at is not None
+        assert email.claim_token is None
+        assert email.body == ''
+    assert smtp_server.messages[0]['message'].get_payload().strip() == 'Body'
+    # Nothing is due any more
+    assert OutboxDeliverer().deliver_batch() == (0, 0)
+
+
+def test_refused_message_is_retried_with_backoff(app, smtp_server):
+    email, = _queue()
+    smtp_server.reject = True
+    deliverer = OutboxDeliverer()
+    
+    started = datetime.utcnow()
+    assert deliverer.deliver_batch() == (0, 1)
+    db.session.refresh(email)
+    assert email.status == OutboxStatus.PENDING
+    assert email.attempts == 1
+    assert '451' in email.last_error
+    delay = email.next_attempt_at - started
+    assert timedelta(seconds=RETRY_BASE_SECONDS) <= delay < timedelta(seconds=RETRY_BASE_SECONDS + 5)
+    # Not due again before the backoff has passed
+    assert deliverer.deliver_batch() == (0, 0)
+    
+    email.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    assert deliverer.deliver_batch() == (0, 1)
+    db.session.refresh(email)
+    # The delay doubles with every attempt
+    assert email.next_attempt_at - datetime.utcnow() > timedelta(seconds=2 * RETRY_BASE_SECONDS - 5)
+    
+    smtp_server.reject = False
+    email.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    assert deliverer.deliver_batch() == (1, 0)
+    deliverer.disconnect()
+    db.session.refresh(email)
+    assert email.status == OutboxStatus.SENT
+    assert email.attempts == 3
+    assert len(smtp_server.messages) == 1
+
+
+def test_message_fails_after_max_attempts(app, smtp_server):
+    email, = _queue()
+    email.attempts = MAX_ATTEMPTS - 1
+    db.session.commit()
+    smtp_server.reject = True
+    
+    assert OutboxDeliverer().deliver_batch() == (0, 1)
+    db.session.refresh(email)
+    assert email.status == OutboxStatus.FAILED
+    assert email.body == ''
+    assert OutboxDeliverer().deliver_batch() == (0, 0)
+
+
+def test_claim_of_a_crashed_worker_expires(app, smtp_server):
+    email, = _queue()
+    
+    # A worker claims the message and dies before sending it
+    claimed = claim_due_emails()
+    assert [row.id for row in claimed] == [email.id]
+    assert claimed[0].claim_token is not None
+    assert claimed[0].next_attempt_at - datetime.utcnow() > timedelta(seconds=CLAIM_LEASE_SECONDS - 5)
+    # While the lease holds, nobody else gets it
+    assert claim_due_emails() == []
+    assert OutboxDeliverer().deliver_batch() == (0, 0)
+    
+    db.session.refresh(email)
+    email.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    deliverer = OutboxDeliverer()
+    assert deliverer.deliver_batch() == (1, 0)
+    deliverer.disconnect()
+    db.session.refresh(email)
+    assert email.status == OutboxStatus.SENT
+    assert email.claim_token is None
+    assert len(smtp_server.messages) == 1
+
+
+def test_sent_messages_stay_sent_when_the_batch_crashes(app, smtp_server, monkeypatch):
+    first, second = _queue(2)
+    deliverer = OutboxDeliverer()
+    send = deliverer._send
+    
+    def send_then_crash(email):
+        if email.id == second.id:
+            raise RuntimeError('worker died')
+        send(email)
+    
+    monkeypatch.setattr(deliverer, '_send', send_then_crash)
+    with pytest.raises(RuntimeError):
+        deliverer.deliver_batch()
+    db.session.rollback()
+    deliverer.disconnect()
+    
+    db.session.refresh(first)
+    db.session.refresh(second)
+    assert first.status == OutboxStatus.SENT
+    assert second.status == OutboxStatus.SENDING
+    # Once the lease runs out only the unsent message goes again
+    second.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    deliverer = OutboxDeliverer()
+    assert deliverer.deliver_batch() == (1, 0)
+    deliverer.disconnect()
+    assert [message['message']['Subject'] for message in smtp_server.messages] == ['Report 0', 'Report 1']
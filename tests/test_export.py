@@ -0,0 +1,28 @@
+import io
+import zipfile
+
+from app import db
+from app.utils.export import TASK_EXPORT_COLUMNS, csv_chunks, task_tree_rows, xlsx_chunks
+from app.utils.task_import import parse_csv
+
+
+def test_csv_export_reimports_guarded_cells(project):
+    names = ['=SUM(A1:A9)', '-1 day', "'quoted'", 'Plain']
+    design = project.tasks.first()
+    design.name = names[0]
+    for name in names[1:]:
+        db.session.add(type(design)(project_id=project.id, name=name, start_date=design.start_date,
+                                    end_date=design.end_date))
+    db.session.commit()
+    
+    exported = b''.join(csv_chunks(TASK_EXPORT_COLUMNS, task_tree_rows(project.id)))
+    
+    assert b"'=SUM(A1:A9)" in exported
+    assert sorted(raw['name'] for _, raw in parse_csv(io.BytesIO(exported))) == sorted(names)
+
+
+def test_xlsx_sheet_name_drops_characters_excel_rejects():
+    chunks = xlsx_chunks("'Q1/Q2: [draft]?'", ('name',), [('Design',)])
+    
+    with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as workbook:
+        assert '<sheet name="Q1Q2 draft"' in workbook.read('xl/workbook.xml').decode()
@@ -0,0 +1,25 @@
+import os
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_migrate import Migrate, upgrade
+
+from app import create_app, db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+def test_upgrade_builds_the_model_schema(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'migrated.db'}")
+    monkeypatch.setenv('DB_CREATE_ALL', 'false')
+    monkeypatch.setenv('MAIL_OUTBOX_WORKER', 'off')
+    app = create_app()
+    Migrate(app, db, directory=MIGRATIONS_DIR)
+    
+    with app.app_context():
+        upgrade()
+        with db.engine.connect() as connection:
+            differences = compare_metadata(MigrationContext.configure(connection), db.metadata)
+        db.engine.dispose()
+    
+    assert differences == []
@@ -0,0 +1,20 @@
+from sqlalchemy.dialects import mysql
+from sqlalchemy.schema import CreateTable
+
+from app import db
+from app.models.project import Project, ProjectSearchTrigram
+from app.utils.project_search import contains_filter
+
+
+def test_trigrams_are_binary_on_mysql(app):
+    ddl = str(CreateTable(ProjectSearchTrigram.__table__).compile(dialect=mysql.dialect()))
+    
+    assert 'trigram VARCHAR(3) COLLATE utf8mb4_bin NOT NULL' in ddl
+
+
+def test_accented_and_plain_trigrams_both_index(project):
+    project.name = 'Résumé resume'
+    db.session.commit()
+    
+    assert Project.query.filter(contains_filter('name', 'rés')).all() == [project]
+    assert Project.query.filter(contains_filter('name', 'resume')).all() == [project]
@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+
+from app import db
+from app.models.task import Task
+from app.utils.rescheduler import reschedule_dependents
+
+
+def _add_child(parent, name, start, days=4, dependency_days=0):
+    task = Task(project_id=parent.project_id, parent_id=parent.id, name=name, start_date=start,
+                end_date=start + timedelta(days=days), dependency_days=dependency_days)
+    db.session.add(task)
+    db.session.flush()
+    return task
+
+
+def test_successors_shift_and_contained_children_stay(project):
+    design = project.tasks.first()
+    # Inside the parent's 2024-01-08..19 window
+    sketch = _add_child(design, 'Sketch', date(2024, 1, 10))
+    # Tight behind the parent, and behind it with three days to spare
+    review = _add_child(design, 'Review', date(2024, 1, 20))
+    signoff = _add_child(design, 'Sign-off', date(2024, 1, 24))
+    publish = _add_child(review, 'Publish', date(2024, 1, 25))
+    db.session.commit()
+    before = design.updated_at
+
+    old_end = design.end_date
+    design.end_date = old_end + timedelta(days=5)
+    changes = reschedule_dependents(design, old_end)
+    db.session.commit()
+
+    moved = {change['task_id']: change['new_start'] for change in changes}
+    assert moved == {
+        review.id: date(2024, 1, 25),
+        signoff.id: date(2024, 1, 25),
+        publish.id: date(2024, 1, 30)
+    }
+    assert sketch.start_date == date(2024, 1, 10)
+    assert review.start_date == date(2024, 1, 25)
+    assert review.updated_at > before
@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+
+from app import db
+from app.models.task import Task, TaskClosure, TaskResource
+from app.utils.schedule import create_baseline, diff_schedule_versions
+
+
+def _add_task(project, name, start):
+    task = Task(project_id=project.id, name=name, start_date=start, end_date=start + timedelta(days=4))
+    db.session.add(task)
+    db.session.flush()
+    return task
+
+
+def test_diff_between_baselines(users, project):
+    design = project.tasks.first()
+    build = _add_task(project, 'Build', date(2024, 2, 5))
+    test_id = _add_task(project, 'Test', date(2024, 3, 4)).id
+    first = create_baseline(project.id, users['manager'].id)
+    db.session.commit()
+    
+    design.end_date += timedelta(days=2)
+    deploy = _add_task(project, 'Deploy', date(2024, 4, 1))
+    # Deleted outright; its history in the first baseline stays
+    for table, column in ((TaskClosure.__table__, 'descendant_id'), (TaskResource.__table__, 'task_id'),
+                          (Task.__table__, 'id')):
+        db.session.execute(table.delete().where(table.c[column] == test_id))
+    second = create_baseline(project.id, users['manager'].id)
+    db.session.commit()
+    
+    diff = diff_schedule_versions(first, second)
+    assert [entry['task_id'] for entry in diff['added']] == [deploy.id]
+    assert [entry['task_id'] for entry in diff['removed']] == [test_id]
+    assert [entry['task_id'] for entry in diff['moved']] == [design.id]
+    assert diff['moved'][0]['end_shift_days'] == 2
+    assert diff['status_changed'] == []
+    
+    # The same diff read backwards
+    backwards = diff_schedule_versions(second, first)
+    assert [entry['task_id'] for entry in backwards['added']] == [test_id]
+    assert [entry['task_id'] for entry in backwards['removed']] == [deploy.id]
+    assert build.id not in {entry['task_id'] for entry in diff['moved'] + backwards['moved']}
+
+
+def test_edit_numbers_after_the_latest_version(client, login, users, project):
+    from datetime import datetime
+    
+    from app.models.schedule import ScheduleVersion
+    
+    design = project.tasks.first()
+    # Same timestamp, so only the id tells which is latest
+    created_at = datetime(2024, 1, 1, 9, 0)
+    for version in ('1.0', '1.1'):
+        db.session.add(ScheduleVersion(project_id=project.id, version=version, created_by=users['manager'].id,
+                                       created_at=created_at))
+    db.session.commit()
+    
+    login(client, users['manager'])
+    response = client.post(f'/tasks/{design.id}/edit', data={
+        'name': 'Design', 'start_date': '2024-01-08', 'end_date': '2024-01-22', 'dependency_days': 0,
+        'status': design.status.name, 'parent_id': 0, 'is_active': 'y'
+    })
+    
+    assert response.status_code == 302
+    latest = ScheduleVersion.query.filter_by(project_id=project.id).order_by(ScheduleVersion.id.desc()).first()
+    assert latest.version == '1.2'
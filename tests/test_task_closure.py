@@ -0,0 +1,77 @@
+from datetime import date
+
+from app import db
+from app.models.task import Task, TaskClosure
+
+
+def _add(project, name, parent=None):
+    task = Task(project_id=project.id, parent_id=parent.id if parent else None, name=name,
+                start_date=date(2024, 2, 5), end_date=date(2024, 2, 9))
+    db.session.add(task)
+    db.session.flush()
+    return task
+
+
+def _closure():
+    return {(row.ancestor_id, row.descendant_id, row.depth) for row in TaskClosure.query}
+
+
+def _expected_closure():
+    """The closure rebuilt by walking parent_id from every task"""
+    parents = dict(db.session.query(Task.id, Task.parent_id))
+    rows = set()
+    for task_id in parents:
+        ancestor_id, depth = task_id, 0
+        while ancestor_id is not None:
+            rows.add((ancestor_id, task_id, depth))
+            ancestor_id, depth = parents[ancestor_id], depth + 1
+    return rows
+
+
+def test_reparenting_a_subtree_moves_every_descendant(project):
+    design = project.tasks.first()
+    build = _add(project, 'Build')
+    frame = _add(project, 'Frame', design)
+    walls = _add(project, 'Walls', frame)
+    paint = _add(project, 'Paint', walls)
+    db.session.commit()
+    
+    frame.parent_id = build.id
+    db.session.commit()
+    
+    assert _closure() == _expected_closure()
+    assert [task.name for task in paint.get_ancestors()] == ['Build', 'Frame', 'Walls']
+    assert design.get_all_subtasks() == []
+    assert [task.name for task in build.get_all_subtasks()] == ['Frame', 'Walls', 'Paint']
+
+
+def test_subtree_moved_to_the_top_and_back_down(project):
+    design = project.tasks.first()
+    frame = _add(project, 'Frame', design)
+    walls = _add(project, 'Walls', frame)
+    db.session.commit()
+    
+    frame.parent_id = None
+    db.session.commit()
+    assert _closure() == _expected_closure()
+    assert [task.name for task in walls.get_ancestors()] == ['Frame']
+    
+    design.parent_id = walls.id
+    db.session.commit()
+    assert _closure() == _expected_closure()
+    assert [task.name for task in design.get_ancestors()] == ['Frame', 'Walls']
+    assert frame.is_ancestor_of(design.id)
+
+
+def test_deleting_a_project_removes_its_closure_rows(project):
+    design = project.tasks.first()
+    frame = _add(project, 'Frame', design)
+    _add(project, 'Walls', frame)
+    db.session.commit()
+    assert len(_closure()) == 6
+    
+    db.session.delete(project)
+    db.session.commit()
+    
+    assert _closure() == set()
+    assert Task.query.count() == 0
@@ -0,0 +1,25 @@
+import io
+
+import pytest
+
+from app.utils.task_import import import_tasks
+
+
+def test_unknown_format_is_a_clear_error(users, project):
+    with pytest.raises(ValueError, match="Unsupported import format 'txt'"):
+        import_tasks(project.id, users['manager'].id, io.BytesIO(b'name\nDesign\n'), 'txt')
+
+
+def test_cli_asks_for_a_format_it_cannot_guess(app, users, project, tmp_path):
+    path = tmp_path / 'tasks.txt'
+    path.write_text('name,start_date,end_date\nBuild,2024-02-05,2024-02-09\n')
+    
+    args = ['import-tasks', str(project.id), str(path), '--user-id', str(users['manager'].id)]
+    
+    result = app.test_cli_runner().invoke(args=args)
+    assert result.exit_code == 2
+    assert 'pass --format csv or xml' in result.output
+    
+    result = app.test_cli_runner().invoke(args=args + ['--format', 'csv'])
+    assert result.exit_code == 0, result.output
+    assert 'Imported 1 tasks' in result.output
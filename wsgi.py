@@ -0,0 +1,13 @@
+"""Production entry point, e.g. `gunicorn --preload wsgi:app`
+
+With PRELOAD_APP=true the app and everything it loads lazily are imported
+once in the master process before workers are forked.
+"""
+import os
+
+from app import create_app, preload
+
+app = create_app()
+
+if os.environ.get('PRELOAD_APP', 'false').lower() in ['true', 'on', '1']:
+    preload(app)